@@ -7,7 +7,7 @@ import traceback
 from multiprocessing import freeze_support
 from pathlib import Path
 
-ROOT_DIR = Path(__file__).resolve().parent
+ROOT_DIR = Path(os.path.dirname(os.path.abspath(__file__)))
 SRC_DIR = ROOT_DIR / "src"
 if str(SRC_DIR) not in sys.path:
     # Prefer local sources before any installed package elsewhere in system.
@@ -54,11 +54,9 @@ def _prepare_qtwebengine_dirs() -> None:
 
 _prepare_qtwebengine_dirs()
 
-from PySide6.QtGui import QIcon
-from PySide6.QtWidgets import QApplication, QMessageBox
-
-from kajovospend.ui.main_window import MainWindow
-from kajovospend.utils.env import load_user_env_var, sanitize_openai_api_key
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QIcon, QPixmap
+from PySide6.QtWidgets import QApplication, QMessageBox, QSplashScreen
 
 
 def _install_excepthook() -> None:
@@ -83,7 +81,23 @@ def _install_excepthook() -> None:
     sys.excepthook = _excepthook
 
 
+def _show_splash(assets_dir: Path) -> QSplashScreen | None:
+    """Zobrazí okamžitě jen logo, než se naimportuje a sestaví MainWindow (SQLAlchemy, OCR, ...)."""
+    logo = assets_dir / "logo.png"
+    if not logo.exists():
+        return None
+    pix = QPixmap(str(logo))
+    if pix.isNull():
+        return None
+    splash = QSplashScreen(pix.scaled(256, 256, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+    splash.show()
+    QApplication.processEvents()
+    return splash
+
+
 def main() -> int:
+    from kajovospend.utils.env import load_user_env_var, sanitize_openai_api_key
+
     root = ROOT_DIR
     # načti klíč přímo z registru (uživatelské proměnné). Procesy spuštěné ze stejného PowerShellu
     # nemusí mít aktualizované prostředí, proto nečteme jen os.getenv.
@@ -98,9 +112,15 @@ def main() -> int:
         if icon_path.exists():
             app.setWindowIcon(QIcon(str(icon_path)))
             break
+    splash = _show_splash(root / "assets")
+
+    # Těžký import grafu (UI, DB, OCR, OpenAI) až po zobrazení splash screenu.
+    from kajovospend.ui.main_window import MainWindow
 
     w = MainWindow(config_path=root / "config.yaml", assets_dir=root / "assets")
     w.showMaximized()
+    if splash is not None:
+        splash.finish(w)
     return app.exec()
 
 
@@ -10,22 +10,26 @@ def _load(path: Path):
         return json.load(f)
 
 
-def _bool(x):
-    return bool(x) if x is not None else False
-
-
 def _summ(snap):
+    # Jeden průchod se všemi čítači v lokálních proměnných místo pěti samostatných generátorů.
     n = len(snap)
-    complete = sum(1 for r in snap if _bool(r.get("complete")))
-    quarantine = sum(1 for r in snap if (r.get("status") == "QUARANTINE") or _bool(r.get("requires_review")))
-    ok_total = sum(1 for r in snap if r.get("total_with_vat") is not None)
-    ok_date = sum(1 for r in snap if r.get("issue_date") is not None)
-    ok_vendor = sum(1 for r in snap if r.get("supplier_ico"))
+    complete = quarantine = ok_total = ok_date = ok_vendor = 0
     reasons = Counter()
     for r in snap:
-        for rr in (r.get("review_reasons") or []):
-            if rr:
-                reasons[rr] += 1
+        get = r.get
+        if get("complete"):
+            complete += 1
+        if get("status") == "QUARANTINE" or get("requires_review"):
+            quarantine += 1
+        if get("total_with_vat") is not None:
+            ok_total += 1
+        if get("issue_date") is not None:
+            ok_date += 1
+        if get("supplier_ico"):
+            ok_vendor += 1
+        rrs = get("review_reasons")
+        if rrs:
+            reasons.update(rr for rr in rrs if rr)
     return {
         "n": n,
         "complete": complete,
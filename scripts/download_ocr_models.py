@@ -12,6 +12,7 @@ from __future__ import annotations
 import argparse
 import hashlib
 import os
+import shutil
 from pathlib import Path
 from urllib.request import urlopen, Request
 
@@ -30,21 +31,36 @@ MODEL_URLS = {
 
 
 def _sha256(p: Path) -> str:
-    h = hashlib.sha256()
-    with p.open("rb") as f:
-        for chunk in iter(lambda: f.read(1024 * 1024), b""):
-            h.update(chunk)
-    return h.hexdigest()
+    with p.open("rb", buffering=0) as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
 
 
-def download(url: str, dest: Path) -> None:
+class _HashingWriter:
+    """File wrapper that feeds every written chunk into a sha256 as well."""
+
+    def __init__(self, f) -> None:
+        self._f = f
+        self.hash = hashlib.sha256()
+
+    def write(self, b) -> int:
+        self.hash.update(b)
+        return self._f.write(b)
+
+
+def download(url: str, dest: Path) -> str:
+    """Stream url into dest (1 MiB chunks) and return its sha256, computed in the same pass."""
     dest.parent.mkdir(parents=True, exist_ok=True)
     req = Request(url, headers={"User-Agent": "KajovoSpend/1.0"})
-    with urlopen(req, timeout=60) as r:
-        data = r.read()
     tmp = dest.with_suffix(dest.suffix + ".tmp")
-    tmp.write_bytes(data)
-    tmp.replace(dest)
+    try:
+        with urlopen(req, timeout=60) as r, tmp.open("wb") as f:
+            w = _HashingWriter(f)
+            shutil.copyfileobj(r, w, length=1024 * 1024)
+        digest = w.hash.hexdigest()
+        tmp.replace(dest)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return digest
 
 
 def main() -> int:
@@ -65,8 +81,8 @@ def main() -> int:
             ok += 1
             continue
         print(f"GET  {name} <- {url}")
-        download(url, dest)
-        print(f"OK   {name} (sha256={_sha256(dest)[:12]}...)")
+        digest = download(url, dest)
+        print(f"OK   {name} (sha256={digest[:12]}...)")
         ok += 1
 
     print(f"Done. Downloaded/verified: {ok}/{len(MODEL_URLS)}")
@@ -2,14 +2,17 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
 import shutil
 import sys
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 SCHEMA_VERSION = 2
 
-ROOT_DIR = Path(__file__).resolve().parent.parent
+ROOT_DIR = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 SRC_DIR = ROOT_DIR / "src"
 if str(SRC_DIR) not in sys.path:
     sys.path.insert(0, str(SRC_DIR))
@@ -21,7 +24,7 @@ from kajovospend.db.models import Document, LineItem  # noqa: E402
 from kajovospend.db.session import make_engine, make_session_factory  # noqa: E402
 from kajovospend.extract.parser import postprocess_items_for_db  # noqa: E402
 from kajovospend.service.processor import Processor  # noqa: E402
-from kajovospend.utils.config import load_yaml  # noqa: E402
+from kajovospend.utils.config import load_yaml_cached  # noqa: E402
 from kajovospend.utils.logging_setup import setup_logging  # noqa: E402
 from kajovospend.utils.paths import resolve_app_paths  # noqa: E402
 
@@ -39,32 +42,66 @@ def _ensure_cfg_minimal(cfg: Dict[str, Any]) -> Dict[str, Any]:
 def _split_reasons(s: Optional[str]) -> List[str]:
     if not s:
         return []
-    parts = [p.strip() for p in str(s).split(";") if p.strip()]
-    return parts
-
-
-def _doc_items_as_dicts(items: List[LineItem]) -> List[dict]:
-    out: List[dict] = []
-    for it in items:
-        out.append(
-            {
-                "name": it.name,
-                "quantity": float(it.quantity or 0.0),
-                "unit_price": float(it.unit_price or 0.0),
-                "vat_rate": float(it.vat_rate or 0.0),
-                "line_total": float(it.line_total or 0.0),
-            }
-        )
-    return out
-
-
-def _compute_sum_ok(doc: Document, items: List[LineItem]) -> bool:
-    items_copy = _doc_items_as_dicts(items)
-    ok, _reasons = postprocess_items_for_db(items=items_copy, total_with_vat=doc.total_with_vat, reasons=[])
-    return bool(ok)
-
-
-def run(fixtures_dir: Path, *, cfg: Dict[str, Any], db_path: Path, snapshot_path: Path, work_dir: Path, log_dir: Path, reset: bool) -> Dict[str, Any]:
+    if not isinstance(s, str):
+        s = str(s)
+    return [p for p in (x.strip() for x in s.split(";")) if p]
+
+
+_ITEM_COLS = select(
+    LineItem.name, LineItem.quantity, LineItem.unit_price, LineItem.vat_rate, LineItem.line_total
+).order_by(LineItem.id)
+
+
+def _doc_items_as_dicts(session, doc_id: int) -> List[dict]:
+    # Jen potřebné sloupce jako n-tice (bez hydratace ORM LineItem objektů).
+    rows = session.execute(_ITEM_COLS.where(LineItem.document_id == doc_id)).all()
+    return [
+        {
+            "name": name,
+            "quantity": float(qty or 0.0),
+            "unit_price": float(unit_price or 0.0),
+            "vat_rate": float(vat_rate or 0.0),
+            "line_total": float(line_total or 0.0),
+        }
+        for name, qty, unit_price, vat_rate, line_total in rows
+    ]
+
+
+def _compute_sum_ok(doc: Document, items: List[dict]) -> bool:
+    # postprocess_items_for_db vrací (sum_ok, reasons, ...) a položky normalizuje in-place.
+    sum_ok = postprocess_items_for_db(items=items, total_with_vat=doc.total_with_vat, reasons=[])[0]
+    return bool(sum_ok)
+
+
+def _stage_fixture(src: Path, in_dir: Path) -> Path:
+    dest = in_dir / src.name
+    # overwrite for repeatability
+    try:
+        if dest.exists():
+            dest.unlink()
+    except Exception:
+        pass
+    shutil.copy2(src, dest)
+    return dest
+
+
+def _iter_pdf_paths(root: str):
+    # os.scandir čte typ položky z d_type (bez extra stat() na soubor) a nevytváří Path pro každý záznam.
+    stack = [root]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False) and entry.name.lower().endswith(".pdf"):
+                    yield entry.path
+
+
+def run(fixtures_dir: Path, *, cfg: Dict[str, Any], db_path: Path, snapshot_path: Path, work_dir: Path, log_dir: Path, reset: bool, pretty: bool = False) -> Dict[str, Any]:
     fixtures_dir = Path(fixtures_dir)
     if not fixtures_dir.exists():
         raise SystemExit(f"fixtures-dir neexistuje: {fixtures_dir}")
@@ -89,8 +126,9 @@ def run(fixtures_dir: Path, *, cfg: Dict[str, Any], db_path: Path, snapshot_path
         except Exception:
             pass
         try:
-            if snapshot_path.exists():
-                snapshot_path.unlink()
+            for sp in (snapshot_path, snapshot_path.with_suffix(".pretty.json")):
+                if sp.exists():
+                    sp.unlink()
         except Exception:
             pass
 
@@ -117,7 +155,9 @@ def run(fixtures_dir: Path, *, cfg: Dict[str, Any], db_path: Path, snapshot_path
 
     processor = Processor(cfg, paths, log)
 
-    pdfs = sorted([p for p in fixtures_dir.rglob("*") if p.is_file() and p.suffix.lower() == ".pdf"], key=lambda p: p.name.lower())
+    pdf_paths = list(_iter_pdf_paths(str(fixtures_dir)))
+    pdf_paths.sort(key=lambda s: os.path.basename(s).lower())
+    pdfs = [Path(s) for s in pdf_paths]
     if not pdfs:
         raise SystemExit(f"V {fixtures_dir} nejsou žádné PDF.")
 
@@ -126,16 +166,19 @@ def run(fixtures_dir: Path, *, cfg: Dict[str, Any], db_path: Path, snapshot_path
     total_complete = 0
     total_review = 0
 
-    with sf() as session:
+    # Kopírování vstupů je I/O-bound -> běží na pozadí v thread poolu a překrývá se se zpracováním.
+    # Samotné zpracování zůstává sekvenční: Processor zapisuje a commituje do DB sám
+    # (stejně jako služba s jediným workerem). Stejnojmenné fixtury (z různých podadresářů)
+    # sdílí cílovou cestu, proto se kopírují až těsně před svým zpracováním.
+    name_counts = Counter(p.name.lower() for p in pdfs)
+    staged: Dict[Path, Future] = {}
+    with sf() as session, ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as pool:
+        for src in pdfs:
+            if name_counts[src.name.lower()] == 1:
+                staged[src] = pool.submit(_stage_fixture, src, in_dir)
         for src in pdfs:
-            dest = in_dir / src.name
-            # overwrite for repeatability
-            try:
-                if dest.exists():
-                    dest.unlink()
-            except Exception:
-                pass
-            shutil.copy2(src, dest)
+            fut = staged.pop(src, None)
+            dest = fut.result() if fut is not None else _stage_fixture(src, in_dir)
 
             log.info("=== FIXTURE START name=%s path=%s ===", src.name, str(src))
             res = processor.process_path(session, dest)
@@ -152,8 +195,9 @@ def run(fixtures_dir: Path, *, cfg: Dict[str, Any], db_path: Path, snapshot_path
                     doc = session.execute(select(Document).where(Document.id == int(did))).scalar_one_or_none()
                     if not doc:
                         continue
-                    items = session.execute(select(LineItem).where(LineItem.document_id == doc.id).order_by(LineItem.id)).scalars().all()
-                    sum_ok = _compute_sum_ok(doc, list(items))
+                    items = _doc_items_as_dicts(session, doc.id)
+                    items_count = len(items)
+                    sum_ok = _compute_sum_ok(doc, items)
                     # Pro regresi chceme měřit to, co rozhoduje o karanténě: complete = !requires_review
                     complete = bool(not bool(doc.requires_review))
                     rr = _split_reasons(doc.review_reasons)
@@ -170,7 +214,7 @@ def run(fixtures_dir: Path, *, cfg: Dict[str, Any], db_path: Path, snapshot_path
                             "doc_number": doc.doc_number,
                             "issue_date": doc.issue_date.isoformat() if doc.issue_date else None,
                             "total": float(doc.total_with_vat) if doc.total_with_vat is not None else None,
-                            "items_count": int(len(items)),
+                            "items_count": items_count,
                             "sum_ok": bool(sum_ok),
                         }
                     )
@@ -209,7 +253,15 @@ def run(fixtures_dir: Path, *, cfg: Dict[str, Any], db_path: Path, snapshot_path
         "results": results,
     }
 
-    snapshot_path.write_text(json.dumps(snapshot, ensure_ascii=False, indent=2, sort_keys=True), encoding="utf-8")
+    # Snapshot se streamuje rovnou do souboru v kompaktní podobě (bez mezilehlého stringu v paměti);
+    # čitelná varianta s odsazením se zapisuje jen na vyžádání (--pretty).
+    with snapshot_path.open("w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    if pretty:
+        pretty_path = snapshot_path.with_suffix(".pretty.json")
+        with pretty_path.open("w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"OK: snapshot_pretty={pretty_path}")
 
     print(f"OK: snapshot={snapshot_path}")
     print(f"OK: test_db={db_path}")
@@ -227,12 +279,13 @@ def main() -> int:
     ap.add_argument("--work-dir", default=str(ROOT_DIR / "var" / "extract_work"), help="Pracovní adresář (kopie vstupů + output).")
     ap.add_argument("--log-dir", default=str(ROOT_DIR / "var" / "logs"), help="Logy harnessu.")
     ap.add_argument("--reset", action="store_true", help="Smaže work_dir + db + snapshot (čistý běh).")
+    ap.add_argument("--pretty", action="store_true", help="Navíc zapíše odsazený snapshot (*.pretty.json) pro ruční čtení.")
     args = ap.parse_args()
 
     cfg_path = Path(args.config)
     cfg: Dict[str, Any] = {}
     if cfg_path.exists():
-        cfg = load_yaml(cfg_path)
+        cfg = load_yaml_cached(cfg_path)
 
     run(
         Path(args.fixtures_dir),
@@ -242,6 +295,7 @@ def main() -> int:
         work_dir=Path(args.work_dir),
         log_dir=Path(args.log_dir),
         reset=bool(args.reset),
+        pretty=bool(args.pretty),
     )
     return 0
 
@@ -6,27 +6,19 @@ import signal
 import sys
 from pathlib import Path
 
-ROOT_DIR = Path(__file__).resolve().parent
+ROOT_DIR = Path(os.path.dirname(os.path.abspath(__file__)))
 SRC_DIR = ROOT_DIR / "src"
 if str(SRC_DIR) not in sys.path:
     sys.path.insert(0, str(SRC_DIR))
 
-from kajovospend.utils.config import load_yaml
+from kajovospend.utils.config import load_yaml_cached
 from kajovospend.utils.paths import resolve_app_paths, default_data_dir
-from kajovospend.utils.logging_setup import setup_logging
-from kajovospend.db.session import make_session_factory
-from kajovospend.db.migrate import init_working_db, init_production_db
-from kajovospend.db.dual_db_guard import ensure_separate_databases, DualDbConfigError
-from kajovospend.db.working_session import create_working_engine
-from kajovospend.db.production_session import create_production_engine
-from kajovospend.service.app import ServiceApp
-from kajovospend.service.control import ControlContext, ControlServer
-from kajovospend.service.sync_ares import sync_pending_suppliers
+from kajovospend.utils.logging_setup import flush_logging, setup_logging
 
 
 def main() -> int:
     ap = argparse.ArgumentParser()
-    ap.add_argument("--config", default=str(Path(__file__).parent / "config.yaml"))
+    ap.add_argument("--config", default=str(ROOT_DIR / "config.yaml"))
     sub = ap.add_subparsers(dest="command")
 
     ap_run = sub.add_parser("run")
@@ -38,7 +30,14 @@ def main() -> int:
     if not getattr(args, "command", None):
         args.command = "run"
 
-    cfg = load_yaml(Path(args.config))
+    # Těžké importy (SQLAlchemy, služba, control server) až po argparse: --help a sondy zůstanou rychlé.
+    from kajovospend.db.session import checkpoint_wal, make_session_factory
+    from kajovospend.db.migrate import init_working_db, init_production_db
+    from kajovospend.db.dual_db_guard import ensure_separate_databases
+    from kajovospend.db.working_session import create_working_engine
+    from kajovospend.db.production_session import create_production_engine
+
+    cfg = load_yaml_cached(Path(args.config))
     # Merge missing sections with defaults
     cfg.setdefault("app", {})
     cfg.setdefault("paths", {})
@@ -59,26 +58,45 @@ def main() -> int:
     ensure_separate_databases(str(paths.working_db_path), str(paths.production_db_path))
     log = setup_logging(paths.log_dir, name="kajovospend_service")
 
-    w_engine = create_working_engine(paths.working_db_path)
-    p_engine = create_production_engine(paths.production_db_path)
+    sqlite_pragmas = bool(cfg["performance"].get("sqlite_pragmas", True))
+    w_engine = create_working_engine(paths.working_db_path, sqlite_pragmas=sqlite_pragmas)
+    p_engine = create_production_engine(paths.production_db_path, sqlite_pragmas=sqlite_pragmas)
     init_working_db(w_engine)
     init_production_db(p_engine)
     sf_working = make_session_factory(w_engine)
     sf_production = make_session_factory(p_engine)
 
     if args.command == "sync-ares":
+        from kajovospend.service.sync_ares import sync_pending_suppliers
+
         ttl_hours = float(cfg.get("ares", {}).get("ttl_hours", 24.0) or 24.0)
         limit = int(getattr(args, "limit", 500) or 500)
         stats = sync_pending_suppliers(sf_production, log, ttl_hours=ttl_hours, limit=limit)
         log.info("sync-ares done: %s", stats)
         return 0
 
+    from kajovospend.service.app import ServiceApp
+    from kajovospend.service.control import ControlContext, ControlServer
+
     # store pid
     pid_path = paths.data_dir / "service.pid"
-    pid_path.write_text(str(os.getpid()), encoding="utf-8")
+    # Pár bajtů: přímé os.open/os.write bez TextIOWrapperu a enkodéru.
+    fd = os.open(str(pid_path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, str(os.getpid()).encode("ascii"))
+    finally:
+        os.close(fd)
 
     app = ServiceApp(cfg, sf_working, sf_production, paths, log)
 
+    # Signály hned po vytvoření app, ještě před bindem control serveru: SIGTERM během startu
+    # jen nastaví stop, run_forever skončí okamžitě a úklid pid/WAL proběhne ve finally.
+    def _sig(_signum, _frame):
+        app.request_stop()
+
+    signal.signal(signal.SIGINT, _sig)
+    signal.signal(signal.SIGTERM, _sig)
+
     ctrl = ControlServer(
         cfg["service"].get("host", "127.0.0.1"),
         int(cfg["service"].get("port", 8765)),
@@ -86,12 +104,6 @@ def main() -> int:
     )
     ctrl.start()
 
-    def _sig(_signum, _frame):
-        app.request_stop()
-
-    signal.signal(signal.SIGINT, _sig)
-    signal.signal(signal.SIGTERM, _sig)
-
     try:
         log.info("Service started")
         app.run_forever()
@@ -103,10 +115,13 @@ def main() -> int:
         except Exception:
             pass
         try:
-            if pid_path.exists():
-                pid_path.unlink()
+            # unlink rovnou (bez exists()); chybějící soubor spadne do except.
+            os.unlink(pid_path)
         except Exception:
             pass
+        checkpoint_wal(w_engine)
+        checkpoint_wal(p_engine)
+        flush_logging()
 
 
 if __name__ == "__main__":
@@ -5,7 +5,8 @@ from __future__ import annotations
 import sys
 from importlib import import_module
 from multiprocessing import freeze_support
-from pathlib import Path
+
+from kajovospend._boot import ROOT_DIR
 
 
 def _find_run_gui():
@@ -13,7 +14,7 @@ def _find_run_gui():
     Preferuje existující `run_gui.py` v kořenovém adresáři repo,
     protože obsahuje nastavení cest a ikon.
     """
-    root = Path(__file__).resolve().parents[2]
+    root = ROOT_DIR
     candidate = root / "run_gui.py"
     if candidate.exists():
         # Přidej kořen repo na sys.path, aby import run_gui fungoval i při
@@ -0,0 +1,11 @@
+"""Cesty ke kořeni repozitáře spočtené jednou při importu (bez realpath/resolve na každé volání)."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+# src/kajovospend/_boot.py -> src/kajovospend -> src -> kořen repo
+_PKG_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = Path(os.path.dirname(_PKG_DIR))
+ROOT_DIR = SRC_DIR.parent
@@ -1,7 +1,24 @@
 from __future__ import annotations
 
+import unicodedata
+
+from sqlalchemy import String
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.types import TypeDecorator
 
 
 class Base(DeclarativeBase):
     pass
+
+
+class NFCText(TypeDecorator):
+    """String column that stores bound values in Unicode NFC, so NFC/NFD variants of the same
+    text hit the same index/unique entry."""
+
+    impl = String
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or not isinstance(value, str) or value.isascii():
+            return value
+        return unicodedata.normalize("NFC", value)
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import datetime as dt
+
+from sqlalchemy import or_
+
+# Heartbeat sloupce (last_seen / heartbeat_at) se přepisují nejvýš jednou za HEARTBEAT_THROTTLE_SEC;
+# pokud se jinak nic nezměnilo, UPDATE nic nezapíše (žádný zápis do WAL / fsync při commitu).
+# Sdílí update_service_state ve working i legacy vrstvě.
+HEARTBEAT_THROTTLE_SEC = 5.0
+_HEARTBEAT_COLUMNS = ("last_seen", "heartbeat_at")
+
+
+def service_state_changed(cols, values: dict):
+    """WHERE podmínka pro UPDATE service_state: pravdivá jen pokud se něco skutečně mění."""
+    conds = []
+    for k, v in values.items():
+        if k in _HEARTBEAT_COLUMNS and isinstance(v, dt.datetime):
+            conds.append(cols[k].is_(None))
+            conds.append(cols[k] < v - dt.timedelta(seconds=HEARTBEAT_THROTTLE_SEC))
+        else:
+            conds.append(cols[k].is_distinct_from(v))
+    return or_(*conds)
@@ -1,8 +1,16 @@
 from __future__ import annotations
 
-import re
-from sqlalchemy import text
+from contextlib import contextmanager
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Iterator, Mapping, NamedTuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import Connection
 from sqlalchemy.engine import Engine
+from sqlalchemy.sql.elements import TextClause
+
+from kajovospend.utils.digits import digits_only
 
 from .base import Base
 from .working_models import BaseWorking
@@ -19,10 +27,14 @@ CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
 );
 """
 
+# External-content FTS nad items: text položky se neukládá podruhé, index drží v souladu triggery
+# (_ITEMS_FTS_TRIGGERS), takže zápisy položek na FTS nemusí pamatovat.
 FTS_ITEMS = """
 CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
   document_id UNINDEXED,
-  item_name
+  name,
+  content='items',
+  content_rowid='id'
 );
 """
 
@@ -36,16 +48,287 @@ CREATE VIRTUAL TABLE IF NOT EXISTS items_fts2 USING fts5(
 );
 """
 
-_ICO_DIGITS_RE = re.compile(r"\D+")
-
 
+# Verze schématu zapisovaná do PRAGMA user_version po úspěšné migraci.
+# Při jakékoli změně v _ensure_columns_and_indexes (nový sloupec/index/backfill) je nutné ji zvýšit,
+# jinak se změna na již zmigrovaných DB neprovede.
+SCHEMA_VERSION = 6
+# Totéž pro working DB (init_working_db: item_groups + indexy). Legacy DB zmigrovaná přes init_db
+# má vyšší verzi a tyto kroky už obsahuje.
+WORKING_SCHEMA_VERSION = 2
+
+# Předkompilované konstrukce text(): init_* běží při každém startu, není důvod je pokaždé stavět znovu.
+_USER_VERSION_SQL = text("PRAGMA user_version")
+_HAS_STAT1_SQL = text("SELECT 1 FROM sqlite_master WHERE type='table' AND name='sqlite_stat1'")
+_ANALYZE_SQL = text("ANALYZE")
+_OPTIMIZE_SQL = text("PRAGMA optimize")
+_SET_USER_VERSION_SQL = text(f"PRAGMA user_version = {int(SCHEMA_VERSION)}")
+_SET_WORKING_USER_VERSION_SQL = text(f"PRAGMA user_version = {int(WORKING_SCHEMA_VERSION)}")
+_BACKFILL_ITEM_LINKS_SQL = text(
+    """
+    UPDATE items
+    SET
+      id_receipt = COALESCE(items.id_receipt, d.id_receipt, d.id),
+      id_supplier = COALESCE(items.id_supplier, d.supplier_id)
+    FROM documents d
+    WHERE d.id = items.document_id
+      AND (items.id_receipt IS NULL OR (items.id_supplier IS NULL AND d.supplier_id IS NOT NULL))
+    """
+)
+_SERVICE_STATE_SINGLETON_SQL = text(
+    """
+    INSERT OR IGNORE INTO service_state (singleton, running, queue_size, inflight, max_workers, stuck)
+    VALUES (1, 0, 0, 0, 0, 0)
+    """
+)
+# Jednorázové naplnění FTS položek hromadným INSERT ... SELECT (jen pokud jsou FTS tabulky prázdné).
+# documents_fts se takto doplnit nedá: plný text dokladu (OCR) v DB uložen není.
+_FTS_ITEMS_BACKFILL = (
+    # external content: SELECT z items_fts čte items, prázdnotu indexu ukáže až shadow tabulka _docsize
+    (
+        text("SELECT 1 FROM items_fts_docsize LIMIT 1"),
+        text("INSERT INTO items_fts(items_fts) VALUES('rebuild')"),
+    ),
+    (
+        text("SELECT 1 FROM items_fts2 LIMIT 1"),
+        text(
+            """
+            INSERT INTO items_fts2(item_id, document_id, item_name, supplier_ico, doc_number)
+            SELECT i.id, i.document_id, COALESCE(i.name,''), COALESCE(d.supplier_ico,''), COALESCE(d.doc_number,'')
+            FROM items i
+            JOIN documents d ON d.id = i.document_id
+            """
+        ),
+    ),
+)
+_ITEMS_FTS_TRIGGERS = (
+    text(
+        "CREATE TRIGGER IF NOT EXISTS items_fts_ai AFTER INSERT ON items BEGIN "
+        "INSERT INTO items_fts(rowid, document_id, name) VALUES (new.id, new.document_id, new.name); END"
+    ),
+    text(
+        "CREATE TRIGGER IF NOT EXISTS items_fts_ad AFTER DELETE ON items BEGIN "
+        "INSERT INTO items_fts(items_fts, rowid, document_id, name) VALUES ('delete', old.id, old.document_id, old.name); END"
+    ),
+    text(
+        "CREATE TRIGGER IF NOT EXISTS items_fts_au AFTER UPDATE OF document_id, name ON items BEGIN "
+        "INSERT INTO items_fts(items_fts, rowid, document_id, name) VALUES ('delete', old.id, old.document_id, old.name); "
+        "INSERT INTO items_fts(rowid, document_id, name) VALUES (new.id, new.document_id, new.name); END"
+    ),
+)
+# items_fts z doby před external content (text uložený přímo v FTS) -> zahodit a založit znovu.
+_LEGACY_ITEMS_FTS_SQL = text(
+    "SELECT 1 FROM sqlite_master WHERE type='table' AND name='items_fts' AND sql NOT LIKE '%content=%'"
+)
+_DROP_ITEMS_FTS_SQL = text("DROP TABLE items_fts")
+# Čistě číselné IČO (běžný případ) se doplní nulami přímo v SQL; do Pythonu
+# (kajovo_norm_ico) jdou jen hodnoty s mezerami, prefixem CZ apod.
+_BACKFILL_ICO_NORM_SQL = text(
+    "UPDATE suppliers SET ico_norm = CASE "
+    "WHEN ico <> '' AND ico NOT GLOB '*[^0-9]*' "
+    "THEN CASE WHEN length(ico) > 8 THEN ico ELSE substr('00000000' || ico, -8) END "
+    "ELSE COALESCE(kajovo_norm_ico(ico), ico_norm) END "
+    "WHERE (ico_norm IS NULL OR ico_norm = '') AND ico IS NOT NULL"
+)
+_DOCS_NEED_TOTALS_SQL = text(
+    "SELECT 1 FROM documents WHERE total_without_vat IS NULL OR total_vat_amount IS NULL OR doc_type IS NULL LIMIT 1"
+)
+# Krycí index z LineItem.__table_args__; create_all ho u existující tabulky items nepostaví.
+_ITEMS_DOC_TOTALS_INDEX_SQL = text(
+    "CREATE INDEX IF NOT EXISTS ix_items_doc_totals "
+    "ON items(document_id, vat_rate, line_total_net, line_total_gross, vat_amount)"
+)
+_FTS_OPTIMIZE = tuple(
+    text(f"INSERT INTO {name}({name}) VALUES('optimize')") for name in ("documents_fts", "items_fts", "items_fts2")
+)
+_TABLE_NAMES_SQL = text("SELECT name FROM sqlite_master WHERE type='table'")
+# Částečný index jen nad čekajícími joby (ImportJob.__table_args__): queue_size i claim dalšího jobu
+# (ORDER BY created_at) čtou jen pár listů fronty místo celé historie importů a bez řazení v temp B-tree.
+_IMPORT_JOBS_QUEUED_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS ix_import_jobs_queued ON import_jobs(created_at) WHERE status = 'QUEUED'"
+)
+_WORKING_INDEXES = (
+    ("idx_documents_supplier_id", text("CREATE INDEX IF NOT EXISTS idx_documents_supplier_id ON documents(supplier_id)")),
+    ("ix_import_jobs_queued", text(_IMPORT_JOBS_QUEUED_INDEX_SQL)),
+)
+_INDEX_NAMES_SQL = text("SELECT name FROM sqlite_master WHERE type='index'")
+
+# Indexy se zakládají až po backfillech: SQLite je postaví jednou nad hotovými daty místo
+# průběžné údržby při každém UPDATE. IF NOT EXISTS is safe.
+_INDEXES = (
+    # Supplier fast lookups / joins
+    ("idx_suppliers_ico_norm", text("CREATE UNIQUE INDEX IF NOT EXISTS idx_suppliers_ico_norm ON suppliers(ico_norm)")),
+
+    # Documents filters / sort
+    ("idx_documents_issue_date", text("CREATE INDEX IF NOT EXISTS idx_documents_issue_date ON documents(issue_date)")),
+    ("idx_documents_supplier_ico", text("CREATE INDEX IF NOT EXISTS idx_documents_supplier_ico ON documents(supplier_ico)")),
+    ("idx_documents_doc_number", text("CREATE INDEX IF NOT EXISTS idx_documents_doc_number ON documents(doc_number)")),
+    ("idx_documents_bank_account", text("CREATE INDEX IF NOT EXISTS idx_documents_bank_account ON documents(bank_account)")),
+    ("idx_documents_requires_review", text("CREATE INDEX IF NOT EXISTS idx_documents_requires_review ON documents(requires_review)")),
+    ("idx_documents_file_page", text("CREATE INDEX IF NOT EXISTS idx_documents_file_page ON documents(file_id, page_from, page_to)")),
+    # FK na dodavatele: doklady dodavatele / merge dodavatelů / kontrola FK při mazání bez full scanu.
+    ("idx_documents_supplier_id", text("CREATE INDEX IF NOT EXISTS idx_documents_supplier_id ON documents(supplier_id)")),
+    # Kompozitní index pro business duplicity (IČO + číslo dokladu + datum).
+    ("idx_documents_dup_key", text("CREATE INDEX IF NOT EXISTS idx_documents_dup_key ON documents(supplier_ico, doc_number, issue_date)")),
+    # Audit / debug
+    ("idx_documents_text_quality", text("CREATE INDEX IF NOT EXISTS idx_documents_text_quality ON documents(document_text_quality)")),
+    ("idx_documents_extraction_method", text("CREATE INDEX IF NOT EXISTS idx_documents_extraction_method ON documents(extraction_method)")),
+
+    # Line items foreign key / filtering
+    ("idx_line_items_document_id", text("CREATE INDEX IF NOT EXISTS idx_line_items_document_id ON items(document_id)")),
+    ("ix_items_doc_totals", _ITEMS_DOC_TOTALS_INDEX_SQL),
+    ("idx_line_items_name", text("CREATE INDEX IF NOT EXISTS idx_line_items_name ON items(name)")),
+    ("idx_line_items_ean", text("CREATE INDEX IF NOT EXISTS idx_line_items_ean ON items(ean)")),
+    ("idx_line_items_item_code", text("CREATE INDEX IF NOT EXISTS idx_line_items_item_code ON items(item_code)")),
+
+    # Standard receipt templates
+    ("idx_standard_receipt_templates_enabled", text("CREATE INDEX IF NOT EXISTS idx_standard_receipt_templates_enabled ON standard_receipt_templates(enabled)")),
+    ("idx_standard_receipt_templates_match_supplier_ico_norm", text("CREATE INDEX IF NOT EXISTS idx_standard_receipt_templates_match_supplier_ico_norm ON standard_receipt_templates(match_supplier_ico_norm)")),
+    ("idx_standard_receipt_templates_name", text("CREATE INDEX IF NOT EXISTS idx_standard_receipt_templates_name ON standard_receipt_templates(name)")),
+)
+
+
+# Sloupce doplňované ALTER TABLE ADD COLUMN (název, deklarace); chybějící se zjistí z jednoho dotazu na schéma.
+_SUPPLIER_COLUMNS = (
+    # historical columns that might be missing
+    ("legal_form", "TEXT"),
+    ("street", "TEXT"),
+    ("street_number", "TEXT"),
+    ("orientation_number", "TEXT"),
+    ("city", "TEXT"),
+    ("zip_code", "TEXT"),
+    ("ico_norm", "TEXT"),
+    ("pending_ares", "INTEGER DEFAULT 0"),
+)
+_DOCUMENT_COLUMNS = (
+    # newly added paging metadata
+    ("page_from", "INTEGER DEFAULT 1"),
+    ("page_to", "INTEGER"),
+    # audit columns for text quality + OpenAI fallback (even if OpenAI not wired yet)
+    ("document_text_quality", "REAL DEFAULT 0.0"),
+    ("openai_model", "TEXT"),
+    ("openai_raw_response", "TEXT"),
+    # VAT/net-gross fields (PULS-001)
+    ("total_without_vat", "REAL"),
+    ("total_vat_amount", "REAL"),
+    ("vat_breakdown_json", "TEXT"),
+    ("doc_type", "TEXT"),
+    ("processing_profile", "TEXT"),
+)
+_ITEM_COLUMNS = (
+    # UI expects unit_price/ean/item_code
+    ("unit_price", "REAL"),
+    ("ean", "TEXT"),
+    ("item_code", "TEXT"),
+    # VAT/net-gross fields (PULS-001)
+    ("unit_price_net", "REAL"),
+    ("unit_price_gross", "REAL"),
+    ("line_total_net", "REAL"),
+    ("line_total_gross", "REAL"),
+    ("vat_amount", "REAL"),
+    ("vat_code", "TEXT"),
+)
+_SERVICE_STATE_COLUMNS = (
+    # observability columns
+    ("inflight", "INTEGER DEFAULT 0"),
+    ("max_workers", "INTEGER DEFAULT 0"),
+    ("current_job_id", "INTEGER"),
+    ("current_path", "TEXT"),
+    ("current_phase", "TEXT"),
+    ("current_progress", "REAL"),
+    ("heartbeat_at", "TEXT"),
+    ("stuck", "INTEGER DEFAULT 0"),
+    ("stuck_reason", "TEXT"),
+)
+_TEMPLATE_COLUMNS = (
+    ("name", "TEXT"),
+    ("enabled", "INTEGER"),
+    ("match_supplier_ico_norm", "TEXT"),
+    ("match_texts_json", "TEXT"),
+    ("schema_json", "TEXT"),
+    ("sample_file_name", "TEXT"),
+    ("sample_file_sha256", "TEXT"),
+    ("sample_file_relpath", "TEXT"),
+    ("created_at", "TEXT"),
+    ("updated_at", "TEXT"),
+)
+
+
+class MigrationPlan(NamedTuple):
+    """Statická část migrace sestavená jednou při importu; init_* ji jen aplikuje."""
+
+    fts_ddl: tuple[TextClause, ...]
+    fts_triggers: tuple[TextClause, ...]
+    columns: Mapping[str, tuple[tuple[str, str], ...]]
+    indexes: tuple[tuple[str, TextClause], ...]
+    working_indexes: tuple[tuple[str, TextClause], ...]
+
+
+MIGRATION_PLAN = MigrationPlan(
+    fts_ddl=(text(FTS_DOCS), text(FTS_ITEMS), text(FTS_ITEMS2)),
+    fts_triggers=_ITEMS_FTS_TRIGGERS,
+    columns=MappingProxyType(
+        {
+            "suppliers": _SUPPLIER_COLUMNS,
+            "documents": _DOCUMENT_COLUMNS,
+            "items": _ITEM_COLUMNS,
+            "service_state": _SERVICE_STATE_COLUMNS,
+            "standard_receipt_templates": _TEMPLATE_COLUMNS,
+        }
+    ),
+    indexes=_INDEXES,
+    working_indexes=_WORKING_INDEXES,
+)
+
+# Tabulky, jejichž schéma migrace kontroluje (FTS a jejich stínové tabulky se nenačítají).
+_SCHEMA_TABLES = (
+    "suppliers",
+    "documents",
+    "items",
+    "files",
+    "service_state",
+    "import_jobs",
+    "standard_receipt_templates",
+    "item_groups",
+)
+
+# Sloupce všech sledovaných tabulek jedním dotazem místo PRAGMA table_info pro každou tabulku zvlášť.
+_TABLE_COLUMNS_SQL = text(
+    """
+    SELECT m.name, p.name
+    FROM sqlite_master AS m, pragma_table_info(m.name) AS p
+    WHERE m.type = 'table' AND m.name IN :names
+    """
+).bindparams(bindparam("names", expanding=True))
+
+
+def _table_columns(con, tables: tuple[str, ...] = _SCHEMA_TABLES) -> dict[str, set[str]]:
+    out: dict[str, set[str]] = {}
+    for table, column in con.execute(_TABLE_COLUMNS_SQL, {"names": list(tables)}):
+        out.setdefault(table, set()).add(column)
+    return out
+
+
+def _add_missing_columns(con, table: str, existing: set[str], columns) -> None:
+    # DDL bez parametrů jde rovnou do driveru (bez text() konstruktu a kompilace).
+    # executescript by dávku zvládl jedním voláním, ale sqlite3 před ním implicitně COMMITne
+    # rozpracovanou transakci, což by rozbilo atomickou migraci.
+    needed = [f"ALTER TABLE {table} ADD COLUMN {name} {decl}" for name, decl in columns if name not in existing]
+    for ddl in needed:
+        con.exec_driver_sql(ddl)
+    existing.update(name for name, _decl in columns)
+
+
+@lru_cache(maxsize=4096)
 def _normalize_ico_soft(ico: str | None) -> str | None:
     if ico is None:
         return None
+    if type(ico) is str and len(ico) == 8 and ico.isdecimal():
+        return ico  # už normalizované IČO (nejčastější případ)
     raw = str(ico).strip()
     if not raw:
         return None
-    digits = _ICO_DIGITS_RE.sub("", raw)
+    digits = digits_only(raw)
     if not digits:
         return None
     if len(digits) > 8:
@@ -53,336 +336,251 @@ def _normalize_ico_soft(ico: str | None) -> str | None:
     return digits.zfill(8)
 
 
-def _ensure_columns_and_indexes(engine: Engine) -> None:
+def _backfill_item_links(con) -> None:
+    # Zpětné doplnění id_supplier/id_receipt do items z vazeb (použij prefixy, aby nedošlo ke kolizi).
+    # Běží při každém startu: produkční inserty tyto sloupce nenastavují. Přepisují se jen řádky,
+    # kterým se hodnota opravdu změní (join přes documents.id = PK).
+    con.execute(_BACKFILL_ITEM_LINKS_SQL)
+
+
+def _backfill_fts(con) -> None:
+    for probe, insert in _FTS_ITEMS_BACKFILL:
+        if con.execute(probe).first() is None:
+            con.execute(insert)
+    # Jednorázové sloučení segmentů FTS indexu po backfillu; běží jen při skutečné migraci
+    # (teplý start se sem nedostane díky user_version).
+    for stmt in _FTS_OPTIMIZE:
+        con.execute(stmt)
+
+
+def _ensure_indexes(con, indexes: tuple[tuple[str, TextClause], ...]) -> None:
+    # Jeden dotaz na existující indexy; CREATE se posílá jen pro chybějící.
+    have = {row[0] for row in con.execute(_INDEX_NAMES_SQL)}
+    for name, stmt in indexes:
+        if name not in have:
+            con.execute(stmt)
+
+
+def _ensure_columns_and_indexes(con) -> None:
     # Keep migrations deterministic and idempotent (no external tool).
-    with engine.begin() as con:
-        # Ensure FTS tables exist before indexing them.
-        con.execute(text(FTS_DOCS))
-        con.execute(text(FTS_ITEMS))
-        con.execute(text(FTS_ITEMS2))
-
-        # --- columns ---
-        cols = con.execute(text("PRAGMA table_info('suppliers')")).fetchall()
-        col_names = {row[1] for row in cols}  # (cid, name, type, notnull, dflt, pk)
-        # historical columns that might be missing
-        for name, coltype in [
-            ("legal_form", "TEXT"),
-            ("street", "TEXT"),
-            ("street_number", "TEXT"),
-            ("orientation_number", "TEXT"),
-            ("city", "TEXT"),
-            ("zip_code", "TEXT"),
-        ]:
-            if name not in col_names:
-                con.execute(text(f"ALTER TABLE suppliers ADD COLUMN {name} {coltype}"))
-        if "ico_norm" not in col_names:
-            con.execute(text("ALTER TABLE suppliers ADD COLUMN ico_norm TEXT"))
-        if "pending_ares" not in col_names:
-            con.execute(text("ALTER TABLE suppliers ADD COLUMN pending_ares INTEGER DEFAULT 0"))
-
-        # Backfill ico_norm in Python (SQLite has no built-in regex replace)
-        rows = con.execute(text("SELECT id, ico, ico_norm FROM suppliers")).fetchall()
-        for rid, ico, ico_norm in rows:
-            if ico_norm:
-                continue
-            norm = _normalize_ico_soft(ico)
-            if norm:
-                con.execute(
-                    text("UPDATE suppliers SET ico_norm=:n WHERE id=:id"),
-                    {"n": norm, "id": rid},
-                )
-
-        # documents: newly added paging metadata
-        cols_docs = con.execute(text("PRAGMA table_info('documents')")).fetchall()
-        doc_col_names = {row[1] for row in cols_docs}
-        if "page_from" not in doc_col_names:
-            con.execute(text("ALTER TABLE documents ADD COLUMN page_from INTEGER DEFAULT 1"))
-        if "page_to" not in doc_col_names:
-            con.execute(text("ALTER TABLE documents ADD COLUMN page_to INTEGER"))
-        # documents: audit columns for text quality + OpenAI fallback (even if OpenAI not wired yet)
-        if "document_text_quality" not in doc_col_names:
-            con.execute(text("ALTER TABLE documents ADD COLUMN document_text_quality REAL DEFAULT 0.0"))
-        if "openai_model" not in doc_col_names:
-            con.execute(text("ALTER TABLE documents ADD COLUMN openai_model TEXT"))
-        if "openai_raw_response" not in doc_col_names:
-            con.execute(text("ALTER TABLE documents ADD COLUMN openai_raw_response TEXT"))
-
-        # documents: VAT/net-gross fields (PULS-001)
-        if "total_without_vat" not in doc_col_names:
-            con.execute(text("ALTER TABLE documents ADD COLUMN total_without_vat REAL"))
-        if "total_vat_amount" not in doc_col_names:
-            con.execute(text("ALTER TABLE documents ADD COLUMN total_vat_amount REAL"))
-        if "vat_breakdown_json" not in doc_col_names:
-            con.execute(text("ALTER TABLE documents ADD COLUMN vat_breakdown_json TEXT"))
-        if "doc_type" not in doc_col_names:
-            con.execute(text("ALTER TABLE documents ADD COLUMN doc_type TEXT"))
-        if "processing_profile" not in doc_col_names:
-            con.execute(text("ALTER TABLE documents ADD COLUMN processing_profile TEXT"))
-
-        # items: UI expects unit_price/ean/item_code
-        cols_items = con.execute(text("PRAGMA table_info('items')")).fetchall()
-        item_col_names = {row[1] for row in cols_items}
-        if "unit_price" not in item_col_names:
-            con.execute(text("ALTER TABLE items ADD COLUMN unit_price REAL"))
-        if "ean" not in item_col_names:
-            con.execute(text("ALTER TABLE items ADD COLUMN ean TEXT"))
-        if "item_code" not in item_col_names:
-            con.execute(text("ALTER TABLE items ADD COLUMN item_code TEXT"))
-
-        # items: VAT/net-gross fields (PULS-001)
-        if "unit_price_net" not in item_col_names:
-            con.execute(text("ALTER TABLE items ADD COLUMN unit_price_net REAL"))
-        if "unit_price_gross" not in item_col_names:
-            con.execute(text("ALTER TABLE items ADD COLUMN unit_price_gross REAL"))
-        if "line_total_net" not in item_col_names:
-            con.execute(text("ALTER TABLE items ADD COLUMN line_total_net REAL"))
-        if "line_total_gross" not in item_col_names:
-            con.execute(text("ALTER TABLE items ADD COLUMN line_total_gross REAL"))
-        if "vat_amount" not in item_col_names:
-            con.execute(text("ALTER TABLE items ADD COLUMN vat_amount REAL"))
-        if "vat_code" not in item_col_names:
-            con.execute(text("ALTER TABLE items ADD COLUMN vat_code TEXT"))
-
-        # Deterministický backfill kompatibility:
-        # - unit_price -> unit_price_net
-        # - line_total -> line_total_gross
-        con.execute(text("UPDATE items SET unit_price_net = unit_price WHERE unit_price_net IS NULL AND unit_price IS NOT NULL"))
-        con.execute(text("UPDATE items SET line_total_gross = line_total WHERE line_total_gross IS NULL AND line_total IS NOT NULL"))
-
-        # Backfill odvozených hodnot z dostupných dat (deterministicky).
-        con.execute(text("""
-            UPDATE items
-            SET
-              line_total_net = CASE
+    # Teplý start: schéma už je v aktuální verzi -> žádné PRAGMA table_info / DDL / backfilly.
+    if int(con.execute(_USER_VERSION_SQL).scalar_one() or 0) >= SCHEMA_VERSION:
+        _backfill_item_links(con)
+        return
+
+    # FTS tabulky už založil _ensure_fts_tables v samostatné krátké transakci.
+    # Fáze: 1) sloupce, 2) backfilly, 3) indexy. Indexy vázané na nově přidaný sloupec
+    # se jen zaznamenají a založí až ve fázi 3 nad hotovými daty.
+    deferred_indexes: list[str] = []
+
+    # --- columns ---
+    table_cols = _table_columns(con)
+    tbls = set(table_cols)
+    sup_col_names = table_cols.setdefault("suppliers", set())
+    doc_col_names = table_cols.setdefault("documents", set())
+    item_col_names = table_cols.setdefault("items", set())
+    _add_missing_columns(con, "suppliers", sup_col_names, MIGRATION_PLAN.columns["suppliers"])
+
+    # Backfill ico_norm (SQLite has no built-in regex replace): normalizace v Pythonu zaregistrovaná
+    # jako SQL funkce kajovo_norm_ico (viz _immediate_transaction), takže stačí jeden UPDATE.
+    # Nenormalizovatelné IČO ponechá původní ico_norm (COALESCE).
+    con.execute(_BACKFILL_ICO_NORM_SQL)
+
+    _add_missing_columns(con, "documents", doc_col_names, MIGRATION_PLAN.columns["documents"])
+    _add_missing_columns(con, "items", item_col_names, MIGRATION_PLAN.columns["items"])
+
+    # Deterministický backfill kompatibility:
+    # - unit_price -> unit_price_net
+    # - line_total -> line_total_gross
+    con.execute(text("UPDATE items SET unit_price_net = unit_price WHERE unit_price_net IS NULL AND unit_price IS NOT NULL"))
+    con.execute(text("UPDATE items SET line_total_gross = line_total WHERE line_total_gross IS NULL AND line_total IS NOT NULL"))
+
+    # Backfill odvozených hodnot z dostupných dat (deterministicky) – jeden průchod tabulkou.
+    # unit_price_net počítá z nového line_total_net, proto stejný CASE výraz (SET vidí staré hodnoty).
+    con.execute(text("""
+        UPDATE items
+        SET
+          line_total_net = CASE
+            WHEN line_total_net IS NOT NULL THEN line_total_net
+            WHEN line_total_gross IS NULL THEN NULL
+            WHEN vat_rate IS NULL OR vat_rate = 0 THEN line_total_gross
+            ELSE ROUND(line_total_gross / (1.0 + (vat_rate / 100.0)), 2)
+          END,
+          vat_amount = CASE
+            WHEN vat_amount IS NOT NULL THEN vat_amount
+            WHEN line_total_gross IS NULL THEN NULL
+            WHEN vat_rate IS NULL OR vat_rate = 0 THEN 0.0
+            ELSE ROUND(line_total_gross - (line_total_gross / (1.0 + (vat_rate / 100.0))), 2)
+          END,
+          unit_price_gross = CASE
+            WHEN unit_price_gross IS NOT NULL THEN unit_price_gross
+            WHEN quantity IS NULL OR quantity = 0 THEN NULL
+            WHEN line_total_gross IS NULL THEN NULL
+            ELSE ROUND(line_total_gross / quantity, 4)
+          END,
+          unit_price_net = CASE
+            WHEN unit_price_net IS NOT NULL THEN unit_price_net
+            WHEN quantity IS NULL OR quantity = 0 THEN NULL
+            ELSE ROUND((
+              CASE
                 WHEN line_total_net IS NOT NULL THEN line_total_net
                 WHEN line_total_gross IS NULL THEN NULL
                 WHEN vat_rate IS NULL OR vat_rate = 0 THEN line_total_gross
                 ELSE ROUND(line_total_gross / (1.0 + (vat_rate / 100.0)), 2)
-              END,
-              vat_amount = CASE
-                WHEN vat_amount IS NOT NULL THEN vat_amount
-                WHEN line_total_gross IS NULL THEN NULL
-                WHEN vat_rate IS NULL OR vat_rate = 0 THEN 0.0
-                ELSE ROUND(line_total_gross - (line_total_gross / (1.0 + (vat_rate / 100.0))), 2)
-              END,
-              unit_price_gross = CASE
-                WHEN unit_price_gross IS NOT NULL THEN unit_price_gross
-                WHEN quantity IS NULL OR quantity = 0 THEN NULL
-                WHEN line_total_gross IS NULL THEN NULL
-                ELSE ROUND(line_total_gross / quantity, 4)
               END
-        """))
-        con.execute(text("""
-            UPDATE items
-            SET unit_price_net = CASE
-              WHEN unit_price_net IS NOT NULL THEN unit_price_net
-              WHEN quantity IS NULL OR quantity = 0 THEN NULL
-              WHEN line_total_net IS NULL THEN NULL
-              ELSE ROUND(line_total_net / quantity, 4)
-            END
-        """))
-
-        # Documents backfill z položek: total_without_vat + total_vat_amount.
-        con.execute(text("""
-            UPDATE documents
-            SET
-              total_without_vat = COALESCE(total_without_vat, (
-                SELECT ROUND(SUM(COALESCE(i.line_total_net,
-                    CASE
-                      WHEN i.line_total_gross IS NULL THEN NULL
-                      WHEN i.vat_rate IS NULL OR i.vat_rate = 0 THEN i.line_total_gross
-                      ELSE i.line_total_gross / (1.0 + (i.vat_rate / 100.0))
-                    END
-                )), 2)
-                FROM items i WHERE i.document_id = documents.id
-              )),
-              total_vat_amount = COALESCE(total_vat_amount, (
+            ) / quantity, 4)
+          END
+        WHERE line_total_net IS NULL OR vat_amount IS NULL OR unit_price_gross IS NULL OR unit_price_net IS NULL
+    """))
+
+    # Documents backfill z položek: total_without_vat + total_vat_amount.
+    # Jen doklady s chybějící hodnotou. Pokud nějaké jsou, postaví se krycí ix_items_doc_totals
+    # už před UPDATE, aby korelované SUM poddotazy nečetly řádky tabulky items.
+    if con.execute(_DOCS_NEED_TOTALS_SQL).first() is not None:
+        con.execute(_ITEMS_DOC_TOTALS_INDEX_SQL)
+    con.execute(text("""
+        UPDATE documents
+        SET
+          total_without_vat = COALESCE(total_without_vat, (
+            SELECT ROUND(SUM(COALESCE(i.line_total_net,
                 CASE
-                  WHEN total_with_vat IS NULL THEN NULL
-                  ELSE ROUND(total_with_vat - COALESCE((
-                    SELECT SUM(COALESCE(i.line_total_net,
-                      CASE
-                        WHEN i.line_total_gross IS NULL THEN NULL
-                        WHEN i.vat_rate IS NULL OR i.vat_rate = 0 THEN i.line_total_gross
-                        ELSE i.line_total_gross / (1.0 + (i.vat_rate / 100.0))
-                      END
-                    ))
-                    FROM items i WHERE i.document_id = documents.id
-                  ), 0.0), 2)
+                  WHEN i.line_total_gross IS NULL THEN NULL
+                  WHEN i.vat_rate IS NULL OR i.vat_rate = 0 THEN i.line_total_gross
+                  ELSE i.line_total_gross / (1.0 + (i.vat_rate / 100.0))
                 END
-              )),
-              doc_type = COALESCE(doc_type, CASE WHEN doc_number IS NULL OR TRIM(doc_number) = '' THEN 'receipt' ELSE 'invoice' END)
-        """))
-
-        # service_state: observability columns (idempotent) – only if table exists
-        tbls = {row[0] for row in con.execute(text("SELECT name FROM sqlite_master WHERE type='table'")).fetchall()}
-        if "service_state" in tbls:
-            cols_ss = con.execute(text("PRAGMA table_info('service_state')")).fetchall()
-            ss_col_names = {row[1] for row in cols_ss}
-            for name, coltype, dflt in [
-                ("inflight", "INTEGER", "0"),
-                ("max_workers", "INTEGER", "0"),
-                ("current_job_id", "INTEGER", "NULL"),
-                ("current_path", "TEXT", "NULL"),
-                ("current_phase", "TEXT", "NULL"),
-                ("current_progress", "REAL", "NULL"),
-                ("heartbeat_at", "TEXT", "NULL"),
-                ("stuck", "INTEGER", "0"),
-                ("stuck_reason", "TEXT", "NULL"),
-            ]:
-                if name not in ss_col_names:
-                    if dflt == "NULL":
-                        con.execute(text(f"ALTER TABLE service_state ADD COLUMN {name} {coltype}"))
-                    else:
-                        con.execute(text(f"ALTER TABLE service_state ADD COLUMN {name} {coltype} DEFAULT {dflt}"))
-
-        # --- indexes (IF NOT EXISTS is safe) ---
-        # Supplier fast lookups / joins
-        con.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS idx_suppliers_ico_norm ON suppliers(ico_norm)"))
-
-        # Documents filters / sort
-        con.execute(text("CREATE INDEX IF NOT EXISTS idx_documents_issue_date ON documents(issue_date)"))
-        con.execute(text("CREATE INDEX IF NOT EXISTS idx_documents_supplier_ico ON documents(supplier_ico)"))
-        con.execute(text("CREATE INDEX IF NOT EXISTS idx_documents_doc_number ON documents(doc_number)"))
-        con.execute(text("CREATE INDEX IF NOT EXISTS idx_documents_bank_account ON documents(bank_account)"))
-        con.execute(text("CREATE INDEX IF NOT EXISTS idx_documents_requires_review ON documents(requires_review)"))
-        con.execute(text("CREATE INDEX IF NOT EXISTS idx_documents_file_page ON documents(file_id, page_from, page_to)"))
-        # Kompozitní index pro business duplicity (IČO + číslo dokladu + datum).
-        con.execute(text("CREATE INDEX IF NOT EXISTS idx_documents_dup_key ON documents(supplier_ico, doc_number, issue_date)"))
-        # Audit / debug
-        con.execute(text("CREATE INDEX IF NOT EXISTS idx_documents_text_quality ON documents(document_text_quality)"))
-        con.execute(text("CREATE INDEX IF NOT EXISTS idx_documents_extraction_method ON documents(extraction_method)"))
-
-        # Line items foreign key / filtering
-        con.execute(text("CREATE INDEX IF NOT EXISTS idx_line_items_document_id ON items(document_id)"))
-        con.execute(text("CREATE INDEX IF NOT EXISTS idx_line_items_name ON items(name)"))
-        con.execute(text("CREATE INDEX IF NOT EXISTS idx_line_items_ean ON items(ean)"))
-        con.execute(text("CREATE INDEX IF NOT EXISTS idx_line_items_item_code ON items(item_code)"))
-
-        # Import jobs: processing_id_in pro vazbu na zpracovatelskou DB (pokud tabulka existuje)
-        if "import_jobs" in tbls:
-            cols_jobs = con.execute(text("PRAGMA table_info('import_jobs')")).fetchall()
-            job_col_names = {row[1] for row in cols_jobs}
-            if "processing_id_in" not in job_col_names:
-                con.execute(text("ALTER TABLE import_jobs ADD COLUMN processing_id_in INTEGER"))
-                con.execute(text("CREATE INDEX IF NOT EXISTS idx_import_jobs_idin ON import_jobs(processing_id_in)"))
-
-        # Items: technické ID + skupiny + ID účtenky/dodavatele
-        cols_items = con.execute(text("PRAGMA table_info('items')")).fetchall()
-        item_col_names = {row[1] for row in cols_items}
-        if "id_item" not in item_col_names:
-            con.execute(text("ALTER TABLE items ADD COLUMN id_item INTEGER"))
-            con.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS idx_items_id_item ON items(id_item)"))
-            con.execute(text("UPDATE items SET id_item = rowid WHERE id_item IS NULL"))
-        if "id_receipt" not in item_col_names:
-            con.execute(text("ALTER TABLE items ADD COLUMN id_receipt INTEGER"))
-        if "id_supplier" not in item_col_names:
-            con.execute(text("ALTER TABLE items ADD COLUMN id_supplier INTEGER"))
-        _ensure_item_groups_schema(con, item_col_names)
-
-        # Standard receipt templates
+            )), 2)
+            FROM items i WHERE i.document_id = documents.id
+          )),
+          total_vat_amount = COALESCE(total_vat_amount, (
+            CASE
+              WHEN total_with_vat IS NULL THEN NULL
+              ELSE ROUND(total_with_vat - COALESCE((
+                SELECT SUM(COALESCE(i.line_total_net,
+                  CASE
+                    WHEN i.line_total_gross IS NULL THEN NULL
+                    WHEN i.vat_rate IS NULL OR i.vat_rate = 0 THEN i.line_total_gross
+                    ELSE i.line_total_gross / (1.0 + (i.vat_rate / 100.0))
+                  END
+                ))
+                FROM items i WHERE i.document_id = documents.id
+              ), 0.0), 2)
+            END
+          )),
+          doc_type = COALESCE(doc_type, CASE WHEN doc_number IS NULL OR TRIM(doc_number) = '' THEN 'receipt' ELSE 'invoice' END)
+        WHERE total_without_vat IS NULL OR total_vat_amount IS NULL OR doc_type IS NULL
+    """))
+
+    # service_state: observability columns (idempotent) – only if table exists
+    if "service_state" in tbls:
+        _add_missing_columns(con, "service_state", table_cols["service_state"], MIGRATION_PLAN.columns["service_state"])
+
+    # Import jobs: processing_id_in pro vazbu na zpracovatelskou DB (pokud tabulka existuje)
+    if "import_jobs" in tbls:
+        if "processing_id_in" not in table_cols["import_jobs"]:
+            con.execute(text("ALTER TABLE import_jobs ADD COLUMN processing_id_in INTEGER"))
+            deferred_indexes.append("CREATE INDEX IF NOT EXISTS idx_import_jobs_idin ON import_jobs(processing_id_in)")
+        deferred_indexes.append(_IMPORT_JOBS_QUEUED_INDEX_SQL)
+
+    # Items: technické ID + skupiny + ID účtenky/dodavatele
+    if "id_item" not in item_col_names:
+        con.execute(text("ALTER TABLE items ADD COLUMN id_item INTEGER"))
+        con.execute(text("UPDATE items SET id_item = rowid WHERE id_item IS NULL"))
+        deferred_indexes.append("CREATE UNIQUE INDEX IF NOT EXISTS idx_items_id_item ON items(id_item)")
+    if "id_receipt" not in item_col_names:
+        con.execute(text("ALTER TABLE items ADD COLUMN id_receipt INTEGER"))
+    if "id_supplier" not in item_col_names:
+        con.execute(text("ALTER TABLE items ADD COLUMN id_supplier INTEGER"))
+    _ensure_item_groups_schema(con, table_cols)
+
+    # Standard receipt templates
+    con.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS standard_receipt_templates (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT UNIQUE NOT NULL,
+                enabled INTEGER DEFAULT 1 NOT NULL,
+                match_supplier_ico_norm TEXT,
+                match_texts_json TEXT,
+                schema_json TEXT NOT NULL,
+                sample_file_name TEXT,
+                sample_file_sha256 TEXT,
+                sample_file_relpath TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+    )
+    # Tabulka právě založená výše už má všechny sloupce; doplňuje se jen starší existující.
+    if "standard_receipt_templates" in tbls:
+        _add_missing_columns(con, "standard_receipt_templates", table_cols["standard_receipt_templates"], MIGRATION_PLAN.columns["standard_receipt_templates"])
+
+    # Receipts/documents: ID_Uctenky
+    if "id_receipt" not in doc_col_names:
+        con.execute(text("ALTER TABLE documents ADD COLUMN id_receipt INTEGER"))
+        con.execute(text("UPDATE documents SET id_receipt = id WHERE id_receipt IS NULL"))
+        deferred_indexes.append("CREATE UNIQUE INDEX IF NOT EXISTS idx_documents_id_receipt ON documents(id_receipt)")
+
+    # Suppliers: ID_Dodavatele
+    if "id_supplier_ext" not in sup_col_names:
+        con.execute(text("ALTER TABLE suppliers ADD COLUMN id_supplier_ext INTEGER"))
+        con.execute(text("UPDATE suppliers SET id_supplier_ext = id WHERE id_supplier_ext IS NULL"))
+        deferred_indexes.append("CREATE UNIQUE INDEX IF NOT EXISTS idx_suppliers_id_supplier_ext ON suppliers(id_supplier_ext)")
+
+    _backfill_item_links(con)
+
+    # Tvrdá stěna: soubory/doklady bez dodavatele do karantény
+    # (EXISTS končí u prvního dokladu souboru; už zakaranténované soubory se nepřepisují)
+    if "files" in tbls and "documents" in tbls:
         con.execute(
             text(
                 """
-                CREATE TABLE IF NOT EXISTS standard_receipt_templates (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT UNIQUE NOT NULL,
-                    enabled INTEGER DEFAULT 1 NOT NULL,
-                    match_supplier_ico_norm TEXT,
-                    match_texts_json TEXT,
-                    schema_json TEXT NOT NULL,
-                    sample_file_name TEXT,
-                    sample_file_sha256 TEXT,
-                    sample_file_relpath TEXT,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
+                UPDATE files
+                SET status='QUARANTINE'
+                WHERE status IS NOT 'QUARANTINE'
+                  AND EXISTS (
+                    SELECT 1 FROM documents d
+                    WHERE d.file_id = files.id
+                      AND (d.supplier_id IS NULL OR d.supplier_ico IS NULL OR TRIM(COALESCE(d.supplier_ico,''))='')
+                  )
                 """
             )
         )
-        cols_templates = con.execute(text("PRAGMA table_info('standard_receipt_templates')")).fetchall()
-        tmpl_col_names = {row[1] for row in cols_templates}
-        for name, col_type in [
-            ("name", "TEXT"),
-            ("enabled", "INTEGER"),
-            ("match_supplier_ico_norm", "TEXT"),
-            ("match_texts_json", "TEXT"),
-            ("schema_json", "TEXT"),
-            ("sample_file_name", "TEXT"),
-            ("sample_file_sha256", "TEXT"),
-            ("sample_file_relpath", "TEXT"),
-            ("created_at", "TEXT"),
-            ("updated_at", "TEXT"),
-        ]:
-            if name not in tmpl_col_names:
-                con.execute(text(f"ALTER TABLE standard_receipt_templates ADD COLUMN {name} {col_type}"))
-        con.execute(text("CREATE INDEX IF NOT EXISTS idx_standard_receipt_templates_enabled ON standard_receipt_templates(enabled)"))
-        con.execute(text("CREATE INDEX IF NOT EXISTS idx_standard_receipt_templates_match_supplier_ico_norm ON standard_receipt_templates(match_supplier_ico_norm)"))
-        con.execute(text("CREATE INDEX IF NOT EXISTS idx_standard_receipt_templates_name ON standard_receipt_templates(name)"))
-
-        # Receipts/documents: ID_Uctenky
-        cols_docs = con.execute(text("PRAGMA table_info('documents')")).fetchall()
-        doc_col_names = {row[1] for row in cols_docs}
-        if "id_receipt" not in doc_col_names:
-            con.execute(text("ALTER TABLE documents ADD COLUMN id_receipt INTEGER"))
-            con.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS idx_documents_id_receipt ON documents(id_receipt)"))
-            con.execute(text("UPDATE documents SET id_receipt = id WHERE id_receipt IS NULL"))
-
-        # Suppliers: ID_Dodavatele
-        cols_sup = con.execute(text("PRAGMA table_info('suppliers')")).fetchall()
-        sup_col_names = {row[1] for row in cols_sup}
-        if "id_supplier_ext" not in sup_col_names:
-            con.execute(text("ALTER TABLE suppliers ADD COLUMN id_supplier_ext INTEGER"))
-            con.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS idx_suppliers_id_supplier_ext ON suppliers(id_supplier_ext)"))
-            con.execute(text("UPDATE suppliers SET id_supplier_ext = id WHERE id_supplier_ext IS NULL"))
-
-        # Zpětné doplnění id_supplier/id_receipt do items z vazeb (použij prefixy, aby nedošlo ke kolizi)
         con.execute(
             text(
                 """
-                UPDATE items
-                SET
-                  id_receipt = COALESCE(items.id_receipt, d.id_receipt, d.id),
-                  id_supplier = COALESCE(items.id_supplier, d.supplier_id)
-                FROM documents d
-                WHERE d.id = items.document_id
+                UPDATE documents
+                SET requires_review=1,
+                    review_reasons=COALESCE(review_reasons||'; ','') || 'dodavatel_chybi'
+                WHERE (supplier_id IS NULL OR supplier_ico IS NULL OR TRIM(COALESCE(supplier_ico,''))='')
+                  AND COALESCE(review_reasons,'') NOT LIKE '%dodavatel_chybi%'
                 """
             )
         )
 
-        # Tvrdá stěna: soubory/doklady bez dodavatele do karantény
-        if "files" in tbls and "documents" in tbls:
-            con.execute(
-                text(
-                    """
-                    UPDATE files
-                    SET status='QUARANTINE'
-                    WHERE id IN (
-                        SELECT DISTINCT file_id FROM documents
-                        WHERE supplier_id IS NULL OR supplier_ico IS NULL OR TRIM(COALESCE(supplier_ico,''))=''
-                    )
-                    """
-                )
-            )
-            con.execute(
-                text(
-                    """
-                    UPDATE documents
-                    SET requires_review=1,
-                        review_reasons=COALESCE(review_reasons||'; ','') || 'dodavatel_chybi'
-                    WHERE supplier_id IS NULL OR supplier_ico IS NULL OR TRIM(COALESCE(supplier_ico,''))=''
-                    """
-                )
-            )
+    for trigger in MIGRATION_PLAN.fts_triggers:
+        con.execute(trigger)
+    _backfill_fts(con)
+
+    # --- indexes ---
+    # Plánované indexy: jeden dotaz na sqlite_master, CREATE jen pro chybějící. Odložené indexy nových
+    # sloupců chybí vždy (sloupec právě vznikl), jdou rovnou do driveru bez text() konstruktu.
+    # executescript() nelze: sqlite3 před ním COMMITne rozpracovanou migrační transakci.
+    _ensure_indexes(con, MIGRATION_PLAN.indexes)
+    for ddl in deferred_indexes:
+        con.exec_driver_sql(ddl)
+
+    con.execute(_SET_USER_VERSION_SQL)
 
 
-def _ensure_item_groups_schema(con, item_col_names: set[str] | None = None) -> None:
-    cols_items = item_col_names
-    if cols_items is None:
-        cols = con.execute(text("PRAGMA table_info('items')")).fetchall()
-        cols_items = {row[1] for row in cols}
-    if "group_id" not in cols_items:
+def _ensure_item_groups_schema(con, table_cols: dict[str, set[str]] | None = None) -> None:
+    if table_cols is None:
+        table_cols = _table_columns(con, ("items", "item_groups"))
+    if "group_id" not in table_cols.get("items", set()):
         con.execute(text("ALTER TABLE items ADD COLUMN group_id INTEGER"))
+    if "item_groups" in table_cols:
+        return
     con.execute(
         text(
             """
@@ -397,33 +595,89 @@ def _ensure_item_groups_schema(con, item_col_names: set[str] | None = None) -> N
     )
 
 
-def init_db(engine: Engine) -> None:
-    # ensure tables exist
-    Base.metadata.create_all(engine)
+def _create_missing_tables(con, metadata) -> None:
+    # Jeden dotaz na sqlite_master místo has_table() pro každou tabulku v create_all;
+    # na zdravé DB (všechny tabulky existují) se create_all vůbec nevolá.
+    existing = {row[0] for row in con.execute(_TABLE_NAMES_SQL)}
+    missing = [t for name, t in metadata.tables.items() if name not in existing]
+    if missing:
+        metadata.create_all(con, tables=missing)
+
+
+@contextmanager
+def _immediate_transaction(engine: Engine) -> Iterator[Connection]:
+    # pysqlite sám otevírá transakci až před DML, takže DDL by běželo mimo ni a zámek pro zápis
+    # by se bral až uprostřed migrace (riziko SQLITE_BUSY po odvedené práci). Proto ruční
+    # BEGIN IMMEDIATE: zámek hned na začátku, DDL i backfilly atomicky.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as con:
+        # journal_mode nejde měnit uvnitř transakce: WAL zajistit ještě před BEGIN i pro enginy
+        # vytvořené mimo make_engine (ten to dělá v connect listeneru). In-memory DB zůstane 'memory'.
+        mode = str(con.exec_driver_sql("PRAGMA journal_mode").scalar() or "").lower()
+        if mode not in ("wal", "memory"):
+            con.exec_driver_sql("PRAGMA journal_mode=WAL")
+        # SQL funkce pro backfilly; deterministic=True -> SQLite smí výsledek pro stejný vstup znovu použít.
+        con.connection.driver_connection.create_function(
+            "kajovo_norm_ico", 1, _normalize_ico_soft, deterministic=True
+        )
+        con.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            # FK kontroly až při COMMIT (backfilly mohou dočasně odkazovat na ještě nedoplněné řádky).
+            con.exec_driver_sql("PRAGMA defer_foreign_keys=ON")
+            yield con
+        except BaseException:
+            con.exec_driver_sql("ROLLBACK")
+            raise
+        con.exec_driver_sql("COMMIT")
+
+
+def _ensure_planner_stats(con) -> None:
+    # Statistiky pro query planner: plný ANALYZE jen poprvé (bez sqlite_stat1 planner indexy odhaduje naslepo),
+    # dál stačí levný PRAGMA optimize, který přepočítá jen zastaralé tabulky.
+    has_stats = con.execute(_HAS_STAT1_SQL).first()
+    con.execute(_OPTIMIZE_SQL if has_stats else _ANALYZE_SQL)
+
+
+def _ensure_fts_tables(engine: Engine) -> None:
+    # FTS5 virtuální tabulky (+ jejich shadow tabulky) v krátké samostatné transakci před hlavní
+    # migrací, aby nezvětšovaly její WAL/rollback stav. DDL je idempotentní (IF NOT EXISTS),
+    # takže pád hlavní migrace nevadí: příští start ji zopakuje nad již existujícími FTS tabulkami.
+    with _immediate_transaction(engine) as con:
+        if int(con.execute(_USER_VERSION_SQL).scalar_one() or 0) < SCHEMA_VERSION:
+            if con.execute(_LEGACY_ITEMS_FTS_SQL).first() is not None:
+                con.execute(_DROP_ITEMS_FTS_SQL)
+            for ddl in MIGRATION_PLAN.fts_ddl:
+                con.execute(ddl)
 
-    _ensure_columns_and_indexes(engine)
 
-    # ensure singleton rows
-    with engine.begin() as con:
-        con.execute(
-            text(
-                """
-                INSERT OR IGNORE INTO service_state (singleton, running, queue_size, inflight, max_workers, stuck)
-                VALUES (1, 0, 0, 0, 0, 0)
-                """
-            )
-        )
+def init_db(engine: Engine) -> None:
+    # Zbytek inicializace v jedné transakci: jeden commit (jeden WAL sync) a při chybě
+    # se vrátí vše včetně PRAGMA user_version.
+    _ensure_fts_tables(engine)
+    with _immediate_transaction(engine) as con:
+        # ensure tables exist
+        _create_missing_tables(con, Base.metadata)
+        _ensure_columns_and_indexes(con)
+        # ensure singleton rows
+        con.execute(_SERVICE_STATE_SINGLETON_SQL)
+        _ensure_planner_stats(con)
 
 
 def init_working_db(engine: Engine) -> None:
     """Create working DB schema (workflow/operational)."""
-    BaseWorking.metadata.create_all(engine)
     # working DB intentionally omits FTS; keep lean for workflow.
-    with engine.begin() as con:
-        _ensure_item_groups_schema(con)
+    with _immediate_transaction(engine) as con:
+        _create_missing_tables(con, BaseWorking.metadata)
+        if int(con.execute(_USER_VERSION_SQL).scalar_one() or 0) < WORKING_SCHEMA_VERSION:
+            _ensure_item_groups_schema(con)
+            _ensure_indexes(con, MIGRATION_PLAN.working_indexes)
+            con.execute(_SET_WORKING_USER_VERSION_SQL)
+        _ensure_planner_stats(con)
 
 
 def init_production_db(engine: Engine) -> None:
     """Create production DB schema (business/reporting) including FTS tables."""
-    BaseProduction.metadata.create_all(engine)
-    _ensure_columns_and_indexes(engine)
+    _ensure_fts_tables(engine)
+    with _immediate_transaction(engine) as con:
+        _create_missing_tables(con, BaseProduction.metadata)
+        _ensure_columns_and_indexes(con)
+        _ensure_planner_stats(con)
@@ -2,16 +2,16 @@ from __future__ import annotations
 
 import datetime as dt
 
-from kajovospend.utils.time import utc_now_naive
+from kajovospend.utils.time import utc_now_naive_cached
 
 # NOTE: Legacy single-DB models. Dual-DB rollout introduces separate schemas in
 # working_models.py and production_models.py; keep this file for backward compatibility
 # during transition. New code should prefer the split models.
-from sqlalchemy import Boolean, Date, DateTime, Float, ForeignKey, Integer, String, Text, UniqueConstraint, Index
+from sqlalchemy import Boolean, Date, DateTime, Float, ForeignKey, Integer, String, Text, UniqueConstraint, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import List
 
-from .base import Base
+from .base import Base, NFCText
 
 
 class Supplier(Base):
@@ -19,9 +19,9 @@ class Supplier(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     # Canonical IČO (usually 8 digits, but we store whatever upstream provides)
-    ico: Mapped[str] = mapped_column(String(32), unique=True, index=True)
+    ico: Mapped[str] = mapped_column(NFCText(32), unique=True, index=True)
     # Normalized IČO used for fast matching (digits-only, left padded to 8 where applicable)
-    ico_norm: Mapped[str | None] = mapped_column(String(16), unique=True, index=True, nullable=True)
+    ico_norm: Mapped[str | None] = mapped_column(NFCText(16), unique=True, index=True, nullable=True)
     dic: Mapped[str | None] = mapped_column(String(32), nullable=True)
     name: Mapped[str | None] = mapped_column(String(256), nullable=True)
     legal_form: Mapped[str | None] = mapped_column(String(256), nullable=True)
@@ -49,7 +49,7 @@ class DocumentFile(Base):
     current_path: Mapped[str] = mapped_column(Text)
     status: Mapped[str] = mapped_column(String(24), index=True)  # NEW/PROCESSED/QUARANTINE/DUPLICATE/ERROR
     last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
-    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive)
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive_cached)
     processed_at: Mapped[dt.datetime | None] = mapped_column(DateTime, nullable=True)
 
     # one file can contain multiple documents (e.g., multiple receipts in one PDF)
@@ -63,9 +63,9 @@ class Document(Base):
     file_id: Mapped[int] = mapped_column(ForeignKey("files.id"), index=True)
     supplier_id: Mapped[int | None] = mapped_column(ForeignKey("suppliers.id"), nullable=True)
 
-    supplier_ico: Mapped[str | None] = mapped_column(String(16), index=True, nullable=True)
-    doc_number: Mapped[str | None] = mapped_column(String(64), index=True, nullable=True)
-    bank_account: Mapped[str | None] = mapped_column(String(128), nullable=True, index=True)
+    supplier_ico: Mapped[str | None] = mapped_column(NFCText(16), index=True, nullable=True)
+    doc_number: Mapped[str | None] = mapped_column(NFCText(64), index=True, nullable=True)
+    bank_account: Mapped[str | None] = mapped_column(NFCText(128), nullable=True, index=True)
     issue_date: Mapped[dt.date | None] = mapped_column(Date, nullable=True)
     total_with_vat: Mapped[float | None] = mapped_column(Float, nullable=True)
     total_without_vat: Mapped[float | None] = mapped_column(Float, nullable=True)
@@ -87,8 +87,8 @@ class Document(Base):
     requires_review: Mapped[bool] = mapped_column(Boolean, default=False)
     review_reasons: Mapped[str | None] = mapped_column(Text, nullable=True)
 
-    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive)
-    updated_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive, onupdate=utc_now_naive)
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive_cached)
+    updated_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive_cached, onupdate=utc_now_naive_cached)
 
     file: Mapped[DocumentFile] = relationship(back_populates="documents")
     supplier: Mapped[Supplier | None] = relationship(back_populates="documents")
@@ -112,8 +112,8 @@ class StandardReceiptTemplate(Base):
     sample_file_name: Mapped[str | None] = mapped_column(String(256), nullable=True)
     sample_file_sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)
     sample_file_relpath: Mapped[str | None] = mapped_column(Text, nullable=True)
-    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive)
-    updated_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive, onupdate=utc_now_naive)
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive_cached)
+    updated_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive_cached, onupdate=utc_now_naive_cached)
 
     __table_args__ = (
         Index("idx_standard_receipt_templates_enabled", "enabled"),
@@ -156,7 +156,7 @@ class LineItem(Base):
     document_id: Mapped[int] = mapped_column(ForeignKey("documents.id"), index=True)
     line_no: Mapped[int] = mapped_column(Integer)
 
-    name: Mapped[str] = mapped_column(String(512))
+    name: Mapped[str] = mapped_column(NFCText(512))
     quantity: Mapped[float] = mapped_column(Float, default=1.0)
     unit_price: Mapped[float | None] = mapped_column(Float, nullable=True)
     unit_price_net: Mapped[float | None] = mapped_column(Float, nullable=True)
@@ -174,6 +174,8 @@ class LineItem(Base):
 
     __table_args__ = (
         UniqueConstraint("document_id", "line_no", name="uq_items_doc_line"),
+        # Covering index for per-document VAT/total aggregation (answered from the index alone).
+        Index("ix_items_doc_totals", "document_id", "vat_rate", "line_total_net", "line_total_gross", "vat_amount"),
     )
 
 
@@ -182,7 +184,7 @@ class ImportJob(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     processing_id_in: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
-    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive)
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive_cached)
     started_at: Mapped[dt.datetime | None] = mapped_column(DateTime, nullable=True)
     finished_at: Mapped[dt.datetime | None] = mapped_column(DateTime, nullable=True)
 
@@ -191,6 +193,10 @@ class ImportJob(Base):
     status: Mapped[str] = mapped_column(String(24), index=True)  # QUEUED/RUNNING/DONE/ERROR/DUPLICATE/QUARANTINE
     error: Mapped[str | None] = mapped_column(Text, nullable=True)
 
+    __table_args__ = (
+        Index("ix_import_jobs_queued", "created_at", sqlite_where=text("status = 'QUEUED'")),
+    )
+
 
 class ServiceState(Base):
     __tablename__ = "service_state"
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import datetime as dt
+import os
 from pathlib import Path
 
+from kajovospend.utils.time import utc_now_naive_cached
 from sqlalchemy import String, Integer, DateTime, Text
 from sqlalchemy.orm import declarative_base, mapped_column
 
@@ -22,13 +24,21 @@ class IngestFile(BaseProcessing):
     mtime = mapped_column(DateTime, nullable=True)
     job_id = mapped_column(Integer, nullable=True)
     last_error = mapped_column(Text, nullable=True)
-    created_at = mapped_column(DateTime, default=dt.datetime.utcnow, nullable=False)
-    updated_at = mapped_column(DateTime, default=dt.datetime.utcnow, onupdate=dt.datetime.utcnow, nullable=False)
+    created_at = mapped_column(DateTime, default=utc_now_naive_cached, nullable=False)
+    updated_at = mapped_column(DateTime, default=utc_now_naive_cached, onupdate=utc_now_naive_cached, nullable=False)
 
     @classmethod
-    def from_path(cls, path: Path, status: str = "NEW", job_id: int | None = None) -> "IngestFile":
+    def from_path(
+        cls,
+        path: Path,
+        status: str = "NEW",
+        job_id: int | None = None,
+        *,
+        stat_result: os.stat_result | None = None,
+    ) -> "IngestFile":
+        # stat_result: volající, který už stat má (např. z os.scandir), ušetří další syscall.
         try:
-            st = path.stat()
+            st = stat_result if stat_result is not None else os.stat(path)
             size = st.st_size
             mtime = dt.datetime.fromtimestamp(st.st_mtime)
         except Exception:
@@ -1,18 +1,21 @@
 from __future__ import annotations
 
 import os
+import threading
 from pathlib import Path
 from typing import Callable
 
-import warnings
-
-from sqlalchemy import create_engine
-from sqlalchemy.exc import SADeprecationWarning
 from sqlalchemy.orm import sessionmaker
 
 from kajovospend.db.processing_models import BaseProcessing
+from kajovospend.db.session import make_engine
 # Processing DB remains separate from working/production split; unchanged schema.
 
+# Jedna factory (engine + pool, create_all) na DB soubor a proces; uvolnění přes
+# dispose_processing_session_factory ji z cache odebere (např. po obnově/založení nové DB).
+_FACTORY_CACHE: dict[str, sessionmaker] = {}
+_FACTORY_LOCK = threading.Lock()
+
 
 def _processing_db_path(cfg) -> Path:
     try:
@@ -29,11 +32,37 @@ def _processing_db_path(cfg) -> Path:
     return Path("processing.db")
 
 
+def _cache_key(db_path: Path) -> str:
+    try:
+        return str(db_path.resolve())
+    except Exception:
+        return str(db_path.absolute())
+
+
 def create_processing_session_factory(cfg) -> Callable[[], sessionmaker]:
     db_path = _processing_db_path(cfg)
+    key = _cache_key(db_path)
+    with _FACTORY_LOCK:
+        sf = _FACTORY_CACHE.get(key)
+        if sf is None:
+            sf = _build_session_factory(cfg, db_path)
+            sf._cache_key = key  # type: ignore[attr-defined]
+            _FACTORY_CACHE[key] = sf
+    return sf
+
+
+def _build_session_factory(cfg, db_path: Path) -> sessionmaker:
     db_path.parent.mkdir(parents=True, exist_ok=True)
-    url = f"sqlite:///{db_path}"
-    engine = create_engine(url, future=True)
+    perf = cfg.get("performance", {}) if isinstance(cfg, dict) else {}
+    # Stejné PRAGMA jako working/production (WAL, synchronous=NORMAL, busy_timeout, ...):
+    # bez nich každý commit dělá fsync a exkluzivně zamyká soubor.
+    # Processing DB zapisuje hlavně stavy souborů z více workerů: BEGIN IMMEDIATE vezme zápisový zámek
+    # hned na začátku transakce (čeká v busy_timeout) místo SQLITE_BUSY při upgradu čtení -> zápis.
+    engine = make_engine(
+        str(db_path),
+        sqlite_pragmas=bool((perf or {}).get("sqlite_pragmas", True)),
+        begin_immediate=True,
+    )
     BaseProcessing.metadata.create_all(engine)
     sf = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
     # Ulož engine, aby jej bylo možné explicitně uvolnit (Windows locky).
@@ -42,16 +71,19 @@ def create_processing_session_factory(cfg) -> Callable[[], sessionmaker]:
 
 
 def dispose_processing_session_factory(sf) -> None:
-    """Best-effort uvolnění SQLite engine pro processing DB (Windows lock prevention)."""
+    """Best-effort uvolnění SQLite engine pro processing DB (Windows lock prevention).
+
+    Factory se odebere z cache a engine se uvolní (pool zavře nepoužívaná spojení). Sessions
+    se nezavírají: patří svým vlastníkům a Session není thread-safe. Spojení rozpracovaných
+    sessions se zahodí až při jejich vrácení do poolu, takže před mazáním DB souboru musí
+    volající zastavit workery, kteří factory používají.
+    """
+    key = getattr(sf, "_cache_key", None)
+    if key is not None:
+        with _FACTORY_LOCK:
+            if _FACTORY_CACHE.get(key) is sf:
+                del _FACTORY_CACHE[key]
     try:
-        close_fn = getattr(sf, "close_all_sessions", None) or getattr(sf, "close_all", None)
-        if close_fn:
-            try:
-                with warnings.catch_warnings():
-                    warnings.simplefilter("ignore", SADeprecationWarning)
-                    close_fn()
-            except Exception:
-                pass
         bind = getattr(sf, "_engine", None) or getattr(sf, "bind", None)
         if bind is not None:
             bind.dispose()
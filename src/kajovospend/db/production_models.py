@@ -6,7 +6,7 @@ from typing import List
 from sqlalchemy import Boolean, Date, DateTime, Float, ForeignKey, Integer, String, Text, UniqueConstraint, Index
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
-from kajovospend.utils.time import utc_now_naive
+from kajovospend.utils.time import utc_now_naive_cached
 
 
 class BaseProduction(DeclarativeBase):
@@ -65,8 +65,8 @@ class Document(BaseProduction):
     requires_review: Mapped[bool] = mapped_column(Boolean, default=False)
     review_reasons: Mapped[str | None] = mapped_column(Text, nullable=True)
 
-    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive)
-    updated_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive, onupdate=utc_now_naive)
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive_cached)
+    updated_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive_cached, onupdate=utc_now_naive_cached)
 
     supplier: Mapped[Supplier | None] = relationship(back_populates="documents")
     items: Mapped[List["LineItem"]] = relationship(back_populates="document", cascade="all, delete-orphan")  # type: ignore[name-defined]
@@ -117,8 +117,8 @@ class StandardReceiptTemplate(BaseProduction):
     sample_file_name: Mapped[str | None] = mapped_column(String(256), nullable=True)
     sample_file_sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)
     sample_file_relpath: Mapped[str | None] = mapped_column(Text, nullable=True)
-    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive)
-    updated_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive, onupdate=utc_now_naive)
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive_cached)
+    updated_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive_cached, onupdate=utc_now_naive_cached)
 
     __table_args__ = (
         Index("idx_p_standard_receipt_templates_enabled", "enabled"),
@@ -1,25 +1,37 @@
 from __future__ import annotations
 
 import datetime as dt
-import re
+from functools import lru_cache
 from typing import Iterable, Optional
 
-from sqlalchemy import select
+from sqlalchemy import bindparam, insert, select
 from sqlalchemy.orm import Session
 
+from kajovospend.utils.digits import digits_only
 from kajovospend.utils.time import utc_now_naive
+from .supplier_ids import remember_supplier, upsert_supplier_row
 from .production_models import Supplier, Document, LineItem, StandardReceiptTemplate, DocumentPageAudit
 
-_ICO_DIGITS_RE = re.compile(r"\D+")
 
+# Hot-path statementy sestavené jednou při importu modulu (SQLAlchemy je pak bere
+# z compiled cache bez opakovaného skládání konstruktu při každém volání).
+_SUPPLIER_BY_ICO = select(Supplier).where(
+    (Supplier.ico_norm == bindparam("ico_norm")) | (Supplier.ico == bindparam("ico_norm"))
+)
+# ORM bulk INSERT položek: jeden executemany (insertmanyvalues) bez identity map a unit-of-work na řádek.
+_INSERT_ITEMS = insert(LineItem)
 
+
+@lru_cache(maxsize=4096)
 def _normalize_ico_soft(ico: Optional[str]) -> Optional[str]:
     if ico is None:
         return None
+    if type(ico) is str and len(ico) == 8 and ico.isdecimal():
+        return ico  # už normalizované IČO (nejčastější případ)
     raw = str(ico).strip()
     if not raw:
         return None
-    digits = _ICO_DIGITS_RE.sub("", raw)
+    digits = digits_only(raw)
     if not digits:
         return None
     if len(digits) > 8:
@@ -29,11 +41,12 @@ def _normalize_ico_soft(ico: Optional[str]) -> Optional[str]:
 
 def upsert_supplier(session: Session, ico: str, **fields) -> Supplier:
     ico_norm = _normalize_ico_soft(ico) or str(ico).strip()
-    s = session.execute(
-        select(Supplier).where(
-            (Supplier.ico_norm == ico_norm) | (Supplier.ico == ico_norm)
-        )
-    ).scalar_one_or_none()
+    cols = Supplier.__table__.c
+    updates = {"ico": ico_norm, **{k: v for k, v in fields.items() if v is not None and k in cols}}
+    s = upsert_supplier_row(session, Supplier, ico_norm, updates)
+    if s is not None:
+        return s
+    s = session.execute(_SUPPLIER_BY_ICO, {"ico_norm": ico_norm}).scalar_one_or_none()
     if not s:
         s = Supplier(ico=ico_norm, ico_norm=ico_norm)
         session.add(s)
@@ -44,6 +57,7 @@ def upsert_supplier(session: Session, ico: str, **fields) -> Supplier:
         if v is not None:
             setattr(s, k, v)
     session.flush()
+    remember_supplier(session, ico_norm, s.id)
     return s
 
 
@@ -99,8 +113,8 @@ def insert_document_from_working(
     )
     session.add(d)
     session.flush()
-    for wi in work_items:
-        li = LineItem(
+    item_rows = [
+        dict(
             document_id=d.id,
             line_no=wi.line_no,
             name=wi.name,
@@ -118,6 +132,8 @@ def insert_document_from_working(
             item_code=wi.item_code,
             id_item=wi.id_item,
         )
-        session.add(li)
-    session.flush()
+        for wi in work_items
+    ]
+    if item_rows:
+        session.execute(_INSERT_ITEMS, item_rows)
     return d
@@ -1,19 +1,84 @@
 from __future__ import annotations
 
 import datetime as dt
+from functools import lru_cache
 
+from kajovospend.utils.amounts import AMOUNT_TRANS
+from kajovospend.utils.digits import digits_only
 from kajovospend.utils.time import utc_now_naive
-from typing import Iterable, Optional
-import re
+from typing import Iterable, Mapping, Optional
 
-from sqlalchemy import text, select, func
+from sqlalchemy import bindparam, insert, text, select, func, update
 from sqlalchemy.orm import Session
 
+from .migrate import FTS_ITEMS2
+from .heartbeat import service_state_changed
+from .supplier_ids import remember_supplier, upsert_supplier_row
 from .models import Supplier, DocumentFile, Document, LineItem, ImportJob, ServiceState
 
-_ICO_DIGITS_RE = re.compile(r"\D+")
-
 
+# Hot-path statementy sestavené jednou při importu modulu (SQLAlchemy je pak bere
+# z compiled cache bez opakovaného skládání konstruktu při každém volání).
+_SUPPLIER_BY_ICO = select(Supplier).where(
+    (Supplier.ico_norm == bindparam("ico_norm")) | (Supplier.ico == bindparam("ico_norm"))
+)
+_QUEUE_SIZE = select(func.count()).select_from(ImportJob).where(ImportJob.status == "QUEUED")
+# ORM bulk INSERT položek: jeden executemany (insertmanyvalues) bez identity map a unit-of-work na řádek.
+_INSERT_ITEMS = insert(LineItem)
+_BACKFILL_ITEM_IDS = text(
+    """
+    UPDATE items
+    SET
+        id_item = COALESCE(id_item, id),
+        id_receipt = COALESCE(id_receipt, (SELECT COALESCE(id_receipt, id) FROM documents WHERE id = :doc_id)),
+        id_supplier = COALESCE(id_supplier, (SELECT supplier_id FROM documents WHERE id = :doc_id))
+    WHERE document_id = :doc_id
+    """
+)
+_FTS_DOC_DELETE = text("DELETE FROM documents_fts WHERE document_id = :id")
+_FTS_DOC_INSERT = text(
+    "INSERT INTO documents_fts(document_id, supplier_ico, doc_number, bank_account, text) "
+    "SELECT id, COALESCE(supplier_ico, ''), COALESCE(doc_number, ''), COALESCE(bank_account, ''), :t "
+    "FROM documents WHERE id = :id"
+)
+_FTS_ITEMS2_DELETE = text("DELETE FROM items_fts2 WHERE document_id = :id")
+_FTS_ITEMS2_INSERT = text(
+    "INSERT INTO items_fts2(item_id, document_id, item_name, supplier_ico, doc_number) "
+    "SELECT i.id, i.document_id, COALESCE(i.name, ''), COALESCE(d.supplier_ico, ''), COALESCE(d.doc_number, '') "
+    "FROM items i JOIN documents d ON d.id = i.document_id WHERE i.document_id = :id"
+)
+
+_FTS_DOCS_DELETE_MANY = text("DELETE FROM documents_fts WHERE document_id IN :ids").bindparams(
+    bindparam("ids", expanding=True)
+)
+_FTS_ITEMS2_DELETE_MANY = text("DELETE FROM items_fts2 WHERE document_id IN :ids").bindparams(
+    bindparam("ids", expanding=True)
+)
+_FTS_ITEMS2_INSERT_MANY = text(
+    "INSERT INTO items_fts2(item_id, document_id, item_name, supplier_ico, doc_number) "
+    "SELECT i.id, i.document_id, COALESCE(i.name, ''), COALESCE(d.supplier_ico, ''), COALESCE(d.doc_number, '') "
+    "FROM items i JOIN documents d ON d.id = i.document_id WHERE i.document_id IN :ids"
+).bindparams(bindparam("ids", expanding=True))
+_FTS_FULL_REBUILD = (
+    (
+        "items_fts2",
+        text(FTS_ITEMS2),
+        text(
+            "INSERT INTO items_fts2(item_id, document_id, item_name, supplier_ico, doc_number) "
+            "SELECT i.id, i.document_id, COALESCE(i.name, ''), COALESCE(d.supplier_ico, ''), COALESCE(d.doc_number, '') "
+            "FROM items i JOIN documents d ON d.id = i.document_id"
+        ),
+    ),
+)
+_FTS_REBUILD = tuple(
+    text(f"INSERT INTO {name}({name}) VALUES('rebuild')") for name in ("documents_fts", "items_fts")
+)
+_FTS_OPTIMIZE_ALL = tuple(
+    text(f"INSERT INTO {name}({name}) VALUES('optimize')") for name in ("documents_fts", "items_fts", "items_fts2")
+)
+
+
+@lru_cache(maxsize=4096)
 def _normalize_ico_soft(ico: Optional[str]) -> Optional[str]:
     """
     Soft normalizace IČO pro matching v DB:
@@ -24,10 +89,12 @@ def _normalize_ico_soft(ico: Optional[str]) -> Optional[str]:
     """
     if ico is None:
         return None
+    if type(ico) is str and len(ico) == 8 and ico.isdecimal():
+        return ico  # už normalizované IČO (nejčastější případ)
     raw = str(ico).strip()
     if not raw:
         return None
-    digits = _ICO_DIGITS_RE.sub("", raw)
+    digits = digits_only(raw)
     if not digits:
         return None
     if len(digits) > 8:
@@ -59,12 +126,31 @@ def upsert_supplier(
 
     ico_norm = _normalize_ico_soft(ico) or str(ico).strip()
 
-    # Fast path: indexed lookup by normalized key (no full table scan).
-    s = session.execute(
-        select(Supplier).where(
-            (Supplier.ico_norm == ico_norm) | (Supplier.ico == ico_norm)
-        )
-    ).scalar_one_or_none()
+    fields = {
+        "name": name,
+        "dic": dic,
+        "legal_form": legal_form,
+        "address": address,
+        "street": street,
+        "street_number": street_number,
+        "orientation_number": orientation_number,
+        "city": city,
+        "zip_code": zip_code,
+        "is_vat_payer": is_vat_payer,
+    }
+    updates = {"ico": ico_norm, **{k: v for k, v in fields.items() if overwrite or v is not None}}
+    if ares_last_sync is not None:
+        updates["ares_last_sync"] = ares_last_sync
+    if pending_ares is not None:
+        updates["pending_ares"] = bool(pending_ares)
+
+    # Fast path: jediný INSERT ... ON CONFLICT(ico_norm) DO UPDATE ... RETURNING (žádný SELECT předem).
+    # UPDATE jen pokud se některá hodnota liší -> opakovaný ARES sync beze změn nezapisuje do WAL.
+    s = upsert_supplier_row(session, Supplier, ico_norm, updates)
+    if s is not None:
+        return s
+
+    s = session.execute(_SUPPLIER_BY_ICO, {"ico_norm": ico_norm}).scalar_one_or_none()
 
     if not s:
         s = Supplier(ico=ico_norm, ico_norm=ico_norm)
@@ -94,23 +180,29 @@ def upsert_supplier(
         s.pending_ares = bool(pending_ares)
 
     session.flush()
+    remember_supplier(session, ico_norm, s.id)
     return s
 
 
 def _to_float(v, default: float = 0.0) -> float:
+    # Výstup extrakce (JSON) nese čísla většinou už jako float -> vrátit beze změny, bez dalších kontrol.
+    if type(v) is float:
+        return v
     if v is None:
         return float(default)
     if isinstance(v, (int, float)):
         return float(v)
     try:
-        s = str(v).strip().replace("\xa0", " ").replace(" ", "").replace(",", ".")
-        if not s:
-            return float(default)
-        return float(s)
+        return float(str(v).translate(AMOUNT_TRANS))
     except Exception:
         return float(default)
 
 
+def _opt_float(v) -> float | None:
+    # None zůstává None (hodnota chybí), jinak tolerantní převod s fallbackem 0.0.
+    return None if v is None else _to_float(v, 0.0)
+
+
 def _infer_doc_type(doc_number: str | None) -> str:
     s = str(doc_number or "").strip()
     return "invoice" if s else "receipt"
@@ -119,10 +211,8 @@ def _infer_doc_type(doc_number: str | None) -> str:
 def _to_str(v, max_len: int) -> str | None:
     if v is None:
         return None
-    s = str(v).strip()
-    if not s:
-        return None
-    return s[:max_len]
+    s = (v if type(v) is str else str(v)).strip()
+    return s[:max_len] or None
 
 
 def create_file_record(session: Session, sha256: str, original_name: str, path: str, pages: int, status: str,
@@ -151,62 +241,32 @@ def add_document(session: Session, file_id: int, supplier_id: int | None, suppli
                  total_vat_amount: float | None = None,
                  vat_breakdown_json: str | None = None,
                  processing_profile: str | None = None) -> Document:
-    doc_type = _infer_doc_type(doc_number)
-
-    d = Document(
-        file_id=file_id,
-        supplier_id=supplier_id,
-        supplier_ico=supplier_ico,
-        doc_number=doc_number,
-        bank_account=bank_account,
-        issue_date=issue_date,
-        total_with_vat=total_with_vat,
-        total_without_vat=total_without_vat,
-        total_vat_amount=total_vat_amount,
-        vat_breakdown_json=vat_breakdown_json,
-        currency=currency,
-        extraction_confidence=confidence,
-        extraction_method=method,
-        requires_review=requires_review,
-        review_reasons=review_reasons,
-        page_from=int(page_from or 1),
-        page_to=(int(page_to) if page_to is not None else None),
-        doc_type=doc_type,
-        processing_profile=processing_profile,
-    )
-    session.add(d)
-    session.flush()
-    line_no = 1
     sum_net = 0.0
     sum_gross = 0.0
     has_any_net = False
     has_any_gross = False
+    item_rows: list[dict] = []
 
-    for it in items:
-        qty = _to_float(it.get("quantity"), 1.0)
-        if qty == 0.0:
-            qty = 1.0
-
-        vat_rate = _to_float(it.get("vat_rate"), 0.0)
-
-        unit_price_legacy = it.get("unit_price")
-        unit_price_legacy_f = None if unit_price_legacy is None else _to_float(unit_price_legacy, 0.0)
-        line_total_legacy = _to_float(it.get("line_total"), 0.0)
+    # Skalární smyčka zůstává záměrně (ne NumPy): doklady mají typicky desítky položek a
+    # round() na 2 místa musí dávat přesně stejné hodnoty jako dosud.
+    for line_no, it in enumerate(items, 1):
+        get = it.get
+        qty = _to_float(get("quantity"), 1.0) or 1.0  # 0 -> 1
+        vat_rate = _to_float(get("vat_rate"), 0.0)
+        vat_factor = 1.0 + vat_rate / 100.0 if vat_rate > 0 else None
 
-        unit_price_net = it.get("unit_price_net")
-        unit_price_net_f = None if unit_price_net is None else _to_float(unit_price_net, 0.0)
-        unit_price_gross = it.get("unit_price_gross")
-        unit_price_gross_f = None if unit_price_gross is None else _to_float(unit_price_gross, 0.0)
-        line_total_net = it.get("line_total_net")
-        line_total_net_f = None if line_total_net is None else _to_float(line_total_net, 0.0)
-        line_total_gross = it.get("line_total_gross")
-        line_total_gross_f = None if line_total_gross is None else _to_float(line_total_gross, 0.0)
+        unit_price_net_f = _opt_float(get("unit_price_net"))
+        unit_price_gross_f = _opt_float(get("unit_price_gross"))
+        line_total_net_f = _opt_float(get("line_total_net"))
+        line_total_gross_f = _opt_float(get("line_total_gross"))
 
         # Kompatibilita: legacy mapování dle zadání.
-        if unit_price_net_f is None and unit_price_legacy_f is not None:
-            unit_price_net_f = unit_price_legacy_f
-        if line_total_gross_f is None and line_total_legacy != 0.0:
-            line_total_gross_f = line_total_legacy
+        if unit_price_net_f is None:
+            unit_price_net_f = _opt_float(get("unit_price"))
+        if line_total_gross_f is None:
+            line_total_legacy = _to_float(get("line_total"), 0.0)
+            if line_total_legacy != 0.0:
+                line_total_gross_f = line_total_legacy
 
         # Deterministické dopočty z dostupných dat.
         if line_total_net_f is None and unit_price_net_f is not None:
@@ -214,123 +274,168 @@ def add_document(session: Session, file_id: int, supplier_id: int | None, suppli
         if line_total_gross_f is None and unit_price_gross_f is not None:
             line_total_gross_f = round(unit_price_gross_f * qty, 2)
         if line_total_gross_f is None and line_total_net_f is not None:
-            line_total_gross_f = round(line_total_net_f * (1.0 + vat_rate / 100.0), 2) if vat_rate > 0 else round(line_total_net_f, 2)
+            line_total_gross_f = round(line_total_net_f * vat_factor, 2) if vat_factor else round(line_total_net_f, 2)
         if line_total_net_f is None and line_total_gross_f is not None:
-            line_total_net_f = round(line_total_gross_f / (1.0 + vat_rate / 100.0), 2) if vat_rate > 0 else round(line_total_gross_f, 2)
+            line_total_net_f = round(line_total_gross_f / vat_factor, 2) if vat_factor else round(line_total_gross_f, 2)
 
-        if unit_price_gross_f is None and line_total_gross_f is not None and qty != 0.0:
+        if unit_price_gross_f is None and line_total_gross_f is not None:
             unit_price_gross_f = round(line_total_gross_f / qty, 4)
-        if unit_price_net_f is None and line_total_net_f is not None and qty != 0.0:
+        if unit_price_net_f is None and line_total_net_f is not None:
             unit_price_net_f = round(line_total_net_f / qty, 4)
 
-        vat_amount = it.get("vat_amount")
-        vat_amount_f = None if vat_amount is None else _to_float(vat_amount, 0.0)
+        vat_amount_f = _opt_float(get("vat_amount"))
         if vat_amount_f is None and (line_total_gross_f is not None and line_total_net_f is not None):
             vat_amount_f = round(line_total_gross_f - line_total_net_f, 2)
 
-        li = LineItem(
-            document_id=d.id,
+        item_rows.append(dict(
             line_no=line_no,
-            name=str(it.get("name") or "").strip()[:512] or f"Položka {line_no}",
+            name=str(get("name") or "").strip()[:512] or f"Položka {line_no}",
             quantity=qty,
             unit_price=unit_price_net_f,
             vat_rate=vat_rate,
             line_total=round(line_total_gross_f, 2) if line_total_gross_f is not None else 0.0,
-            ean=_to_str(it.get("ean"), 64),
-            item_code=_to_str(it.get("item_code"), 64),
+            ean=_to_str(get("ean"), 64),
+            item_code=_to_str(get("item_code"), 64),
             unit_price_net=unit_price_net_f,
             unit_price_gross=unit_price_gross_f,
             line_total_net=line_total_net_f,
             line_total_gross=line_total_gross_f,
             vat_amount=vat_amount_f,
-            vat_code=_to_str(it.get("vat_code"), 32),
-        )
-        session.add(li)
-        line_no += 1
+            vat_code=_to_str(get("vat_code"), 32),
+        ))
 
         if line_total_net_f is not None:
-            sum_net += float(line_total_net_f)
+            sum_net += line_total_net_f
             has_any_net = True
         if line_total_gross_f is not None:
-            sum_gross += float(line_total_gross_f)
+            sum_gross += line_total_gross_f
             has_any_gross = True
 
-    # Dokumentové agregáty (deterministické, kompatibilní se stávajícím total_with_vat).
-    if d.total_without_vat is None:
-        d.total_without_vat = round(sum_net, 2) if has_any_net else None
-    if d.total_with_vat is None and has_any_gross:
-        d.total_with_vat = round(sum_gross, 2)
-    if d.total_vat_amount is None and d.total_with_vat is not None and d.total_without_vat is not None:
-        d.total_vat_amount = round(float(d.total_with_vat) - float(d.total_without_vat), 2)
+    # Dokumentové agregáty (deterministické, kompatibilní se stávajícím total_with_vat) se spočtou
+    # předem, takže doklad jde do DB jediným INSERTem (bez druhého flush + UPDATE documents).
+    if total_without_vat is None:
+        total_without_vat = round(sum_net, 2) if has_any_net else None
+    if total_with_vat is None and has_any_gross:
+        total_with_vat = round(sum_gross, 2)
+    if total_vat_amount is None and total_with_vat is not None and total_without_vat is not None:
+        total_vat_amount = round(float(total_with_vat) - float(total_without_vat), 2)
 
+    doc_type = _infer_doc_type(doc_number)
+
+    d = Document(
+        file_id=file_id,
+        supplier_id=supplier_id,
+        supplier_ico=supplier_ico,
+        doc_number=doc_number,
+        bank_account=bank_account,
+        issue_date=issue_date,
+        total_with_vat=total_with_vat,
+        total_without_vat=total_without_vat,
+        total_vat_amount=total_vat_amount,
+        vat_breakdown_json=vat_breakdown_json,
+        currency=currency,
+        extraction_confidence=confidence,
+        extraction_method=method,
+        requires_review=requires_review,
+        review_reasons=review_reasons,
+        page_from=int(page_from or 1),
+        page_to=(int(page_to) if page_to is not None else None),
+        doc_type=doc_type,
+        processing_profile=processing_profile,
+    )
+    session.add(d)
     session.flush()
+    # ORM Document zůstává (volající s ním dál pracují); položky jdou hromadným INSERTem.
+    for row in item_rows:
+        row["document_id"] = d.id
+    if item_rows:
+        session.execute(_INSERT_ITEMS, item_rows)
 
     # Backfill produkčních identifikátorů (legacy sloupce mimo ORM mapování).
     try:
-        session.execute(
-            text(
-                """
-                UPDATE items
-                SET
-                    id_item = COALESCE(id_item, id),
-                    id_receipt = COALESCE(id_receipt, (SELECT COALESCE(id_receipt, id) FROM documents WHERE id = :doc_id)),
-                    id_supplier = COALESCE(id_supplier, (SELECT supplier_id FROM documents WHERE id = :doc_id))
-                WHERE document_id = :doc_id
-                """
-            ),
-            {"doc_id": int(d.id)},
-        )
+        session.execute(_BACKFILL_ITEM_IDS, {"doc_id": int(d.id)})
     except Exception:
         pass
     return d
 
 
 def rebuild_fts_for_document(session: Session, doc_id: int, full_text: str) -> None:
-    # Remove existing
-    session.execute(text("DELETE FROM documents_fts WHERE document_id = :id"), {"id": doc_id})
-    # Insert
-    row = session.execute(select(Document).where(Document.id == doc_id)).scalar_one()
-    session.execute(
-        text("INSERT INTO documents_fts(document_id, supplier_ico, doc_number, bank_account, text) VALUES(:id,:ico,:dn,:ba,:t)"),
-        {"id": doc_id, "ico": row.supplier_ico or "", "dn": row.doc_number or "", "ba": row.bank_account or "", "t": full_text or ""},
-    )
-    session.execute(text("DELETE FROM items_fts WHERE document_id = :id"), {"id": doc_id})
-    items = session.execute(select(LineItem).where(LineItem.document_id == doc_id)).scalars().all()
-    for it in items:
-        session.execute(text("INSERT INTO items_fts(document_id, item_name) VALUES(:id,:name)"), {"id": doc_id, "name": it.name})
+    # Každá FTS tabulka: DELETE + jediný INSERT ... SELECT přímo z documents/items
+    # (žádné načítání ORM objektů ani INSERT po řádcích). items_fts je external-content
+    # nad items a drží ho v souladu triggery z migrace.
+    # Vše běží v transakci volajícího (jeden commit); čekající ORM změny se vyprázdní jednou
+    # předem a jednotlivé příkazy už autoflush nespouštějí.
+    params = {"id": doc_id}
+    session.flush()
+    with session.no_autoflush:
+        session.execute(_FTS_DOC_DELETE, params)
+        session.execute(_FTS_DOC_INSERT, {"id": doc_id, "t": full_text or ""})
 
-    # Optional richer FTS for per-item search (used by UI tab "POLOŽKY").
-    # Keep backward compatibility with DBs that don't have items_fts2.
-    try:
-        session.execute(text("DELETE FROM items_fts2 WHERE document_id = :id"), {"id": doc_id})
-        for it in items:
-            session.execute(
-                text(
-                    "INSERT INTO items_fts2(item_id, document_id, item_name, supplier_ico, doc_number) "
-                    "VALUES(:iid,:did,:name,:ico,:dn)"
-                ),
-                {
-                    "iid": int(it.id),
-                    "did": int(doc_id),
-                    "name": it.name or "",
-                    "ico": row.supplier_ico or "",
-                    "dn": row.doc_number or "",
-                },
-            )
-    except Exception:
-        pass
+        # Optional richer FTS for per-item search (used by UI tab "POLOŽKY").
+        # Keep backward compatibility with DBs that don't have items_fts2.
+        try:
+            session.execute(_FTS_ITEMS2_DELETE, params)
+            session.execute(_FTS_ITEMS2_INSERT, params)
+        except Exception:
+            pass
+
+
+def rebuild_fts_for_documents(session: Session, full_texts: Mapping[int, str | None]) -> None:
+    """Dávková varianta rebuild_fts_for_document pro celý importní job ({doc_id: plný text}).
+
+    Jeden DELETE ... IN a jeden INSERT na FTS tabulku místo N dvojic, takže FTS5 zapíše jeden
+    segment místo N malých. Plný text dokladu v DB uložen není, proto jde documents_fts přes
+    executemany jednoho připraveného INSERT ... SELECT.
+
+    Zatím jen API pro legacy DB s FTS tabulkami (údržba / skripty): služba zapisuje do working DB,
+    kde FTS neexistuje a working_queries.rebuild_fts_for_document je no-op, takže ji nic v
+    importní cestě nevolá.
+    """
+    if not full_texts:
+        return
+    ids = {"ids": [int(doc_id) for doc_id in full_texts]}
+    session.flush()
+    with session.no_autoflush:
+        session.execute(_FTS_DOCS_DELETE_MANY, ids)
+        session.execute(_FTS_DOC_INSERT, [{"id": int(doc_id), "t": t or ""} for doc_id, t in full_texts.items()])
+        try:
+            session.execute(_FTS_ITEMS2_DELETE_MANY, ids)
+            session.execute(_FTS_ITEMS2_INSERT_MANY, ids)
+        except Exception:
+            pass
+
+
+def rebuild_all_fts(session: Session) -> None:
+    """Plný přestavbový průchod FTS (údržba / velký reindex), v transakci volajícího.
+
+    items_fts2 se zahodí a naplní znovu jedním INSERT ... SELECT (DELETE by u FTS5 přepisoval
+    posting listy řádek po řádku). items_fts (external content nad items) i documents_fts (OCR text
+    drží jen sám v sobě) přestaví index příkazem 'rebuild'. Nakonec se segmenty sloučí ('optimize').
+    """
+    for name, ddl, fill in _FTS_FULL_REBUILD:
+        session.execute(text(f"DROP TABLE IF EXISTS {name}"))
+        session.execute(ddl)
+        session.execute(fill)
+    for stmt in _FTS_REBUILD:
+        session.execute(stmt)
+    for stmt in _FTS_OPTIMIZE_ALL:
+        session.execute(stmt)
 
 
 def update_service_state(session: Session, **kwargs) -> None:
-    s = session.get(ServiceState, 1)
-    if not s:
-        s = ServiceState(singleton=1)
-    for k, v in kwargs.items():
-        if hasattr(s, k):
-            setattr(s, k, v)
-    s.last_seen = utc_now_naive()
-    session.add(s)
+    # Jediný podmíněný UPDATE singletonu (bez předchozího SELECTu); INSERT jen pokud řádek ještě neexistuje.
+    cols = ServiceState.__table__.c
+    values = {k: v for k, v in kwargs.items() if k in cols}
+    values["last_seen"] = utc_now_naive()
+    if session.execute(
+        update(ServiceState)
+        .where(ServiceState.singleton == 1, service_state_changed(cols, values))
+        .values(**values)
+    ).rowcount:
+        return
+    if session.get(ServiceState, 1) is None:
+        session.add(ServiceState(singleton=1, **values))
 
 
 def queue_size(session: Session) -> int:
-    return session.execute(select(func.count()).select_from(ImportJob).where(ImportJob.status == "QUEUED")).scalar_one()
+    return session.execute(_QUEUE_SIZE).scalar_one()
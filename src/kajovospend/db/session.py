@@ -2,42 +2,86 @@ from __future__ import annotations
 
 from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 
 
-def make_engine(db_path: str):
+def make_engine(db_path: str, *, sqlite_pragmas: bool = True, pool_size: int = 5, begin_immediate: bool = False):
     # SQLite tuned for large-ish local datasets (10k+ documents, 100k+ items).
+    # sqlite_pragmas=False keeps only safety/concurrency PRAGMAs (synchronous stays FULL)
+    # for deployments that prefer durability over write throughput
+    # (config: performance.sqlite_pragmas).
+    # begin_immediate=True is for writer-dominated engines: every transaction starts with
+    # BEGIN IMMEDIATE, so the write lock is taken up front (waiting in busy_timeout) instead of
+    # a read transaction failing with SQLITE_BUSY when it later tries to upgrade to a write.
+    # Pooled connections keep their page cache warm and run the PRAGMAs once per connection.
+    # A local SQLite file never goes stale like a network connection, so pre-ping would only
+    # add a SELECT 1 to every checkout (every `with sf() as session`).
     eng = create_engine(
         f"sqlite:///{db_path}",
         future=True,
-        pool_pre_ping=True,
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=10,
+        pool_pre_ping=False,
         connect_args={"check_same_thread": False, "timeout": 30},
     )
 
     @event.listens_for(eng, "connect")
     def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        if begin_immediate:
+            # pysqlite must not emit its own deferred BEGIN; the "begin" listener below does it.
+            dbapi_connection.isolation_level = None
         try:
             cur = dbapi_connection.cursor()
             # Safety + concurrency
             cur.execute("PRAGMA foreign_keys=ON")
-            cur.execute("PRAGMA journal_mode=WAL")
-            cur.execute("PRAGMA synchronous=NORMAL")
+            # journal_mode is persistent in the DB file: switching needs an exclusive lock,
+            # so only do it when the file is not in WAL yet (first open / legacy DB).
+            mode = cur.execute("PRAGMA journal_mode").fetchone()
+            if not mode or str(mode[0]).lower() != "wal":
+                if sqlite_pragmas:
+                    # page_size only takes effect on a still-empty file and must precede WAL;
+                    # existing DBs keep their page size until an explicit VACUUM (outside WAL).
+                    cur.execute("PRAGMA page_size=8192")
+                cur.execute("PRAGMA journal_mode=WAL")
             cur.execute("PRAGMA busy_timeout=5000")
-            # Performance
-            cur.execute("PRAGMA temp_store=MEMORY")
-            cur.execute("PRAGMA cache_size=-200000")  # ~200MB page cache (negative = KB)
-            cur.execute("PRAGMA mmap_size=268435456")  # 256MB (best-effort)
+            if sqlite_pragmas:
+                cur.execute("PRAGMA synchronous=NORMAL")
+                # fewer checkpoints during import bursts; checkpoint_wal() truncates on shutdown
+                cur.execute("PRAGMA wal_autocheckpoint=10000")
+                # Performance
+                cur.execute("PRAGMA temp_store=MEMORY")
+                cur.execute("PRAGMA cache_size=-200000")  # ~200MB page cache (negative = KB)
+                cur.execute("PRAGMA mmap_size=268435456")  # 256MB (best-effort)
+                cur.execute("PRAGMA threads=4")  # helper threads for large sorts (ORDER BY / CREATE INDEX)
             cur.execute("PRAGMA optimize")
             cur.close()
         except Exception:
             # Never crash the app due to PRAGMA failures (older SQLite builds, etc.)
             pass
 
+    if begin_immediate:
+        @event.listens_for(eng, "begin")
+        def _begin_immediate(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
     return eng
 
 
+def checkpoint_wal(engine) -> None:
+    """Best-effort WAL checkpoint (TRUNCATE) on graceful shutdown, so other processes
+    opening the DB see a compact main file instead of replaying a large -wal."""
+    try:
+        with engine.connect() as con:
+            con.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    except Exception:
+        pass
+
+
 def make_session_factory(engine):
     sf = sessionmaker(bind=engine, expire_on_commit=False, future=True)
     # back-compat helpers (sqlalchemy 2.x hides .bind)
     sf.bind = engine  # type: ignore[attr-defined]
     sf._engine = engine  # type: ignore[attr-defined]
     return sf
+
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+from sqlalchemy import or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+# Procesový LRU {(DB scope, ico_norm) -> suppliers.id}, sdílený upserty dodavatelů ve všech DB vrstvách.
+# Id dodavatele se nemění, takže upsert, který nic nezměnil (RETURNING nevrátí řádek), dohledá záznam
+# přes session.get (identity map / primární klíč) místo SELECT podle IČO.
+_SUPPLIER_ID_CACHE: "OrderedDict[tuple[str, str], int]" = OrderedDict()
+_SUPPLIER_ID_CACHE_MAX = 2048
+_SUPPLIER_ID_LOCK = threading.Lock()
+_DB_SCOPES: "weakref.WeakKeyDictionary[object, str]" = weakref.WeakKeyDictionary()
+
+
+def _db_scope(bind) -> str:
+    # Souborová DB: rozřešená cesta (cache přežije nový engine nad stejným souborem).
+    # In-memory DB mají všechny URL "sqlite://" -> každý engine má vlastní scope.
+    with _SUPPLIER_ID_LOCK:
+        scope = _DB_SCOPES.get(bind)
+    if scope is None:
+        db = bind.url.database
+        scope = os.path.realpath(db) if db and db != ":memory:" else f"mem:{id(bind)}"
+        with _SUPPLIER_ID_LOCK:
+            _DB_SCOPES[bind] = scope
+    return scope
+
+
+def supplier_cache_key(session: Session, ico_norm: str) -> tuple[str, str]:
+    bind = session.get_bind()
+    return (_db_scope(getattr(bind, "engine", bind)), ico_norm)
+
+
+def remember_supplier_id(key: tuple[str, str], supplier_id: int | None) -> None:
+    if supplier_id is None:
+        return
+    with _SUPPLIER_ID_LOCK:
+        _SUPPLIER_ID_CACHE[key] = int(supplier_id)
+        _SUPPLIER_ID_CACHE.move_to_end(key)
+        while len(_SUPPLIER_ID_CACHE) > _SUPPLIER_ID_CACHE_MAX:
+            _SUPPLIER_ID_CACHE.popitem(last=False)
+
+
+def remember_supplier(session: Session, ico_norm: str, supplier_id: int | None) -> None:
+    remember_supplier_id(supplier_cache_key(session, ico_norm), supplier_id)
+
+
+def cached_supplier(session: Session, model, key: tuple[str, str]):
+    """Vrátí dodavatele `model` podle id z cache, nebo None (pak volající dohledá přes IČO)."""
+    with _SUPPLIER_ID_LOCK:
+        supplier_id = _SUPPLIER_ID_CACHE.get(key)
+    if supplier_id is None:
+        return None
+    s = session.get(model, supplier_id)
+    if s is None or s.ico_norm != key[1]:
+        # Záznam mezitím zmizel (rollback, smazání, jiná DB na stejné cestě) -> zapomenout a dohledat přes IČO.
+        with _SUPPLIER_ID_LOCK:
+            _SUPPLIER_ID_CACHE.pop(key, None)
+        return None
+    return s
+
+
+def upsert_supplier_row(session: Session, model, ico_norm: str, updates: dict):
+    """Jeden INSERT ... ON CONFLICT(ico_norm) DO UPDATE ... RETURNING místo SELECT + INSERT/UPDATE.
+
+    Společné pro working, production i legacy `Supplier` (`model`). UPDATE se provede jen pokud se
+    některá hodnota liší (WHERE ... IS NOT excluded.*), jinak nevzniká zápis do WAL a řádek se vezme
+    z cache id. Vrací None, pokud řádek z cache neznáme nebo konflikt nastal na jiném unikátním klíči
+    (legacy řádek dohledatelný jen přes `ico`); volající pak pokračuje lookupem přes IČO a po flush
+    zavolá remember_supplier.
+    """
+    key = supplier_cache_key(session, ico_norm)
+    ins = sqlite_insert(model).values(ico_norm=ico_norm, **updates)
+    cols = model.__table__.c
+    stmt = ins.on_conflict_do_update(
+        index_elements=[cols.ico_norm],
+        set_=updates,
+        where=or_(*[cols[k].is_distinct_from(ins.excluded[k]) for k in updates]),
+    ).returning(model)
+    # Čekající ORM změny se vyprázdní zvlášť: jejich IntegrityError patří volajícímu a nesmí
+    # skončit v except níže (session by pak padala na PendingRollbackError bez původní příčiny).
+    session.flush()
+    try:
+        with session.no_autoflush:
+            s = session.scalars(stmt, execution_options={"populate_existing": True}).one_or_none()
+    except IntegrityError as exc:
+        # Jen konflikt na legacy unikátním `ico`; jiné porušení integrity propaguj.
+        if not str(exc.orig).endswith(f"{model.__table__.name}.ico"):
+            raise
+        return None
+    if s is not None:
+        remember_supplier_id(key, s.id)
+        return s
+    return cached_supplier(session, model, key)
@@ -3,10 +3,10 @@ from __future__ import annotations
 import datetime as dt
 from typing import List
 
-from sqlalchemy import Boolean, Date, DateTime, Float, ForeignKey, Integer, String, Text, UniqueConstraint, Index
+from sqlalchemy import Boolean, Date, DateTime, Float, ForeignKey, Integer, String, Text, UniqueConstraint, Index, text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
-from kajovospend.utils.time import utc_now_naive
+from kajovospend.utils.time import utc_now_naive_cached
 
 
 class BaseWorking(DeclarativeBase):
@@ -46,7 +46,7 @@ class DocumentFile(BaseWorking):
     current_path: Mapped[str] = mapped_column(Text)
     status: Mapped[str] = mapped_column(String(24), index=True)
     last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
-    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive)
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive_cached)
     processed_at: Mapped[dt.datetime | None] = mapped_column(DateTime, nullable=True)
 
     documents: Mapped[List["Document"]] = relationship(back_populates="file", cascade="all, delete-orphan")  # type: ignore[name-defined]
@@ -81,8 +81,8 @@ class Document(BaseWorking):
     requires_review: Mapped[bool] = mapped_column(Boolean, default=False)
     review_reasons: Mapped[str | None] = mapped_column(Text, nullable=True)
 
-    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive)
-    updated_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive, onupdate=utc_now_naive)
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive_cached)
+    updated_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive_cached, onupdate=utc_now_naive_cached)
 
     file: Mapped[DocumentFile] = relationship(back_populates="documents")
     supplier: Mapped[Supplier | None] = relationship(back_populates="documents")
@@ -126,7 +126,7 @@ class ImportJob(BaseWorking):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     processing_id_in: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
-    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive)
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=utc_now_naive_cached)
     started_at: Mapped[dt.datetime | None] = mapped_column(DateTime, nullable=True)
     finished_at: Mapped[dt.datetime | None] = mapped_column(DateTime, nullable=True)
 
@@ -135,6 +135,10 @@ class ImportJob(BaseWorking):
     status: Mapped[str] = mapped_column(String(24), index=True)
     error: Mapped[str | None] = mapped_column(Text, nullable=True)
 
+    __table_args__ = (
+        Index("ix_import_jobs_queued", "created_at", sqlite_where=text("status = 'QUEUED'")),
+    )
+
 
 class ServiceState(BaseWorking):
     __tablename__ = "service_state"
@@ -1,25 +1,41 @@
 from __future__ import annotations
 
 import datetime as dt
-import re
+from functools import lru_cache
 from typing import Iterable, Optional
 
-from sqlalchemy import select
+from sqlalchemy import bindparam, func, insert, select, update
 from sqlalchemy.orm import Session
 
+from kajovospend.utils.digits import digits_only
 from kajovospend.utils.time import utc_now_naive
+from .heartbeat import service_state_changed
+from .supplier_ids import remember_supplier, upsert_supplier_row
 from .working_models import Supplier, DocumentFile, Document, LineItem, ImportJob, ServiceState
 
-_ICO_DIGITS_RE = re.compile(r"\D+")
 
+# Hot-path statementy sestavené jednou při importu modulu (SQLAlchemy je pak bere
+# z compiled cache bez opakovaného skládání konstruktu při každém volání).
+_SUPPLIER_BY_ICO = select(Supplier).where(
+    (Supplier.ico_norm == bindparam("ico_norm")) | (Supplier.ico == bindparam("ico_norm"))
+)
+_QUEUE_SIZE = select(func.count()).select_from(ImportJob).where(ImportJob.status == "QUEUED")
+# ORM bulk INSERT položek: jeden executemany (insertmanyvalues) bez identity map a unit-of-work na řádek.
+_INSERT_ITEMS = insert(LineItem)
+# Hromadný INSERT hlaviček dokladů; id se vrací v pořadí vstupních parametrů (insertmanyvalues).
+_INSERT_DOCUMENTS_RETURNING_ID = insert(Document).returning(Document.id, sort_by_parameter_order=True)
 
+
+@lru_cache(maxsize=4096)
 def _normalize_ico_soft(ico: Optional[str]) -> Optional[str]:
     if ico is None:
         return None
+    if type(ico) is str and len(ico) == 8 and ico.isdecimal():
+        return ico  # už normalizované IČO (nejčastější případ)
     raw = str(ico).strip()
     if not raw:
         return None
-    digits = _ICO_DIGITS_RE.sub("", raw)
+    digits = digits_only(raw)
     if not digits:
         return None
     if len(digits) > 8:
@@ -27,13 +43,15 @@ def _normalize_ico_soft(ico: Optional[str]) -> Optional[str]:
     return digits.zfill(8)
 
 
-def upsert_supplier(session: Session, ico: str, **fields) -> Supplier:
+def upsert_supplier(session: Session, ico: str, *, write_none: bool = False, **fields) -> Supplier:
+    # write_none=True zapíše i None hodnoty (ruční editace dodavatele), jinak se None ignorují.
     ico_norm = _normalize_ico_soft(ico) or str(ico).strip()
-    s = session.execute(
-        select(Supplier).where(
-            (Supplier.ico_norm == ico_norm) | (Supplier.ico == ico_norm)
-        )
-    ).scalar_one_or_none()
+    cols = Supplier.__table__.c
+    updates = {"ico": ico_norm, **{k: v for k, v in fields.items() if (write_none or v is not None) and k in cols}}
+    s = upsert_supplier_row(session, Supplier, ico_norm, updates)
+    if s is not None:
+        return s
+    s = session.execute(_SUPPLIER_BY_ICO, {"ico_norm": ico_norm}).scalar_one_or_none()
     if not s:
         s = Supplier(ico=ico_norm, ico_norm=ico_norm)
         session.add(s)
@@ -41,9 +59,10 @@ def upsert_supplier(session: Session, ico: str, **fields) -> Supplier:
         s.ico = ico_norm
         s.ico_norm = ico_norm
     for k, v in fields.items():
-        if v is not None:
+        if (write_none or v is not None) and k in cols:
             setattr(s, k, v)
     session.flush()
+    remember_supplier(session, ico_norm, s.id)
     return s
 
 
@@ -62,18 +81,43 @@ def create_file_record(session: Session, sha256: str, original_name: str, path:
     return f
 
 
-def add_document(session: Session, file_id: int, supplier_id: int | None, supplier_ico: str | None,
-                 doc_number: str | None, bank_account: str | None, issue_date, total_with_vat: float | None,
-                 currency: str, confidence: float, method: str, requires_review: bool, review_reasons: str | None,
-                 items: Iterable[dict],
-                 *,
-                 page_from: int = 1,
-                 page_to: int | None = None,
-                 total_without_vat: float | None = None,
-                 total_vat_amount: float | None = None,
-                 vat_breakdown_json: str | None = None,
-                 processing_profile: str | None = None) -> Document:
-    d = Document(
+def _item_rows(document_id: int, items: Iterable[dict]) -> list[dict]:
+    rows: list[dict] = []
+    for line_no, it in enumerate(items, 1):
+        qty = float(it.get("quantity") or 1.0)
+        if qty == 0.0:
+            qty = 1.0
+        rows.append(dict(
+            document_id=document_id,
+            line_no=line_no,
+            name=str(it.get("name") or "")[:512],
+            quantity=qty,
+            unit_price=it.get("unit_price"),
+            unit_price_net=it.get("unit_price_net"),
+            unit_price_gross=it.get("unit_price_gross"),
+            vat_rate=float(it.get("vat_rate") or 0.0),
+            line_total=float(it.get("line_total") or 0.0),
+            line_total_net=it.get("line_total_net"),
+            line_total_gross=it.get("line_total_gross"),
+            vat_amount=it.get("vat_amount"),
+            vat_code=it.get("vat_code"),
+            ean=it.get("ean"),
+            item_code=it.get("item_code"),
+        ))
+    return rows
+
+
+def _document_values(file_id: int, supplier_id: int | None, supplier_ico: str | None,
+                     doc_number: str | None, bank_account: str | None, issue_date, total_with_vat: float | None,
+                     currency: str, confidence: float, method: str, requires_review: bool, review_reasons: str | None,
+                     *,
+                     page_from: int = 1,
+                     page_to: int | None = None,
+                     total_without_vat: float | None = None,
+                     total_vat_amount: float | None = None,
+                     vat_breakdown_json: str | None = None,
+                     processing_profile: str | None = None) -> dict:
+    return dict(
         file_id=file_id,
         supplier_id=supplier_id,
         supplier_ico=supplier_ico,
@@ -94,53 +138,75 @@ def add_document(session: Session, file_id: int, supplier_id: int | None, suppli
         doc_type="invoice" if doc_number else "receipt",
         processing_profile=processing_profile,
     )
+
+
+def add_document(session: Session, file_id: int, supplier_id: int | None, supplier_ico: str | None,
+                 doc_number: str | None, bank_account: str | None, issue_date, total_with_vat: float | None,
+                 currency: str, confidence: float, method: str, requires_review: bool, review_reasons: str | None,
+                 items: Iterable[dict],
+                 *,
+                 page_from: int = 1,
+                 page_to: int | None = None,
+                 total_without_vat: float | None = None,
+                 total_vat_amount: float | None = None,
+                 vat_breakdown_json: str | None = None,
+                 processing_profile: str | None = None) -> Document:
+    d = Document(**_document_values(
+        file_id, supplier_id, supplier_ico, doc_number, bank_account, issue_date, total_with_vat,
+        currency, confidence, method, requires_review, review_reasons,
+        page_from=page_from,
+        page_to=page_to,
+        total_without_vat=total_without_vat,
+        total_vat_amount=total_vat_amount,
+        vat_breakdown_json=vat_breakdown_json,
+        processing_profile=processing_profile,
+    ))
     session.add(d)
     session.flush()
-    line_no = 1
-    for it in items:
-        qty = float(it.get("quantity") or 1.0)
-        if qty == 0.0:
-            qty = 1.0
-        vat_rate = float(it.get("vat_rate") or 0.0)
-        line_total = float(it.get("line_total") or 0.0)
-        li = LineItem(
-            document_id=d.id,
-            line_no=line_no,
-            name=str(it.get("name") or "")[:512],
-            quantity=qty,
-            unit_price=it.get("unit_price"),
-            unit_price_net=it.get("unit_price_net"),
-            unit_price_gross=it.get("unit_price_gross"),
-            vat_rate=vat_rate,
-            line_total=line_total,
-            line_total_net=it.get("line_total_net"),
-            line_total_gross=it.get("line_total_gross"),
-            vat_amount=it.get("vat_amount"),
-            vat_code=it.get("vat_code"),
-            ean=it.get("ean"),
-            item_code=it.get("item_code"),
-        )
-        session.add(li)
-        line_no += 1
-    session.flush()
+    item_rows = _item_rows(d.id, items)
+    if item_rows:
+        session.execute(_INSERT_ITEMS, item_rows)
     return d
 
 
-def update_service_state(session: Session, **kwargs) -> ServiceState:
-    st = session.get(ServiceState, 1)
-    if not st:
-        st = ServiceState(singleton=1)
-        session.add(st)
-    for k, v in kwargs.items():
-        setattr(st, k, v)
-    session.flush()
-    return st
+def add_documents_bulk(session: Session, docs: Iterable[dict]) -> list[int]:
+    """Vloží více dokladů najednou: jeden INSERT documents ... RETURNING id a jeden INSERT položek.
+
+    Každý prvek `docs` nese stejné argumenty jako add_document (včetně `items`). Bez ORM objektů
+    a identity map; transakci řídí volající (jeden commit = jeden WAL sync).
+    Vrací id dokladů ve stejném pořadí jako `docs`.
+    """
+    docs = list(docs)
+    if not docs:
+        return []
+    headers = [_document_values(**{k: v for k, v in d.items() if k != "items"}) for d in docs]
+    ids = list(session.scalars(_INSERT_DOCUMENTS_RETURNING_ID, headers))
+    item_rows = [row for doc_id, d in zip(ids, docs) for row in _item_rows(doc_id, d.get("items") or ())]
+    if item_rows:
+        session.execute(_INSERT_ITEMS, item_rows)
+    return ids
+
+
+def update_service_state(session: Session, **kwargs) -> None:
+    # Jediný podmíněný UPDATE singletonu (bez předchozího SELECTu); INSERT jen pokud řádek ještě neexistuje.
+    cols = ServiceState.__table__.c
+    values = {k: v for k, v in kwargs.items() if k in cols}
+    if values and session.execute(
+        update(ServiceState)
+        .where(ServiceState.singleton == 1, service_state_changed(cols, values))
+        .values(**values)
+    ).rowcount:
+        return
+    if session.get(ServiceState, 1) is None:
+        session.add(ServiceState(singleton=1, **values))
+        session.flush()
 
 
 def queue_size(session: Session) -> int:
-    return int(session.execute(select(func.count()).select_from(ImportJob).where(ImportJob.status == "QUEUED")).scalar_one())
+    return int(session.execute(_QUEUE_SIZE).scalar_one())
 
 
-def rebuild_fts_for_document(session: Session, doc_id: int, text_content: str | None = None) -> None:
+def rebuild_fts_for_document(session: Session, doc_id: int, full_text: str | None = None) -> None:
     # Working DB does not maintain FTS; no-op placeholder for compatibility.
+    # Signatura odpovídá db.queries.rebuild_fts_for_document (volající předávají full_text=...).
     return
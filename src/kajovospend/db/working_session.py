@@ -9,8 +9,8 @@ from kajovospend.db.session import make_engine, make_session_factory
 from kajovospend.db.working_models import BaseWorking
 
 
-def create_working_engine(db_path: Path | str):
-    return make_engine(str(db_path))
+def create_working_engine(db_path: Path | str, *, sqlite_pragmas: bool = True):
+    return make_engine(str(db_path), sqlite_pragmas=sqlite_pragmas)
 
 
 def create_working_session_factory(db_path: Path | str) -> Callable[[], sessionmaker]:
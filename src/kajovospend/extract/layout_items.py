@@ -5,6 +5,8 @@ from dataclasses import dataclass
 from statistics import median
 from typing import Iterable, List, Optional, Sequence
 
+from kajovospend.utils.amounts import AMOUNT_TRANS as _AMOUNT_TRANS
+
 
 @dataclass
 class LayoutOcrItem:
@@ -16,6 +18,7 @@ class LayoutOcrItem:
 _AMOUNT_RE = re.compile(r"^-?\d[\d\s]*[.,]\d{2}$")
 _NUMBER_RE = re.compile(r"^-?\d+(?:[.,]\d+)?$")
 _VAT_RE = re.compile(r"^(\d{1,2})(?:\s*%)?$")
+_CURRENCY_SUFFIX_RE = re.compile(r"\s*(Kč|CZK|EUR)$", re.IGNORECASE)
 
 
 def _f(v: str | float | int | None, default: float = 0.0) -> float:
@@ -23,11 +26,8 @@ def _f(v: str | float | int | None, default: float = 0.0) -> float:
         return float(default)
     if isinstance(v, (int, float)):
         return float(v)
-    s = str(v).strip().replace("\xa0", " ").replace(" ", "").replace(",", ".")
-    if not s:
-        return float(default)
     try:
-        return float(s)
+        return float(str(v).translate(_AMOUNT_TRANS))
     except Exception:
         return float(default)
 
@@ -36,15 +36,22 @@ def _norm_token(t: str) -> str:
     return str(t or "").strip().replace("\xa0", " ")
 
 
+def _numeric_lead(tt: str) -> bool:
+    # Všechny číselné regexy začínají na -?\d; slovní tokeny (většina OCR řádku)
+    # tak odmítneme podle prvního znaku bez spouštění regexu.
+    first = tt[:1]
+    return first == "-" or first.isdigit()
+
+
 def _is_amount_token(t: str) -> bool:
-    tt = _norm_token(t)
-    tt = re.sub(r"\s*(Kč|CZK|EUR)$", "", tt, flags=re.IGNORECASE)
-    return bool(_AMOUNT_RE.match(tt))
+    return _parse_amount_token(t) is not None
 
 
 def _parse_amount_token(t: str) -> Optional[float]:
     tt = _norm_token(t)
-    tt = re.sub(r"\s*(Kč|CZK|EUR)$", "", tt, flags=re.IGNORECASE)
+    if not _numeric_lead(tt):
+        return None
+    tt = _CURRENCY_SUFFIX_RE.sub("", tt)
     if not _AMOUNT_RE.match(tt):
         return None
     return _f(tt, 0.0)
@@ -52,7 +59,7 @@ def _parse_amount_token(t: str) -> Optional[float]:
 
 def _parse_qty_token(t: str) -> Optional[float]:
     tt = _norm_token(t)
-    if not _NUMBER_RE.match(tt):
+    if not _numeric_lead(tt) or not _NUMBER_RE.match(tt):
         return None
     q = _f(tt, 0.0)
     if q <= 0:
@@ -64,6 +71,8 @@ def _parse_qty_token(t: str) -> Optional[float]:
 
 def _parse_vat_token(t: str) -> Optional[float]:
     tt = _norm_token(t).replace(" ", "")
+    if not tt[:1].isdigit():
+        return None
     m = _VAT_RE.match(tt)
     if not m:
         return None
@@ -95,15 +104,21 @@ def _cluster_rows(items: Sequence[LayoutOcrItem]) -> List[List[tuple[float, floa
 
     rows.sort(key=lambda r: r[0])
     buckets: List[List[tuple[float, float, float, float, str, float]]] = []
+    # průběžný součet yc posledního řádku (stejné pořadí sčítání jako sum()),
+    # ať se průměr nepočítá znovu přes celý bucket pro každý token
+    last_sum = 0.0
     for r in rows:
         if not buckets:
             buckets.append([r])
+            last_sum = r[0]
             continue
-        last_y = float(sum(x[0] for x in buckets[-1]) / max(1, len(buckets[-1])))
+        last_y = last_sum / len(buckets[-1])
         if abs(r[0] - last_y) <= tol:
             buckets[-1].append(r)
+            last_sum += r[0]
         else:
             buckets.append([r])
+            last_sum = r[0]
 
     for b in buckets:
         b.sort(key=lambda x: x[1])
@@ -123,49 +138,37 @@ def _row_to_item(row: List[tuple[float, float, float, float, str, float]], vat_d
     if not toks:
         return None
 
-    amount_positions = [(i, _parse_amount_token(tok)) for i, tok in enumerate(toks)]
-    amount_positions = [(i, v) for i, v in amount_positions if v is not None]
+    # Každý token klasifikujeme jen jednou; následné průchody už jen čtou
+    # předpočítané hodnoty místo opakovaného regex parsování.
+    amounts = [_parse_amount_token(tok) for tok in toks]
+    amount_positions = [(i, v) for i, v in enumerate(amounts) if v is not None]
     if not amount_positions:
         return None
 
     # rightmost amount bereme jako line_total (gross)
     gross_idx, gross_val = amount_positions[-1]
+    qtys = [_parse_qty_token(tok) for tok in toks[:gross_idx]]
+    vats = [_parse_vat_token(tok) for tok in toks[:gross_idx]]
 
-    vat_rate: Optional[float] = None
+    qty: Optional[float] = None
     qty_idx: Optional[int] = None
-    for i, tok in enumerate(toks):
-        if i >= gross_idx:
-            break
-        if _is_amount_token(tok):
-            continue
-        q = _parse_qty_token(tok)
-        if q is not None:
-            qty_idx = i
+    for i, q in enumerate(qtys):
+        if amounts[i] is None and q is not None:
+            qty, qty_idx = q, i
             break
 
-    for i in range(max(0, gross_idx - 1), -1, -1):
-        tok = toks[i]
-        vr = _parse_vat_token(tok)
+    vat_rate: Optional[float] = None
+    for i in range(gross_idx - 1, -1, -1):
+        vr = vats[i]
         if vr is None:
             continue
         # nepřepisuj qty sloupec jako VAT (typicky první malé číslo vlevo)
-        if qty_idx is not None and i == qty_idx and _norm_token(tok) in {"1", "2", "3", "4", "5"}:
+        if i == qty_idx and _norm_token(toks[i]) in {"1", "2", "3", "4", "5"}:
             continue
         vat_rate = vr
         break
     if vat_rate is None:
         vat_rate = vat_default
-
-    qty: Optional[float] = None
-    for i, tok in enumerate(toks):
-        if i >= gross_idx:
-            break
-        if _is_amount_token(tok):
-            continue
-        q = _parse_qty_token(tok)
-        if q is not None:
-            qty = q
-            break
     if qty is None:
         qty = 1.0
 
@@ -178,14 +181,12 @@ def _row_to_item(row: List[tuple[float, float, float, float, str, float]], vat_d
         unit_gross = gross_val / qty if qty else gross_val
 
     # name = text před číselnou částí
-    name_toks: List[str] = []
-    stop_i = min(gross_idx, amount_positions[0][0] if amount_positions else gross_idx)
-    for i, tok in enumerate(toks):
-        if i >= stop_i:
-            break
-        if _parse_qty_token(tok) is not None or _is_amount_token(tok) or _parse_vat_token(tok) is not None:
-            continue
-        name_toks.append(tok)
+    stop_i = min(gross_idx, amount_positions[0][0])
+    name_toks = [
+        toks[i]
+        for i in range(stop_i)
+        if qtys[i] is None and amounts[i] is None and vats[i] is None
+    ]
     name = " ".join(name_toks).strip() or "Položka"
 
     unit_net = unit_gross / (1.0 + vat_rate / 100.0) if vat_rate > 0 else unit_gross
@@ -8,6 +8,8 @@ from typing import List, Optional, Tuple, Dict, Iterable, Sequence
 from dateutil import parser as dtparser
 
 from kajovospend.extract.vat_math import compute_document_totals, compute_item_derivations
+from kajovospend.utils.digits import digits_only
+from kajovospend.utils.amounts import AMOUNT_TRANS as _AMOUNT_TRANS
 from kajovospend.utils.amount_correction import (
     parse_amount_candidates,
     validate_candidates_against_invariant,
@@ -36,7 +38,6 @@ class Extracted:
 
 _amount_re = re.compile(r"(-?\d+[\d\s]*[.,]\d{2})")
 _ICO_CTX_RE = re.compile(r"\b(IČO|ICO|IČ)\b", re.IGNORECASE)
-_ICO_DIGITS_RE = re.compile(r"\D+")
 
 # Časté mapování DPH písmenem na účtenkách (není univerzální, ale pomáhá u velké části CZ retail).
 _VAT_LETTER_MAP: Dict[str, float] = {"A": 21.0, "B": 15.0, "C": 10.0}
@@ -56,6 +57,90 @@ _STOP_ITEMS_RE = re.compile(
     re.IGNORECASE,
 )
 
+# Vzory pro extract_from_text / _extract_* (kompilované jednou při importu, ne při každém dokladu).
+_SUPPLIER_SECTION_RE = re.compile(r"(?is)Dodavatel.*?(?:Odběratel|ODBĚRATEL|Odběratel:|ODBĚRATEL:)", re.IGNORECASE)
+_ICO_LABEL_VALUE_RE = re.compile(r"(?i)(?:IČO|ICO|IČ)\s*[:#]?\s*(\d{8})\b")
+_ICO_GLUED_RE = re.compile(r"(?i)\b(\d{8})\s*(?:IČO|ICO|IČ)\s*[:#]\s*")
+_EIGHT_DIGITS_RE = re.compile(r"(\d{8})")
+
+_DOC_NO_PATS = (
+    # explicitní daňový doklad / faktura
+    re.compile(r"Variabiln[ií]\s+symbol\s*[: ]\s*(\d{3,})\b", re.IGNORECASE),
+    re.compile(r"Č[ií]slo\s+faktury[^:\n]{0,40}[: ]\s*(\d{3,})\b", re.IGNORECASE),
+    re.compile(r"DAŇOVÝ\s+DOKLAD\s+č\.?\s*([A-Z0-9][A-Z0-9/-]{2,})\b", re.IGNORECASE),
+    re.compile(r"DAŇOVÝ\s+DOKLAD\s*[-–]\s*(\d{4,})\b", re.IGNORECASE),
+    re.compile(r"Č[ií]slo\s+faktury\s*[: ]\s*([A-Z0-9][\w/-]{2,})", re.IGNORECASE),
+    re.compile(r"Faktura\s+č[ií]slo\s*[: ]\s*([A-Z0-9][\w/-]{2,})", re.IGNORECASE),
+    re.compile(r"Faktura\s*-?\s*daňový\s+doklad\s+č\.?\s*([\w/-]+)", re.IGNORECASE),
+    re.compile(r"Faktura\s*#\s*(\d{6,})\b", re.IGNORECASE),
+
+    # Money S3: "variabilní:\n24202896"
+    re.compile(r"\bvariabiln[ií]\s*:\s*\n?\s*(\d{3,})\b", re.IGNORECASE),
+
+    # účtenky
+    re.compile(r"Ú?čtenka\s+č[ií]slo\s*[: ]\s*(\d{3,})\b", re.IGNORECASE),
+    re.compile(r"Doklad\s+č[ií]slo\s*[: ]\s*(\d{3,})\b", re.IGNORECASE),
+
+    # VS
+    re.compile(r"\bVS\s*[: ]\s*(\d{3,})\b", re.IGNORECASE),
+    re.compile(r"\bV\.?\s*S\.?\s*[: ]\s*(\d{3,})\b", re.IGNORECASE),
+    re.compile(r"\bV\s+S\s*[: ]\s*(\d{3,})\b", re.IGNORECASE),
+
+    # SIKO: "2011001146č.Daňový doklad - FAKTURA"
+    re.compile(r"\b(\d{6,})\s*č\.?\s*Daňov", re.IGNORECASE),
+    re.compile(r"\b(\d{6,})č\.\s*Daňov", re.IGNORECASE),
+)
+_DOC_NO_CODE_RE = re.compile(r"\b([A-Z]{1,6}-\d{2,}(?:/\d{2,4})?)\b")
+_DOC_NO_DIGITS_RE = re.compile(r"\d{6,12}")
+
+_BANK_PATS = (
+    re.compile(r"\bIBAN\s*[: ]\s*([A-Z]{2}\d{2}[A-Z0-9]{10,})\b"),
+    re.compile(r"\bÚčet\s*[: ]\s*(\d{6,}-?\d{2,}/\d{4})\b", re.IGNORECASE),
+    re.compile(r"\b(\d{6,}-?\d{2,})\s*/\s*(\d{4})\b"),
+)
+_DATE_PATS = (
+    re.compile(r"Datum\s+vystaven[ií]\s*[: ]\s*([0-9]{1,2}\.\s*[0-9]{1,2}\.\s*[0-9]{2,4})", re.IGNORECASE),
+    re.compile(r"Datum\s+vystaven[ií]\s*[: ]\s*(\d{1,2}\.\s*[A-Za-zÁČĎÉĚÍŇÓŘŠŤÚŮÝŽáčďéěíňóřšťúůýž]+\s*\d{4})", re.IGNORECASE),
+    re.compile(r"Datum\s*[: ]\s*([0-9]{1,2}\.\s*[0-9]{1,2}\.\s*[0-9]{2,4})", re.IGNORECASE),
+    # Účtenky často mají datum bez labelu, někdy i s časem (čas ignorujeme)
+    re.compile(r"\b([0-9]{1,2}\.[0-9]{1,2}\.[0-9]{2,4})\b"),
+    re.compile(r"\b([0-9]{2}/[0-9]{2}/[0-9]{4})\b"),
+)
+_CURRENCY_EUR_RE = re.compile(r"\bEUR\b")
+_TOTAL_PATS = (
+    re.compile(r"CELKEM\s+K\s+ÚHRADĚ\s*\n?\s*([0-9\s]+[.,][0-9]{2})", re.IGNORECASE),
+    re.compile(r"Celkem\s+k\s+úhradě\s*[: ]\s*([0-9\s]+[.,][0-9]{2})", re.IGNORECASE),
+    re.compile(r"K\s+zaplacení\s+celkem\s+EUR\s*([0-9\s]+[.,][0-9]{2})", re.IGNORECASE),
+    re.compile(r"Cena\s+celkem\s*([0-9\s]+[.,][0-9]{2})", re.IGNORECASE),
+    re.compile(r"Koruna\s+česká\s+Kč\s*([0-9\s]+[.,][0-9]{2})", re.IGNORECASE),
+    # Účtenky: "Celkem 68,20" / "PRODEJ 68,20 Kč"
+    re.compile(r"\bCelkem\s*[: ]\s*([0-9\s]+[.,][0-9]{2})\b", re.IGNORECASE),
+    re.compile(r"Celkem\s+v\s+\w+.*?([0-9\s]+[.,][0-9]{2})", re.IGNORECASE),
+    re.compile(r"\bPRODEJ\s*([0-9\s]+[.,][0-9]{2})\b", re.IGNORECASE),
+    # tolerantnější "Celkem k úhradě" bez dvojtečky, s textem mezi
+    re.compile(r"\bCelkem\s+k\s+úhradě\b[^\d\-]{0,40}([0-9][0-9\s]*[.,][0-9]{2})\b", re.IGNORECASE),
+    re.compile(r"\bCelkem\s+k\s+uhradě\b[^\d\-]{0,40}([0-9][0-9\s]*[.,][0-9]{2})\b", re.IGNORECASE),
+)
+_VAT_PERCENT_RE = re.compile(r"\b(\d{1,2})%\b")
+_BETTER_HOTEL_ROW_RE = re.compile(
+    r"(?P<net>\d+[\s\d]*[.,]\d{2})\s*CZK\s+(?P<qty>\d+(?:[.,]\d+)?)\s+(?P<net_total>\d+[\s\d]*[.,]\d{2})\s*CZK\s+(?P<gross>\d+[\s\d]*[.,]\d{2})\s*CZK",
+    re.IGNORECASE,
+)
+_BETTER_HOTEL_HEADER_RE = re.compile(r"^(POLOŽKA|CENA|POČET|CELKEM|DPH|DODAVATEL|ODBĚRATEL)\b", re.IGNORECASE)
+_REC_PAT = re.compile(r"^(?P<name>[A-ZÁČĎÉĚÍŇÓŘŠŤÚŮÝŽ0-9 .,'/-]{3,})\s*$")
+_QTY_PRICE_PAT = re.compile(
+    r"^(?P<qty>\d+(?:[.,]\d+)?)\s*[xX]\s*(?P<unit>\d+[\s\d]*[.,]\d{2}).*?(?P<total>\d+[\s\d]*[.,]\d{2})\s*(?P<vat_letter>[A-Z])?\s*$"
+)
+# single-line: "Název 1 x 12,90 12,90" / "Název 2ks 19,00 38,00"
+_SINGLE_LINE_ITEM_RE = re.compile(
+    r"^\s*(?P<name>[^0-9]{3,}?)\s+"
+    r"(?P<qty>\d+(?:[.,]\d+)?)\s*(?:x|ks|KUS|PCS|pc|×)?\s*"
+    r"(?P<unit>\d[\d\s]*[.,]\d{2})\s+"
+    r"(?P<total>\d[\d\s]*[.,]\d{2})\s*$",
+    re.IGNORECASE,
+)
+_REC_SKIP_RE = re.compile(r"(Celkem|DPH|Datum|Děkujeme|Kč|EUR|IBAN)", re.IGNORECASE)
+
 def _lines(text: str) -> List[str]:
     return [ln.replace("\xa0", " ").rstrip("\r") for ln in (text or "").splitlines()]
 
@@ -123,13 +208,13 @@ def _extract_supplier_ico(text: str) -> Optional[str]:
     - umí label na dalším řádku i "nalepené" vzory (12345678IČ:)
     """
     t = text or ""
-    section_re = re.compile(r"(?is)Dodavatel.*?(?:Odběratel|ODBĚRATEL|Odběratel:|ODBĚRATEL:)", re.IGNORECASE)
+    section_re = _SUPPLIER_SECTION_RE
 
     # 1) explicitní label (same-line / next-line)
     raw = _find_value_after_label_lines(
         t,
         labels=("IČO", "ICO", "IČ"),
-        value_re=re.compile(r"(?i)(?:IČO|ICO|IČ)\s*[:#]?\s*(\d{8})\b"),
+        value_re=_ICO_LABEL_VALUE_RE,
         max_lookahead_lines=2,
         section_hint_re=section_re,
     )
@@ -137,7 +222,7 @@ def _extract_supplier_ico(text: str) -> Optional[str]:
         return _normalize_ico_soft(raw)
 
     # 2) nalepené "12345678IČ:" / "12345678IČO:" (typicky SIKO PDF)
-    m = re.search(r"(?i)\b(\d{8})\s*(?:IČO|ICO|IČ)\s*[:#]\s*", t)
+    m = _ICO_GLUED_RE.search(t)
     if m:
         return _normalize_ico_soft(m.group(1))
 
@@ -145,7 +230,7 @@ def _extract_supplier_ico(text: str) -> Optional[str]:
     raw2 = _find_value_after_label_lines(
         t,
         labels=("Dodavatel",),
-        value_re=re.compile(r"(\d{8})"),
+        value_re=_EIGHT_DIGITS_RE,
         max_lookahead_lines=6,
         section_hint_re=section_re,
     )
@@ -154,47 +239,20 @@ def _extract_supplier_ico(text: str) -> Optional[str]:
 
 def _extract_doc_number(text: str) -> Optional[str]:
     t = text or ""
-    doc_no = _find_first([
-        # explicitní daňový doklad / faktura
-        re.compile(r"Variabiln[ií]\s+symbol\s*[: ]\s*(\d{3,})\b", re.IGNORECASE),
-        re.compile(r"Č[ií]slo\s+faktury[^:\n]{0,40}[: ]\s*(\d{3,})\b", re.IGNORECASE),
-        re.compile(r"DAŇOVÝ\s+DOKLAD\s+č\.?\s*([A-Z0-9][A-Z0-9/-]{2,})\b", re.IGNORECASE),
-        re.compile(r"DAŇOVÝ\s+DOKLAD\s*[-–]\s*(\d{4,})\b", re.IGNORECASE),
-        re.compile(r"Č[ií]slo\s+faktury\s*[: ]\s*([A-Z0-9][\w/-]{2,})", re.IGNORECASE),
-        re.compile(r"Faktura\s+č[ií]slo\s*[: ]\s*([A-Z0-9][\w/-]{2,})", re.IGNORECASE),
-        re.compile(r"Faktura\s*-?\s*daňový\s+doklad\s+č\.?\s*([\w/-]+)", re.IGNORECASE),
-        re.compile(r"Faktura\s*#\s*(\d{6,})\b", re.IGNORECASE),
-
-
-        # Money S3: "variabilní:\n24202896"
-        re.compile(r"\bvariabiln[ií]\s*:\s*\n?\s*(\d{3,})\b", re.IGNORECASE),
-
-        # účtenky
-        re.compile(r"Ú?čtenka\s+č[ií]slo\s*[: ]\s*(\d{3,})\b", re.IGNORECASE),
-        re.compile(r"Doklad\s+č[ií]slo\s*[: ]\s*(\d{3,})\b", re.IGNORECASE),
-
-        # VS
-        re.compile(r"\bVS\s*[: ]\s*(\d{3,})\b", re.IGNORECASE),
-        re.compile(r"\bV\.?\s*S\.?\s*[: ]\s*(\d{3,})\b", re.IGNORECASE),
-        re.compile(r"\bV\s+S\s*[: ]\s*(\d{3,})\b", re.IGNORECASE),
-
-        # SIKO: "2011001146č.Daňový doklad - FAKTURA"
-        re.compile(r"\b(\d{6,})\s*č\.?\s*Daňov", re.IGNORECASE),
-        re.compile(r"\b(\d{6,})č\.\s*Daňov", re.IGNORECASE),
-    ], t)
+    doc_no = _find_first(_DOC_NO_PATS, t)
     if doc_no:
         return doc_no.strip()
 
     # DZV-996/2024 apod. – často v horní části
     top = "\n".join(_lines(t)[:40])
-    m = re.search(r"\b([A-Z]{1,6}-\d{2,}(?:/\d{2,4})?)\b", top)
+    m = _DOC_NO_CODE_RE.search(top)
     if m:
         return m.group(1).strip()
 
     # fallback: samostatné číslo 6-12 znaků v horní části
     for ln in _lines(top):
         s = (ln or "").strip()
-        if re.fullmatch(r"\d{6,12}", s):
+        if _DOC_NO_DIGITS_RE.fullmatch(s):
             return s
     return None
 
@@ -334,11 +392,7 @@ def _canonicalize_items_to_unit_net_and_line_gross(
 
 
 def _norm_amount(s: str) -> float:
-    s = s.replace("\xa0", " ")
-    s = s.strip()
-    s = s.replace(" ", "")
-    s = s.replace(",", ".")
-    return float(s)
+    return float(s.translate(_AMOUNT_TRANS))
 
 def _parse_number(s: str) -> Optional[float]:
     """
@@ -346,7 +400,7 @@ def _parse_number(s: str) -> Optional[float]:
     Vrací None při nevalidním vstupu.
     """
     try:
-        return float(str(s).replace("\xa0", " ").strip().replace(" ", "").replace(",", "."))
+        return float(str(s).translate(_AMOUNT_TRANS))
     except Exception:
         return None
 
@@ -356,10 +410,7 @@ def _f(v, default: float = 0.0) -> float:
     if isinstance(v, (int, float)):
         return float(v)
     try:
-        s = str(v).strip().replace("\xa0", " ").replace(" ", "").replace(",", ".")
-        if not s:
-            return float(default)
-        return float(s)
+        return float(str(v).translate(_AMOUNT_TRANS))
     except Exception:
         return float(default)
 
@@ -423,10 +474,10 @@ def _normalize_items(items: List[dict], reasons: List[str], *, total_with_vat: O
 
 
 def _safe_float(s: str) -> float:
-    return float(str(s).strip().replace("\xa0", " ").replace(" ", "").replace(",", "."))
+    return float(str(s).translate(_AMOUNT_TRANS))
 
 
-def _find_first(patterns: list[re.Pattern], text: str) -> Optional[str]:
+def _find_first(patterns: Sequence[re.Pattern], text: str) -> Optional[str]:
     for p in patterns:
         m = p.search(text)
         if m:
@@ -440,7 +491,7 @@ def _normalize_ico_soft(ico: str | None) -> str | None:
     raw = str(ico).strip()
     if not raw:
         return None
-    digits = _ICO_DIGITS_RE.sub("", raw)
+    digits = digits_only(raw)
     if not digits:
         return None
     if len(digits) > 8:
@@ -1097,30 +1148,51 @@ def _parse_items_omv(text: str) -> List[dict]:
     return uniq
 
 
+# české názvy měsíců (leden/ledna, únor/února, ...)
+_CZ_MONTHS = {
+    "leden": "01", "ledna": "01",
+    "únor": "02", "unor": "02", "února": "02", "unora": "02",
+    "březen": "03", "brezen": "03", "března": "03", "brezna": "03",
+    "duben": "04", "dubna": "04",
+    "květen": "05", "kveten": "05", "května": "05", "kvetna": "05",
+    "červen": "06", "cerven": "06", "června": "06", "cervna": "06",
+    "červenec": "07", "cervenec": "07", "července": "07", "cervence": "07",
+    "srpen": "08", "srpna": "08",
+    "září": "09", "zari": "09",
+    "říjen": "10", "rijen": "10", "října": "10", "rijna": "10",
+    "listopad": "11", "listopadu": "11",
+    "prosinec": "12", "prosince": "12",
+}
+_CZ_MONTH_DATE_RE = re.compile(r"\b(\d{1,2})\.?\s*([A-Za-zÁČĎÉĚÍŇÓŘŠŤÚŮÝŽáčďéěíňóřšťúůýž]+)\s*(\d{4})\b")
+# Běžné formáty d.m.yyyy a dd/mm/yyyy skládáme přímo z číslic; dateutil
+# zůstává jen jako fallback pro ostatní zápisy (a neplatná data).
+_DMY_DATE_RE = re.compile(r"(\d{1,2})\.\s*(\d{1,2})\.\s*(\d{4})|(\d{1,2})/(\d{1,2})/(\d{4})")
+
+
+def _parse_numeric_date(s: str) -> Optional[dt.date]:
+    m = _DMY_DATE_RE.fullmatch(s)
+    if not m:
+        return None
+    day, mon, year = (int(g) for g in m.groups() if g is not None)
+    try:
+        return dt.date(year, mon, day)
+    except ValueError:
+        return None
+
+
 def _parse_date(s: str) -> Optional[dt.date]:
     s = (s or "").strip()
     if not s:
         return None
 
-    # české názvy měsíců (leden/ledna, únor/února, ...)
-    month_map = {
-        "leden": "01", "ledna": "01",
-        "únor": "02", "unor": "02", "února": "02", "unora": "02",
-        "březen": "03", "brezen": "03", "března": "03", "brezna": "03",
-        "duben": "04", "dubna": "04",
-        "květen": "05", "kveten": "05", "května": "05", "kvetna": "05",
-        "červen": "06", "cerven": "06", "června": "06", "cervna": "06",
-        "červenec": "07", "cervenec": "07", "července": "07", "cervence": "07",
-        "srpen": "08", "srpna": "08",
-        "září": "09", "zari": "09",
-        "říjen": "10", "rijen": "10", "října": "10", "rijna": "10",
-        "listopad": "11", "listopadu": "11",
-        "prosinec": "12", "prosince": "12",
-    }
-    m = re.search(r"\b(\d{1,2})\.?\s*([A-Za-zÁČĎÉĚÍŇÓŘŠŤÚŮÝŽáčďéěíňóřšťúůýž]+)\s*(\d{4})\b", s)
+    d = _parse_numeric_date(s)
+    if d is not None:
+        return d
+
+    m = _CZ_MONTH_DATE_RE.search(s)
     if m:
         day = m.group(1).zfill(2)
-        mon = month_map.get(m.group(2).strip().lower())
+        mon = _CZ_MONTHS.get(m.group(2).strip().lower())
         year = m.group(3)
         if mon:
             s = f"{day}.{mon}.{year}"
@@ -1371,42 +1443,18 @@ def extract_from_text(text: str) -> Extracted:
     ico = _extract_supplier_ico(t)
     doc_no = _extract_doc_number(t)
 
-    bank_account = _find_first([
-        re.compile(r"\bIBAN\s*[: ]\s*([A-Z]{2}\d{2}[A-Z0-9]{10,})\b"),
-        re.compile(r"\bÚčet\s*[: ]\s*(\d{6,}-?\d{2,}/\d{4})\b", re.IGNORECASE),
-        re.compile(r"\b(\d{6,}-?\d{2,})\s*/\s*(\d{4})\b"),
-    ], t)
+    bank_account = _find_first(_BANK_PATS, t)
     if bank_account and " " in bank_account:
         bank_account = bank_account.replace(" ", "")
 
-    date_s = _find_first([
-        re.compile(r"Datum\s+vystaven[ií]\s*[: ]\s*([0-9]{1,2}\.\s*[0-9]{1,2}\.\s*[0-9]{2,4})", re.IGNORECASE),
-        re.compile(r"Datum\s+vystaven[ií]\s*[: ]\s*(\d{1,2}\.\s*[A-Za-zÁČĎÉĚÍŇÓŘŠŤÚŮÝŽáčďéěíňóřšťúůýž]+\s*\d{4})", re.IGNORECASE),
-        re.compile(r"Datum\s*[: ]\s*([0-9]{1,2}\.\s*[0-9]{1,2}\.\s*[0-9]{2,4})", re.IGNORECASE),
-        # Účtenky často mají datum bez labelu, někdy i s časem (čas ignorujeme)
-        re.compile(r"\b([0-9]{1,2}\.[0-9]{1,2}\.[0-9]{2,4})\b"),
-        re.compile(r"\b([0-9]{2}/[0-9]{2}/[0-9]{4})\b"),
-    ], t)
+    date_s = _find_first(_DATE_PATS, t)
     issue_date = _parse_date(date_s) if date_s else None
 
     # currency
-    currency = "EUR" if re.search(r"\bEUR\b", t) else "CZK" if re.search(r"\bCZK\b|Kč", t) else "CZK"
+    currency = "EUR" if _CURRENCY_EUR_RE.search(t) else "CZK"
 
     # total
-    total_s = _find_first([
-        re.compile(r"CELKEM\s+K\s+ÚHRADĚ\s*\n?\s*([0-9\s]+[.,][0-9]{2})", re.IGNORECASE),
-        re.compile(r"Celkem\s+k\s+úhradě\s*[: ]\s*([0-9\s]+[.,][0-9]{2})", re.IGNORECASE),
-        re.compile(r"K\s+zaplacení\s+celkem\s+EUR\s*([0-9\s]+[.,][0-9]{2})", re.IGNORECASE),
-        re.compile(r"Cena\s+celkem\s*([0-9\s]+[.,][0-9]{2})", re.IGNORECASE),
-        re.compile(r"Koruna\s+česká\s+Kč\s*([0-9\s]+[.,][0-9]{2})", re.IGNORECASE),
-        # Účtenky: "Celkem 68,20" / "PRODEJ 68,20 Kč"
-        re.compile(r"\bCelkem\s*[: ]\s*([0-9\s]+[.,][0-9]{2})\b", re.IGNORECASE),
-        re.compile(r"Celkem\s+v\s+\w+.*?([0-9\s]+[.,][0-9]{2})", re.IGNORECASE),
-        re.compile(r"\bPRODEJ\s*([0-9\s]+[.,][0-9]{2})\b", re.IGNORECASE),
-        # tolerantnější "Celkem k úhradě" bez dvojtečky, s textem mezi
-        re.compile(r"\bCelkem\s+k\s+úhradě\b[^\d\-]{0,40}([0-9][0-9\s]*[.,][0-9]{2})\b", re.IGNORECASE),
-        re.compile(r"\bCelkem\s+k\s+uhradě\b[^\d\-]{0,40}([0-9][0-9\s]*[.,][0-9]{2})\b", re.IGNORECASE),
-    ], t)
+    total_s = _find_first(_TOTAL_PATS, t)
 
     pre_reasons: List[str] = []
     total = None
@@ -1474,16 +1522,13 @@ def extract_from_text(text: str) -> Extracted:
     if not items:
         # default VAT: vezmeme první explicitní sazbu (např. "21%") z dokumentu
         vat_default = 0.0
-        mvat = re.search(r"\b(\d{1,2})%\b", t)
+        mvat = _VAT_PERCENT_RE.search(t)
         if mvat:
             try:
                 vat_default = float(mvat.group(1))
             except Exception:
                 vat_default = 0.0
-        bh_pat = re.compile(
-            r"(?P<net>\d+[\s\d]*[.,]\d{2})\s*CZK\s+(?P<qty>\d+(?:[.,]\d+)?)\s+(?P<net_total>\d+[\s\d]*[.,]\d{2})\s*CZK\s+(?P<gross>\d+[\s\d]*[.,]\d{2})\s*CZK",
-            re.IGNORECASE,
-        )
+        bh_pat = _BETTER_HOTEL_ROW_RE
         pending_desc: List[str] = []
         for ln in t.splitlines():
             ln = ln.strip()
@@ -1492,7 +1537,7 @@ def extract_from_text(text: str) -> Extracted:
             m = bh_pat.search(ln)
             if not m:
                 # bereme jen "popis" řádky, ignorujeme hlavičky
-                if not re.search(r"^(POLOŽKA|CENA|POČET|CELKEM|DPH|DODAVATEL|ODBĚRATEL)\b", ln, re.IGNORECASE):
+                if not _BETTER_HOTEL_HEADER_RE.search(ln):
                     pending_desc.append(ln)
                 continue
             try:
@@ -1507,18 +1552,9 @@ def extract_from_text(text: str) -> Extracted:
                 continue
 # receipts (Albert): lines like "2 x 5,60 Kč 11,20"
     if not items:
-        rec_pat = re.compile(r"^(?P<name>[A-ZÁČĎÉĚÍŇÓŘŠŤÚŮÝŽ0-9 .,'/-]{3,})\s*$")
-        qty_price_pat = re.compile(
-            r"^(?P<qty>\d+(?:[.,]\d+)?)\s*[xX]\s*(?P<unit>\d+[\s\d]*[.,]\d{2}).*?(?P<total>\d+[\s\d]*[.,]\d{2})\s*(?P<vat_letter>[A-Z])?\s*$"
-        )
-        # single-line: "Název 1 x 12,90 12,90" / "Název 2ks 19,00 38,00"
-        single_line_re = re.compile(
-            r"^\s*(?P<name>[^0-9]{3,}?)\s+"
-            r"(?P<qty>\d+(?:[.,]\d+)?)\s*(?:x|ks|KUS|PCS|pc|×)?\s*"
-            r"(?P<unit>\d[\d\s]*[.,]\d{2})\s+"
-            r"(?P<total>\d[\d\s]*[.,]\d{2})\s*$",
-            re.IGNORECASE,
-        )
+        rec_pat = _REC_PAT
+        qty_price_pat = _QTY_PRICE_PAT
+        single_line_re = _SINGLE_LINE_ITEM_RE
         pending_name: Optional[str] = None
         for ln in t.splitlines():
             ln = ln.strip()
@@ -1537,7 +1573,7 @@ def extract_from_text(text: str) -> Extracted:
                     continue
 
             if pending_name is None:
-                if rec_pat.match(ln) and not re.search(r"(Celkem|DPH|Datum|Děkujeme|Kč|EUR|IBAN)", ln, re.IGNORECASE):
+                if rec_pat.match(ln) and not _REC_SKIP_RE.search(ln):
                     pending_name = ln
                 continue
             m2 = qty_price_pat.match(ln)
@@ -6,6 +6,8 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
 
+from kajovospend.utils.amounts import AMOUNT_TRANS
+
 FIELD_LEGEND: Tuple[Tuple[str, str], ...] = (
     ("supplier_ico", "#FF0000"),
     ("doc_number", "#00FF00"),
@@ -222,9 +224,8 @@ def _parse_amount_value(text: str) -> Optional[float]:
         m = re.search(r"([0-9][0-9\s]*[.,][0-9]{1,2})", text)
     if not m:
         return None
-    num = m.group(1).replace("\xa0", " ").replace(" ", "").replace(",", ".")
     try:
-        return float(num)
+        return float(m.group(1).translate(AMOUNT_TRANS))
     except Exception:
         return None
 
@@ -11,6 +11,7 @@ from pypdf import PdfReader
 import xml.etree.ElementTree as ET
 
 from kajovospend.extract.parser import Extracted
+from kajovospend.utils.amounts import AMOUNT_TRANS as _AMOUNT_TRANS
 
 _DIGITS_RE = re.compile(r"\D+")
 _AMOUNT_RE = re.compile(r"-?\d+[\d\s]*[.,]\d+")
@@ -18,8 +19,8 @@ _AMOUNT_RE = re.compile(r"-?\d+[\d\s]*[.,]\d+")
 def _to_float(s: Optional[str]) -> Optional[float]:
     if s is None:
         return None
-    s = s.strip().replace("\xa0", " ").replace(" ", "").replace(",", ".")
-    if not s:
+    s = s.translate(_AMOUNT_TRANS)
+    if not s.strip():
         return None
     try:
         return float(s)
@@ -27,7 +28,7 @@ def _to_float(s: Optional[str]) -> Optional[float]:
         m = _AMOUNT_RE.search(s)
         if m:
             try:
-                return float(m.group(0).replace(" ", "").replace(",", "."))
+                return float(m.group(0).translate(_AMOUNT_TRANS))
             except Exception:
                 return None
     return None
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from typing import Any, Dict, List, Tuple
 
+from kajovospend.utils.amounts import AMOUNT_TRANS as _AMOUNT_TRANS
+
 
 def _f(v: Any, default: float = 0.0) -> float:
     if v is None:
@@ -9,8 +11,7 @@ def _f(v: Any, default: float = 0.0) -> float:
     if isinstance(v, (int, float)):
         return float(v)
     try:
-        s = str(v).strip().replace("\xa0", " ").replace(" ", "").replace(",", ".")
-        return float(s) if s else float(default)
+        return float(str(v).translate(_AMOUNT_TRANS))
     except Exception:
         return float(default)
 
@@ -2,10 +2,10 @@ from __future__ import annotations
 
 import datetime as dt
 
+from kajovospend.utils.digits import digits_only
 from kajovospend.utils.time import utc_now_naive
 import logging
 from dataclasses import dataclass, field
-import re
 from typing import Optional
 
 import requests
@@ -41,7 +41,6 @@ class AresError(RuntimeError):
 
 _ARES_BASE_URL = "https://ares.gov.cz/ekonomicke-subjekty-v-be/rest"
 
-_ICO_DIGITS_RE = re.compile(r"\D+")
 
 
 def _compose_address(
@@ -88,7 +87,7 @@ def normalize_ico(ico: str) -> str:
     raw = str(ico).strip()
     if not raw:
         raise ValueError("IČO je prázdné")
-    digits = _ICO_DIGITS_RE.sub("", raw)
+    digits = digits_only(raw)
     if not digits:
         raise ValueError(f"IČO neobsahuje číslice: {ico!r}")
     if len(digits) > 8:
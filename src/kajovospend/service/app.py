@@ -21,6 +21,50 @@ from kajovospend.service.watcher import DirectoryWatcher
 from kajovospend.service.processor import Processor, safe_move
 
 
+def _walk_input_dir(root: Path) -> tuple[list[tuple[Path, os.stat_result]], list[Path]]:
+    """Rekurzivní průchod IN přes os.scandir: soubory i se stat (jeden syscall na soubor,
+    typ položky bere z adresáře) a podsložky; do symlinkovaných složek nevstupuje (jako rglob)."""
+    files: list[tuple[Path, os.stat_result]] = []
+    dirs: list[Path] = []
+    stack = [root]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        d = Path(entry.path)
+                        dirs.append(d)
+                        stack.append(d)
+                    elif entry.is_file():
+                        files.append((Path(entry.path), entry.stat()))
+                except OSError:
+                    continue
+    return files, dirs
+
+
+_STATUS_ROW = select(
+    ServiceState.running,
+    ServiceState.last_success,
+    ServiceState.last_error,
+    ServiceState.last_error_at,
+    ServiceState.queue_size,
+    ServiceState.last_seen,
+    ServiceState.inflight,
+    ServiceState.max_workers,
+    ServiceState.current_job_id,
+    ServiceState.current_path,
+    ServiceState.current_phase,
+    ServiceState.current_progress,
+    ServiceState.heartbeat_at,
+    ServiceState.stuck,
+    ServiceState.stuck_reason,
+).where(ServiceState.singleton == 1)
+
+
 class ServiceApp:
     def __init__(self, cfg: Dict[str, Any], working_session_factory, production_session_factory, paths, logger):
         self.cfg = cfg
@@ -36,7 +80,9 @@ class ServiceApp:
         self._executor = ThreadPoolExecutor(max_workers=self._max_workers)
         self._inflight_lock = threading.Lock()
         self._inflight: set[Future] = set()
-        self._processor = Processor(cfg, paths, logger, working_session_factory, production_session_factory)
+        self._processor = Processor(
+            cfg, paths, logger, working_session_factory, production_session_factory, processing_session_factory=self.pf
+        )
         self._supported_ext = {".pdf", ".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp"}
 
         # Tvrdá stěna: po startu přesunout doklady bez dodavatele do karantény (fyzicky)
@@ -62,6 +108,7 @@ class ServiceApp:
         out_base = Path(self.cfg["paths"]["output_dir"])
         qdir = out_base / self.cfg["paths"].get("quarantine_dir_name", "KARANTENA")
         qdir.mkdir(parents=True, exist_ok=True)
+        # Krátká čtecí session; během pomalých přesunů nesmí zůstat otevřená transakce.
         with self.sf() as session:
             rows = session.execute(
                 text(
@@ -73,18 +120,28 @@ class ServiceApp:
                 """
                 )
             ).fetchall()
+        # DB zápis hned po každém přesunu (commit per soubor), takže disk a DB se rozejdou
+        # nejvýš o jeden soubor; případný nesoulad se zaloguje.
+        with self.sf() as session:
             for file_id, pth in rows:
                 try:
                     src = Path(pth or "")
                     moved = safe_move(src, qdir, src.name)
+                except Exception:
+                    continue
+                try:
                     session.execute(
                         text("UPDATE files SET status='QUARANTINE', current_path=:p WHERE id=:fid"),
                         {"p": str(moved), "fid": file_id},
                     )
                     session.commit()
-                except Exception:
+                except Exception as exc:
                     session.rollback()
-                    continue
+                    self.log.warning(
+                        "Soubor %s přesunut do karantény jako %s, ale DB záznam files.id=%s nelze aktualizovat: %s",
+                        src, moved, file_id, exc,
+                    )
+
     def _inflight_count(self) -> int:
         with self._inflight_lock:
             # prune done futures (in case callback didn't run for any reason)
@@ -96,15 +153,14 @@ class ServiceApp:
         out_base = Path(self.cfg["paths"]["output_dir"])
         quarantine_dir = out_base / self.cfg["paths"].get("quarantine_dir_name", "KARANTENA")
 
-        files: list[Path] = []
+        files: list[tuple[Path, os.stat_result]] = []
         try:
             if not input_dir.exists():
-                return files
-            for p in input_dir.rglob("*"):
-                if not p.is_file():
-                    continue
+                return []
+            entries, dirs = _walk_input_dir(input_dir)
+            for p, st in entries:
                 if p.suffix.lower() in self._supported_ext:
-                    files.append(p)
+                    files.append((p, st))
                 else:
                     try:
                         moved = safe_move(p, quarantine_dir, p.name)
@@ -112,17 +168,17 @@ class ServiceApp:
                     except Exception as exc:
                         self.log.exception("Nelze přesunout nepodporovaný soubor %s: %s", p, exc)
             # vyčistit prázdné podsložky
-            dirs = sorted([d for d in input_dir.rglob("*") if d.is_dir()], key=lambda d: len(d.parts), reverse=True)
+            dirs.sort(key=lambda d: len(d.parts), reverse=True)
             for d in dirs:
                 try:
                     if not any(d.iterdir()):
                         d.rmdir()
                 except Exception:
                     pass
-            files.sort(key=lambda p: (p.stat().st_mtime, p.name, str(p)))
+            files.sort(key=lambda f: (f[1].st_mtime, f[0].name, str(f[0])))
         except Exception as exc:
             self.log.exception("Chyba při skenování IN: %s", exc)
-        return files
+        return [p for p, _st in files]
 
     def _submit_job(self, job_id: int) -> None:
         fut = self._executor.submit(self._run_job, job_id)
@@ -168,7 +224,7 @@ class ServiceApp:
 
     def _claim_next_job(self, session: Session) -> ImportJob | None:
         job = session.execute(
-            select(ImportJob).where(ImportJob.status == "QUEUED").order_by(ImportJob.created_at).limit(1)
+            select(ImportJob).where(ImportJob.status == "QUEUED").order_by(ImportJob.created_at, ImportJob.id).limit(1)
         ).scalar_one_or_none()
         if not job:
             return None
@@ -299,27 +355,30 @@ class ServiceApp:
                     self.log.exception("Failed to persist job failure state")
 
     def get_status(self) -> Dict[str, Any]:
+        # Stav se čte jako holá n-tice sloupců (bez materializace ORM entity a identity map).
         with self.sf() as session:
-            st = session.get(ServiceState, 1)
-            if not st:
-                return {"running": False, "queue_size": 0}
-            return {
-                "running": bool(st.running),
-                "last_success": st.last_success.isoformat() if st.last_success else None,
-                "last_error": st.last_error,
-                "last_error_at": st.last_error_at.isoformat() if st.last_error_at else None,
-                "queue_size": int(st.queue_size or 0),
-                "last_seen": st.last_seen.isoformat() if st.last_seen else None,
-                "inflight": int(st.inflight or 0),
-                "max_workers": int(st.max_workers or 0),
-                "current_job_id": int(st.current_job_id) if st.current_job_id is not None else None,
-                "current_path": st.current_path,
-                "current_phase": st.current_phase,
-                "current_progress": float(st.current_progress) if st.current_progress is not None else None,
-                "heartbeat_at": st.heartbeat_at.isoformat() if st.heartbeat_at else None,
-                "stuck": bool(st.stuck) if st.stuck is not None else False,
-                "stuck_reason": st.stuck_reason,
-            }
+            row = session.execute(_STATUS_ROW).first()
+        if row is None:
+            return {"running": False, "queue_size": 0}
+        (running, last_success, last_error, last_error_at, qsize, last_seen, inflight, max_workers,
+         current_job_id, current_path, current_phase, current_progress, heartbeat_at, stuck, stuck_reason) = row
+        return {
+            "running": bool(running),
+            "last_success": last_success.isoformat() if last_success else None,
+            "last_error": last_error,
+            "last_error_at": last_error_at.isoformat() if last_error_at else None,
+            "queue_size": int(qsize or 0),
+            "last_seen": last_seen.isoformat() if last_seen else None,
+            "inflight": int(inflight or 0),
+            "max_workers": int(max_workers or 0),
+            "current_job_id": int(current_job_id) if current_job_id is not None else None,
+            "current_path": current_path,
+            "current_phase": current_phase,
+            "current_progress": float(current_progress) if current_progress is not None else None,
+            "heartbeat_at": heartbeat_at.isoformat() if heartbeat_at else None,
+            "stuck": bool(stuck) if stuck is not None else False,
+            "stuck_reason": stuck_reason,
+        }
 
     def request_stop(self) -> None:
         self._stop.set()
@@ -4,12 +4,14 @@ import shutil
 import time
 from pathlib import Path
 
+from kajovospend.utils.paths import ensure_dir
+
 
 def safe_move(src: Path, dst_dir: Path, target_name: str) -> Path:
     normalized_name = Path(str(target_name).replace("\\", "/")).name.strip()
     if not normalized_name:
         normalized_name = src.name
-    dst_dir.mkdir(parents=True, exist_ok=True)
+    ensure_dir(dst_dir)
     dst = dst_dir / normalized_name
     dst_dir_resolved = dst_dir.resolve()
     dst_resolved = dst.resolve()
@@ -17,10 +17,8 @@ from typing import Any, Dict, Optional, Tuple, List
 
 from PIL import Image, ImageFilter, ImageOps
 from pypdf import PdfReader
-import warnings
 
 from sqlalchemy import select, text
-from sqlalchemy.exc import SADeprecationWarning
 
 from kajovospend.db.working_models import ImportJob, DocumentFile, Supplier
 from kajovospend.db.production_models import StandardReceiptTemplate
@@ -32,7 +30,7 @@ from kajovospend.db.working_queries import (
 )
 from kajovospend.db.production_models import Document as ProdDocument
 from kajovospend.service.promotion import promote_document
-from kajovospend.db.processing_session import create_processing_session_factory, dispose_processing_session_factory
+from kajovospend.db.processing_session import create_processing_session_factory
 from kajovospend.db.processing_models import IngestFile
 from kajovospend.extract.parser import extract_from_text, postprocess_items_for_db
 from kajovospend.extract.standard_receipts import extract_using_template, match_template
@@ -54,7 +52,8 @@ except Exception:  # pragma: no cover
 from kajovospend.ocr.pdf_render import render_pdf_to_images
 from kajovospend.ocr.rapidocr_engine import RapidOcrEngine
 from kajovospend.utils.env import sanitize_openai_api_key
-from kajovospend.utils.hashing import sha256_file
+from kajovospend.utils.hashing import sha256_file_fast
+from kajovospend.utils.paths import ensure_dir
 from kajovospend.utils.text_quality import compute_text_quality, summarize_text_quality, text_quality_score
 from kajovospend.utils.qr_spayd import decode_qr_from_pil, parse_spayd
 from kajovospend.utils.iban import normalize_iban, is_valid_iban
@@ -62,16 +61,38 @@ from kajovospend.utils.forensic_context import forensic_scope, new_correlation_i
 from kajovospend.utils.logging_setup import log_event
 
 
+# Purge výstupů souboru při force re-runu: statementy sestavené jednou (text() se neparsuje při každém volání).
+_PURGE_FILE_OUTPUTS = tuple(
+    text(sql)
+    for sql in (
+        "DELETE FROM items WHERE document_id IN (SELECT id FROM documents WHERE file_id = :fid)",
+        "DELETE FROM documents_fts WHERE document_id IN (SELECT id FROM documents WHERE file_id = :fid)",
+        "DELETE FROM document_page_audit WHERE file_id = :fid",
+        "DELETE FROM documents WHERE file_id = :fid",
+    )
+)
+_PURGE_ITEMS, _PURGE_DOCUMENTS_FTS, _PURGE_PAGE_AUDIT, _PURGE_DOCUMENTS = _PURGE_FILE_OUTPUTS
 
 
 class Processor:
-    def __init__(self, cfg: Dict[str, Any], paths, logger, working_session_factory, production_session_factory):
+    def __init__(
+        self,
+        cfg: Dict[str, Any],
+        paths,
+        logger,
+        working_session_factory,
+        production_session_factory,
+        processing_session_factory=None,
+    ):
         self.cfg = cfg
         self.paths = paths
         self.log = logger
         self.sf = working_session_factory
         self.sf_production = production_session_factory
-        self.pf = create_processing_session_factory(cfg)
+        # Sdílená processing factory = jeden pool s teplou page cache (a bez create_all) na proces.
+        # I bez předané factory jde o instanci z cache create_processing_session_factory, kterou
+        # používá i okno/služba; Processor ji proto nikdy neuvolňuje.
+        self.pf = processing_session_factory or create_processing_session_factory(cfg)
         # OCR engine is optional; if unavailable we quarantine rather than crash service.
         try:
             self.ocr_engine = RapidOcrEngine(paths.models_dir)
@@ -80,31 +101,31 @@ class Processor:
             self.ocr_engine = None
 
     def close(self) -> None:
-        """Uvolní zdroje, zejména processing SQLite engine (důležité na Windows)."""
-        close_fn = getattr(self.pf, "close_all_sessions", None) or getattr(self.pf, "close_all", None)
-        if close_fn:
-            try:
-                with warnings.catch_warnings():
-                    warnings.simplefilter("ignore", SADeprecationWarning)
-                    close_fn()
-            except Exception:
-                pass
-        try:
-            dispose_processing_session_factory(self.pf)
-        except Exception:
-            pass
-        try:
-            eng = getattr(self, "pf", None)
-            if eng and getattr(eng, "bind", None):
-                eng.bind.dispose()
-        except Exception:
-            pass
+        """Uvolní zdroje Processoru (OCR engine).
+
+        Processing SQLite engine je sdílený per proces; uvolňuje ho vlastník
+        (okno / služba) přes dispose_processing_session_factory.
+        """
         try:
             if hasattr(self, "ocr_engine") and hasattr(self.ocr_engine, "close"):
                 self.ocr_engine.close()
         except Exception:
             pass
 
+    def _file_sha256(self, path: Path) -> str:
+        # performance.trust_hash_filenames: ve vstupním adresáři služby (deduplikované úložiště s názvy
+        # `<sha256>.pdf`) se hash převezme z názvu bez čtení celého souboru. Mimo input_dir nikdy.
+        cfg = self.cfg or {}
+        trust = False
+        if (cfg.get("performance") or {}).get("trust_hash_filenames", False):
+            input_dir = (cfg.get("paths") or {}).get("input_dir")
+            if input_dir:
+                try:
+                    trust = Path(path).resolve().is_relative_to(Path(input_dir).resolve())
+                except Exception:
+                    trust = False
+        return sha256_file_fast(path, trust_name=trust)
+
     def _update_processing_status(
         self,
         id_in: int | None,
@@ -140,20 +161,15 @@ class Processor:
 
     def _purge_existing_outputs_for_file(self, session, file_id: int) -> None:
         """Smaže předchozí výstupy pro soubor při force re-runu v bezpečném pořadí."""
-        session.execute(
-            text("DELETE FROM items WHERE document_id IN (SELECT id FROM documents WHERE file_id = :fid)"),
-            {"fid": int(file_id)},
-        )
+        params = {"fid": int(file_id)}
+        session.execute(_PURGE_ITEMS, params)
         try:
-            session.execute(
-                text("DELETE FROM documents_fts WHERE document_id IN (SELECT id FROM documents WHERE file_id = :fid)"),
-                {"fid": int(file_id)},
-            )
+            session.execute(_PURGE_DOCUMENTS_FTS, params)
         except Exception:
             # FTS tabulka může v testovacím režimu chybět.
             pass
-        session.execute(text("DELETE FROM document_page_audit WHERE file_id = :fid"), {"fid": int(file_id)})
-        session.execute(text("DELETE FROM documents WHERE file_id = :fid"), {"fid": int(file_id)})
+        session.execute(_PURGE_PAGE_AUDIT, params)
+        session.execute(_PURGE_DOCUMENTS, params)
 
     @staticmethod
     def _find_business_duplicate(
@@ -1422,7 +1438,7 @@ class Processor:
     ) -> Path | None:
         try:
             forensic_dir = out_base / str(self.cfg["paths"].get("forensic_dir_name", "FORENSIC"))
-            forensic_dir.mkdir(parents=True, exist_ok=True)
+            ensure_dir(forensic_dir)
             safe_name = f"{source_path.stem}__{sha256[:12]}__{str(status).lower()}.forensic.json"
             payload = self._build_forensic_bundle_payload(
                 source_path=source_path,
@@ -1458,7 +1474,7 @@ class Processor:
         job_ref = job_id if job_id is not None else f"pseudo-{uuid.uuid4()}"
         size = path.stat().st_size if path.exists() else 0
         mtime = path.stat().st_mtime if path.exists() else None
-        sha = sha256_file(path)
+        sha = self._file_sha256(path)
         self._update_processing_status(id_in, status="QUEUED", path_current=str(path), sha256=sha)
 
         with forensic_scope(correlation_id=correlation_id, job_id=job_ref, file_sha256=sha, phase="ingest"):
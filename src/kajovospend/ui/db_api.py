@@ -20,6 +20,9 @@ from kajovospend.db.working_models import (
     ServiceState,
 )
 
+# FTS údržba při slučování dodavatelů: statement sestavený jednou, spouštěný jako executemany.
+_FTS_DOC_SET_ICO = text("UPDATE documents_fts SET supplier_ico = :ico WHERE document_id = :id")
+
 
 def working_counts(session: Session) -> Dict[str, int]:
     """Operational counts from working DB."""
@@ -381,12 +384,10 @@ def merge_suppliers(session: Session, keep_id: int, merge_ids: List[int]) -> Non
         d.supplier_id = keep_id
         d.supplier_ico = keep.ico
         session.add(d)
-        # keep FTS consistent
+    # keep FTS consistent (jedno executemany místo UPDATE na doklad)
+    if docs:
         try:
-            session.execute(
-                text("UPDATE documents_fts SET supplier_ico=:ico WHERE document_id=:id"),
-                {"ico": keep.ico or "", "id": int(d.id)},
-            )
+            session.execute(_FTS_DOC_SET_ICO, [{"ico": keep.ico or "", "id": int(d.id)} for d in docs])
         except Exception:
             pass
 
@@ -564,7 +565,7 @@ def list_quarantine(session: Session) -> List[Tuple[WorkDocument, DocumentFile]]
         select(WorkDocument, DocumentFile)
         .join(DocumentFile, DocumentFile.id == WorkDocument.file_id)
         .where(DocumentFile.status == "QUARANTINE")
-        .order_by(WorkDocument.created_at.desc())
+        .order_by(WorkDocument.created_at.desc(), WorkDocument.id.desc())
     )
     return list(session.execute(stmt).all())
 
@@ -585,7 +586,8 @@ def _ensure_items_fts2_populated(session: Session) -> None:
         if total_items == 0:
             return
         if total_fts < total_items:
-            # Backfill missing rows (idempotent).
+            # Backfill missing rows (idempotent). item_id je UNINDEXED, takže LEFT JOIN na FTS by
+            # pro každou položku skenoval celou FTS tabulku; NOT IN si postaví dočasný index jednou.
             session.execute(
                 text(
                     """
@@ -593,8 +595,7 @@ def _ensure_items_fts2_populated(session: Session) -> None:
                     SELECT i.id, i.document_id, COALESCE(i.name,''), COALESCE(d.supplier_ico,''), COALESCE(d.doc_number,'')
                     FROM items i
                     JOIN documents d ON d.id = i.document_id
-                    LEFT JOIN items_fts2 fts ON fts.item_id = i.id
-                    WHERE fts.item_id IS NULL
+                    WHERE i.id NOT IN (SELECT item_id FROM items_fts2)
                     """
                 )
             )
@@ -836,7 +837,7 @@ def list_items(
 
 
 def service_jobs(session: Session, limit: int = 200) -> List[ImportJob]:
-    stmt = select(ImportJob).order_by(ImportJob.created_at.desc()).limit(limit)
+    stmt = select(ImportJob).order_by(ImportJob.created_at.desc(), ImportJob.id.desc()).limit(limit)
     return list(session.execute(stmt).scalars().all())
 
 
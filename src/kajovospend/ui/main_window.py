@@ -30,14 +30,14 @@ from PySide6.QtWidgets import (
 from kajovospend.ui.progress import ProgressController, MiniProgressWidget
 from PySide6.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsPixmapItem
 
-from sqlalchemy import select, text, bindparam
+from sqlalchemy import select, text, bindparam, insert, func
 from sqlalchemy.orm import selectinload
 
 from shiboken6 import Shiboken
-from kajovospend.utils.config import load_yaml, save_yaml, deep_set
+from kajovospend.utils.config import load_yaml, load_yaml_cached, save_yaml_cached, deep_set
 import requests
 from kajovospend.utils.paths import resolve_app_paths
-from kajovospend.utils.logging_setup import setup_logging, log_event
+from kajovospend.utils.logging_setup import flush_logging, setup_logging, log_event
 from kajovospend.db.session import make_session_factory
 from kajovospend.db.working_session import create_working_engine
 from kajovospend.db.production_session import create_production_engine
@@ -1064,7 +1064,7 @@ class MainWindow(QMainWindow):
         self.sf = make_session_factory(self.engine)  # working session (ops/workflow)
         self.sf_production = make_session_factory(self.engine_production)  # business reads
         self.pf = create_processing_session_factory(self.cfg)
-        self.processor = Processor(self.cfg, self.paths, self.log, self.sf, self.sf_production)
+        self.processor = Processor(self.cfg, self.paths, self.log, self.sf, self.sf_production, processing_session_factory=self.pf)
         self._audit_event(
             "app.start",
             "Application started",
@@ -1137,10 +1137,10 @@ class MainWindow(QMainWindow):
 
     def _load_or_create_config(self) -> Dict[str, Any]:
         if self.config_path.exists():
-            cfg = load_yaml(self.config_path)
+            cfg = load_yaml_cached(self.config_path)
         else:
             cfg = load_yaml(self.config_path.with_name("config.example.yaml"))
-            save_yaml(self.config_path, cfg)
+            save_yaml_cached(self.config_path, cfg)
         cfg.setdefault("app", {})
         cfg.setdefault("paths", {})
         cfg.setdefault("ocr", {})
@@ -3571,8 +3571,8 @@ class MainWindow(QMainWindow):
                 return
             existing = {int(it.id): it for it in session.execute(select(LineItem).where(LineItem.document_id == doc_id)).scalars().all()}
 
-            # update + create
-            new_items: List[LineItem] = []
+            # update + create (nové položky jdou po flush jedním hromadným INSERTem, bez ORM objektů)
+            new_rows: List[Dict[str, Any]] = []
             line_no = 1
             total_sum = 0.0
             keep_ids = set()
@@ -3605,20 +3605,16 @@ class MainWindow(QMainWindow):
                     session.add(it)
                     keep_ids.add(int(it.id))
                 else:
-                    it = LineItem(
+                    new_rows.append(dict(
                         document_id=doc_id,
                         line_no=line_no,
                         name=name[:512],
                         quantity=qty,
                         line_total=lt,
                         vat_rate=vr,
-                    )
-                    if hasattr(it, "ean"):
-                        it.ean = ean
-                    if hasattr(it, "item_code"):
-                        it.item_code = code
-                    session.add(it)
-                    new_items.append(it)
+                        ean=ean,
+                        item_code=code,
+                    ))
                 line_no += 1
 
             # delete removed
@@ -3632,6 +3628,8 @@ class MainWindow(QMainWindow):
                 session.add(doc)
 
             session.flush()
+            if new_rows:
+                session.execute(insert(LineItem), new_rows)
             try:
                 session.execute(
                     text(
@@ -3741,7 +3739,7 @@ class MainWindow(QMainWindow):
         deep_set(self.cfg, ["openai", "image_variants"], int(self.sp_image_variants.value()))
         # synteticke polozky: zapnute vsude, ale ne v rezimu only_openai
         deep_set(self.cfg, ["openai", "allow_synthetic_items"], (not only))
-        save_yaml(self.config_path, self.cfg)
+        save_yaml_cached(self.config_path, self.cfg)
         # refresh paths and engine if db moved
         old_db = self.paths.working_db_path
         old_log_dir = Path(self.paths.log_dir)
@@ -3790,7 +3788,7 @@ class MainWindow(QMainWindow):
         self._audit_event("db.reinit.request", "Initialize new database requested")
         init_new_db(self)
         try:
-            save_yaml(self.config_path, self.cfg)
+            save_yaml_cached(self.config_path, self.cfg)
         except Exception:
             pass
         self._audit_event(
@@ -3990,7 +3988,7 @@ class MainWindow(QMainWindow):
                 self.sf = make_session_factory(self.engine)
                 self.sf_production = make_session_factory(self.engine_production)
                 self.pf = create_processing_session_factory(self.cfg)
-                self.processor = Processor(self.cfg, self.paths, self.log, self.sf, self.sf_production)
+                self.processor = Processor(self.cfg, self.paths, self.log, self.sf, self.sf_production, processing_session_factory=self.pf)
             except Exception as exc:
                 errors.append(f"Reinit po obnově: {exc}")
 
@@ -4131,7 +4129,7 @@ class MainWindow(QMainWindow):
             self.sf = make_session_factory(self.engine)
             self.sf_production = make_session_factory(self.engine_production)
             self.pf = create_processing_session_factory(self.cfg)
-            self.processor = Processor(self.cfg, self.paths, self.log, self.sf, self.sf_production)
+            self.processor = Processor(self.cfg, self.paths, self.log, self.sf, self.sf_production, processing_session_factory=self.pf)
         except Exception as exc:
             errors.append(f"Init nové DB: {exc}")
 
@@ -4753,7 +4751,7 @@ class MainWindow(QMainWindow):
                     )
                 cfg["openai"] = openai_cfg
 
-                proc = Processor(cfg, self.paths, self.log, self.sf, self.sf_production)
+                proc = Processor(cfg, self.paths, self.log, self.sf, self.sf_production, processing_session_factory=self.pf)
                 res = proc.process_path(session, p, status_cb=status_cb, force=True, job_id=None)
                 session.commit()
                 return res
@@ -4918,7 +4916,7 @@ class MainWindow(QMainWindow):
             )
         cfg["openai"] = openai_cfg
 
-        proc = Processor(cfg, self.paths, self.log, self.sf, self.sf_production)
+        proc = Processor(cfg, self.paths, self.log, self.sf, self.sf_production, processing_session_factory=self.pf)
         res = proc.process_path(session, p, status_cb=status_cb, force=True, job_id=None)
         session.commit()
         return res
@@ -5179,20 +5177,22 @@ class MainWindow(QMainWindow):
             return
         try:
             with self.sf() as session:
-                s = session.execute(select(Supplier).where(Supplier.ico == ico)).scalar_one_or_none()
-                if not s:
-                    s = Supplier(ico=ico)
-                s.name = vals.get("name")
-                s.dic = vals.get("dic")
-                s.legal_form = vals.get("legal_form")
-                s.street = vals.get("street")
-                s.street_number = vals.get("street_number")
-                s.orientation_number = vals.get("orientation_number")
-                s.city = vals.get("city")
-                s.zip_code = vals.get("zip_code")
-                s.address = vals.get("address")
-                s.is_vat_payer = bool(vals.get("is_vat_payer"))
-                session.add(s)
+                # jediný INSERT ... ON CONFLICT(ico_norm) DO UPDATE (IČO se kanonizuje jako při importu)
+                s = upsert_supplier(
+                    session,
+                    ico,
+                    write_none=True,
+                    name=vals.get("name"),
+                    dic=vals.get("dic"),
+                    legal_form=vals.get("legal_form"),
+                    street=vals.get("street"),
+                    street_number=vals.get("street_number"),
+                    orientation_number=vals.get("orientation_number"),
+                    city=vals.get("city"),
+                    zip_code=vals.get("zip_code"),
+                    address=vals.get("address"),
+                    is_vat_payer=bool(vals.get("is_vat_payer")),
+                )
                 session.commit()
                 new_id = int(s.id)
         except Exception as e:
@@ -5558,7 +5558,7 @@ class MainWindow(QMainWindow):
                 recs = (
                     ps.query(IngestFile)
                     .filter(IngestFile.status.in_(statuses))
-                    .order_by(IngestFile.created_at.desc())
+                    .order_by(IngestFile.created_at.desc(), IngestFile.id_in.desc())
                     .all()
                 )
 
@@ -5811,7 +5811,7 @@ class MainWindow(QMainWindow):
                     | (DocumentFile.current_path.like(like))
                     | (DocumentFile.last_error.like(like))
                 )
-            stmt = stmt.order_by(DocumentFile.processed_at.desc().nullslast(), DocumentFile.created_at.desc()).limit(500)
+            stmt = stmt.order_by(DocumentFile.processed_at.desc().nullslast(), DocumentFile.created_at.desc(), DocumentFile.id.desc()).limit(500)
             files = list(session.execute(stmt).scalars().all())
 
         rows: List[List[Any]] = []
@@ -6367,6 +6367,7 @@ class MainWindow(QMainWindow):
             self._import_worker = None
         except Exception:
             pass
+        flush_logging()
         super().closeEvent(event)
 
     
@@ -6409,8 +6410,10 @@ class MainWindow(QMainWindow):
             for ico, total, cnt in top:
                 total_val = float(total or 0)
                 txt.append(f"{ico}: {total_val:,.2f} ({int(cnt or 0)})".replace(",", " "))
-            qcnt = session.execute(select(Document).where(Document.requires_review == True)).scalars().all()  # noqa
-            txt.append(f"\nVyžaduje kontrolu: {len(qcnt)}")
+            qcnt = session.execute(
+                select(func.count(Document.id)).where(Document.requires_review == True)  # noqa
+            ).scalar_one()
+            txt.append(f"\nVyžaduje kontrolu: {int(qcnt or 0)}")
         self.money_summary.setText("\n".join(txt))
 
     def _export(self, kind: str):
@@ -6427,7 +6430,12 @@ class MainWindow(QMainWindow):
             # Flatten for export including line items.
             rows: List[Dict[str, Any]] = []
             for d, f in docs:
-                items = session.execute(select(LineItem).where(LineItem.document_id == d.id).order_by(LineItem.line_no)).scalars().all()
+                # jen sloupce pro export, bez plných ORM objektů položek
+                items = session.execute(
+                    select(LineItem.line_no, LineItem.name, LineItem.quantity, LineItem.vat_rate, LineItem.line_total)
+                    .where(LineItem.document_id == d.id)
+                    .order_by(LineItem.line_no)
+                ).all()
                 if not items:
                     rows.append({
                         "document_id": d.id,
@@ -10,6 +10,7 @@ from kajovospend.db.session import make_session_factory
 from kajovospend.db.working_session import create_working_engine
 from kajovospend.db.production_session import create_production_engine
 from kajovospend.db.dual_db_guard import ensure_separate_databases
+from kajovospend.db.processing_session import create_processing_session_factory
 from kajovospend.utils.paths import resolve_app_paths
 from kajovospend.service.processor import Processor
 
@@ -69,7 +70,10 @@ def init_new_db(window) -> None:
     window.sf = sf
     window.sf_production = sf_production
     try:
-        window.processor = Processor(window.cfg, window.paths, window.log, window.sf, window.sf_production)
+        window.pf = create_processing_session_factory(window.cfg)
+        window.processor = Processor(
+            window.cfg, window.paths, window.log, window.sf, window.sf_production, processing_session_factory=window.pf
+        )
     except Exception:
         pass
     QMessageBox.information(
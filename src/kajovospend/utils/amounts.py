@@ -0,0 +1,6 @@
+from __future__ import annotations
+
+# Normalizace číselného textu (částky, množství) jedním průchodem str.translate místo strip + řetězce
+# replace(): pryč NBSP a mezery (oddělovače tisíců), desetinná čárka -> tečka. Okrajové bílé znaky
+# (tab, konec řádku) i prázdný vstup ošetří samo float().
+AMOUNT_TRANS = str.maketrans({"\xa0": None, " ": None, ",": "."})
@@ -1,26 +1,93 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import logging
+import os
 from pathlib import Path
 from typing import Any, Dict
 
 import yaml
 
+from kajovospend.utils.paths import default_data_dir
+
 
 DEFAULT_CONFIG_NAME = "config.yaml"
 
 
+# libyaml (C) loader je řádově rychlejší a dává stejný výstup jako čistě Pythonový SafeLoader.
+_YAML_LOADER = getattr(yaml, "CSafeLoader", None)
+if _YAML_LOADER is None:
+    logging.getLogger(__name__).warning("PyYAML bez libyaml (CSafeLoader chybí) – config se parsuje pomalým SafeLoaderem.")
+    _YAML_LOADER = yaml.SafeLoader
+
+
 def load_yaml(path: Path) -> Dict[str, Any]:
     if not path.exists():
         return {}
-    data = yaml.safe_load(path.read_text(encoding="utf-8"))
+    with path.open("r", encoding="utf-8") as fh:
+        data = yaml.load(fh, Loader=_YAML_LOADER)
     return data or {}
 
 
+def _config_cache_dir() -> Path:
+    return default_data_dir() / "cache"
+
+
+def load_yaml_cached(path: Path, cache_dir: Path | None = None) -> Dict[str, Any]:
+    """
+    Jako load_yaml, ale naparsovaný config drží v JSON cache klíčované cestou + mtime_ns + size.
+    JSON se parsuje řádově rychleji než YAML; cache se použije jen pro data, která JSON
+    přenese beze ztráty (jinak se vrací přímo YAML). Jakákoli chyba cache => čisté YAML.
+    """
+    try:
+        st = path.stat()
+    except OSError:
+        return {}
+    try:
+        cdir = cache_dir or _config_cache_dir()
+        tag = hashlib.sha1(str(path.resolve()).encode("utf-8")).hexdigest()[:12]
+        cache_path = cdir / f"config-{tag}-{st.st_mtime_ns}-{st.st_size}.json"
+        if cache_path.is_file():
+            data = json.loads(cache_path.read_bytes())
+            if isinstance(data, dict):
+                return data
+    except Exception:
+        cache_path = None
+    data = load_yaml(path)
+    if cache_path is None:
+        return data
+    try:
+        raw = json.dumps(data, ensure_ascii=False)
+        if json.loads(raw) != data:
+            return data
+        cdir.mkdir(parents=True, exist_ok=True)
+        # staré verze cache pro stejný config už nikdy nebudou trefeny
+        for old in cdir.glob(f"config-{tag}-*.json"):
+            try:
+                old.unlink()
+            except OSError:
+                pass
+        tmp = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(raw, encoding="utf-8")
+        os.replace(tmp, cache_path)
+    except Exception:
+        pass
+    return data
+
+
 def save_yaml(path: Path, data: Dict[str, Any]) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text(yaml.safe_dump(data, sort_keys=False, allow_unicode=True), encoding="utf-8")
 
 
+def save_yaml_cached(path: Path, data: Dict[str, Any], cache_dir: Path | None = None) -> None:
+    """save_yaml + rovnou naplní JSON cache pro nový stav souboru, takže další start služby/GUI
+    (typicky restart po změně nastavení) už YAML neparsuje."""
+    save_yaml(path, data)
+    load_yaml_cached(path, cache_dir)
+
+
 def deep_get(d: Dict[str, Any], keys: list[str], default: Any = None) -> Any:
     cur: Any = d
     for k in keys:
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+
+class _NonDigitDeleteTable(dict):
+    """Translate table that keeps decimal digits (same set as regex \\d) and deletes everything else.
+
+    Each code point is classified once and cached.
+    """
+
+    def __missing__(self, code: int):
+        value = code if chr(code).isdecimal() else None
+        self[code] = value
+        return value
+
+
+_NON_DIGITS = _NonDigitDeleteTable()
+
+
+def digits_only(s: str) -> str:
+    """Return only the decimal digits of ``s``; equivalent to ``re.sub(r"\\D+", "", s)``."""
+    return s if s.isdecimal() else s.translate(_NON_DIGITS)
@@ -1,15 +1,41 @@
 from __future__ import annotations
 
 import hashlib
+import re
 from pathlib import Path
+from typing import Optional
 
 
-def sha256_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
-    h = hashlib.sha256()
-    with path.open("rb") as f:
-        while True:
-            b = f.read(chunk_size)
-            if not b:
-                break
-            h.update(b)
-    return h.hexdigest()
+def sha256_file(path: Path) -> str:
+    # hashlib.file_digest (3.11+) čte i hashuje v C smyčce a během update uvolňuje GIL;
+    # buffering=0, aby se data nekopírovala ještě přes Python BufferedReader.
+    with path.open("rb", buffering=0) as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+_SHA256_IN_NAME_RE = re.compile(r"(?<![0-9a-fA-F])([0-9a-fA-F]{64})(?![0-9a-fA-F])")
+
+
+def sha256_from_name(path: Path) -> Optional[str]:
+    """SHA-256 zakódovaný v názvu souboru (deduplikované úložiště typu `<sha256>.pdf`), jinak None."""
+    m = _SHA256_IN_NAME_RE.search(path.name)
+    return m.group(1).lower() if m else None
+
+
+def sha256_file_fast(path: Path, *, trust_name: bool = False) -> str:
+    """
+    Jako sha256_file, ale u důvěryhodných vstupů (trust_name=True) převezme hash z názvu souboru
+    bez čtení obsahu. Pokud vedle leží sidecar `<název>.sha256`, musí se s názvem shodovat,
+    jinak se soubor normálně přehashuje.
+    """
+    if trust_name:
+        named = sha256_from_name(path)
+        if named:
+            sidecar = path.with_name(path.name + ".sha256")
+            try:
+                recorded = sidecar.read_text(encoding="ascii").split()[0].lower() if sidecar.exists() else named
+            except (OSError, UnicodeDecodeError, IndexError):
+                recorded = None
+            if recorded == named:
+                return named
+    return sha256_file(path)
@@ -1,21 +1,24 @@
 from __future__ import annotations
 
+import atexit
 import json
 import logging
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 import os
+import queue
 import platform
 import socket
 import sys
 import threading
 import traceback
-from datetime import UTC, datetime
 from pathlib import Path
 from typing import Any, Dict
 
 import faulthandler
 
 from kajovospend.utils.forensic_context import get_forensic_fields
+from kajovospend.utils.paths import ensure_dir
+from kajovospend.utils.time import utc_iso_from_epoch
 
 if os.name == "nt":
     import msvcrt  # type: ignore
@@ -48,7 +51,7 @@ class _InterProcessLock:
             self._owned_here = False
             return self
 
-        self._lock_path.parent.mkdir(parents=True, exist_ok=True)
+        ensure_dir(self._lock_path.parent)
         self._fh = open(self._lock_path, "a+b")
         try:
             if os.name == "nt":
@@ -133,6 +136,57 @@ _ROOT_CONFIG_LOCK = threading.Lock()
 _ROOT_LOG_DIR: Path | None = None
 _FORENSIC_HOOKS_INSTALLED = False
 _FAULT_HANDLER_STREAM = None
+_LOG_LISTENER: QueueListener | None = None
+
+
+class _InProcessQueueHandler(QueueHandler):
+    """QueueHandler for an in-process listener: keeps exc_info/extra intact for the real formatters."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Zprávu vyhodnotíme hned (args můžou být mutable), formátování a zápis až ve vlákně listeneru.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _async_enabled() -> bool:
+    # KAJOVOSPEND_LOG_ASYNC=0 vypne frontu i pro textový log (forenzní JSONL je synchronní vždy).
+    return str(os.environ.get("KAJOVOSPEND_LOG_ASYNC", "1")).strip() not in {"0", "false", "False", "FALSE", "no", "NO"}
+
+
+def _stop_listener() -> None:
+    global _LOG_LISTENER
+    listener = _LOG_LISTENER
+    _LOG_LISTENER = None
+    if listener is None:
+        return
+    try:
+        listener.stop()
+    except Exception:
+        pass
+    for handler in listener.handlers:
+        try:
+            handler.close()
+        except Exception:
+            pass
+
+
+def flush_logging() -> None:
+    """Drain queued log records to disk (called on service stop / app close)."""
+    listener = _LOG_LISTENER
+    if listener is None:
+        return
+    with _ROOT_CONFIG_LOCK:
+        if listener is not _LOG_LISTENER:
+            return
+        try:
+            listener.stop()
+            listener.start()
+        except Exception:
+            pass
+
+
+atexit.register(_stop_listener)
 
 
 class ForensicContextFilter(logging.Filter):
@@ -146,6 +200,10 @@ class ForensicContextFilter(logging.Filter):
         self._user = os.environ.get("USERNAME") or os.environ.get("USER") or "unknown"
 
     def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "_kajovospend_ctx", False):
+            # Záznam už prošel filtrem u jiného handleru (synchronní forenzní + fronta).
+            return True
+        record._kajovospend_ctx = True
         record.hostname = self._hostname
         record.platform = self._platform
         record.python = self._python
@@ -163,7 +221,7 @@ class JsonLineFormatter(logging.Formatter):
 
     def format(self, record: logging.LogRecord) -> str:
         payload: dict[str, Any] = {
-            "timestamp": datetime.fromtimestamp(record.created, tz=UTC).isoformat(),
+            "timestamp": utc_iso_from_epoch(record.created),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -269,6 +327,7 @@ def _compute_max_lines() -> int:
 
 
 def _remove_owned_handlers(root: logging.Logger) -> None:
+    _stop_listener()
     for handler in list(root.handlers):
         if not getattr(handler, "_kajovospend_owned", False):
             continue
@@ -284,7 +343,7 @@ def _remove_owned_handlers(root: logging.Logger) -> None:
 
 def setup_logging(log_dir: Path, name: str = "kajovospend") -> logging.Logger:
     """Configure shared text + forensic logs with daily rotation."""
-    global _ROOT_CONFIGURED, _ROOT_LOG_DIR
+    global _ROOT_CONFIGURED, _ROOT_LOG_DIR, _LOG_LISTENER
 
     log_dir = Path(log_dir)
     log_dir.mkdir(parents=True, exist_ok=True)
@@ -312,7 +371,9 @@ def setup_logging(log_dir: Path, name: str = "kajovospend") -> logging.Logger:
             )
 
             forensic_filter = ForensicContextFilter()
+            use_queue = _async_enabled()
 
+            handlers: list[logging.Handler] = []
             text_handler = SafeTimedRotatingFileHandler(
                 log_dir / "kajovospend.log",
                 backup_count=retention_days,
@@ -320,9 +381,7 @@ def setup_logging(log_dir: Path, name: str = "kajovospend") -> logging.Logger:
             )
             text_handler.setLevel(logging.DEBUG)
             text_handler.setFormatter(fmt)
-            text_handler.addFilter(forensic_filter)
-            setattr(text_handler, "_kajovospend_owned", True)
-            root.addHandler(text_handler)
+            handlers.append(text_handler)
 
             forensic_handler = SafeTimedRotatingFileHandler(
                 log_dir / "kajovospend_forensic.jsonl",
@@ -331,17 +390,36 @@ def setup_logging(log_dir: Path, name: str = "kajovospend") -> logging.Logger:
             )
             forensic_handler.setLevel(logging.DEBUG)
             forensic_handler.setFormatter(JsonLineFormatter())
-            forensic_handler.addFilter(forensic_filter)
-            setattr(forensic_handler, "_kajovospend_owned", True)
-            root.addHandler(forensic_handler)
 
             if os.environ.get("KAJOVOSPEND_LOG_CONSOLE", "").strip() in {"1", "true", "TRUE", "yes", "YES"}:
                 console_handler = logging.StreamHandler()
                 console_handler.setLevel(logging.DEBUG)
                 console_handler.setFormatter(fmt)
-                console_handler.addFilter(forensic_filter)
-                setattr(console_handler, "_kajovospend_owned", True)
-                root.addHandler(console_handler)
+                handlers.append(console_handler)
+
+            # Forenzní JSONL se zapisuje vždy synchronně: záznamy těsně před pádem (os._exit,
+            # segfault, kill) jsou právě ty, kvůli kterým forenzní log existuje, a ve frontě by se ztratily.
+            forensic_handler.addFilter(forensic_filter)
+            setattr(forensic_handler, "_kajovospend_owned", True)
+            root.addHandler(forensic_handler)
+
+            if use_queue:
+                # Zápis textového logu (flock + write + flush na každý záznam) běží ve vlákně listeneru,
+                # volající vlákno jen vloží záznam do fronty; při tvrdém pádu se ztratí, co je ve frontě.
+                # Forenzní kontext (contextvars, cwd) se musí doplnit ještě ve vlákně, které loguje
+                # -> filtr je na QueueHandleru.
+                queue_handler = _InProcessQueueHandler(queue.SimpleQueue())
+                queue_handler.setLevel(logging.DEBUG)
+                queue_handler.addFilter(forensic_filter)
+                setattr(queue_handler, "_kajovospend_owned", True)
+                _LOG_LISTENER = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+                _LOG_LISTENER.start()
+                root.addHandler(queue_handler)
+            else:
+                for handler in handlers:
+                    handler.addFilter(forensic_filter)
+                    setattr(handler, "_kajovospend_owned", True)
+                    root.addHandler(handler)
 
             _ROOT_CONFIGURED = True
             _ROOT_LOG_DIR = resolved_log_dir
@@ -6,6 +6,8 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
+from kajovospend._boot import ROOT_DIR
+
 APP_NAME = "KajovoSpend"
 
 
@@ -17,8 +19,8 @@ def default_data_dir() -> Path:
 
 
 def _repo_root() -> Path:
-    # src/kajovospend/utils/paths.py -> repo root is three parents up
-    return Path(__file__).resolve().parents[3]
+    # Computed once in kajovospend._boot (no resolve() syscall per call).
+    return ROOT_DIR
 
 
 def default_log_dir() -> Path:
@@ -37,9 +39,16 @@ class AppPaths:
     db_path: Path
 
 
+def ensure_dir(path: Path | str) -> None:
+    # Běžný případ (adresář už existuje) = jediný stat; mkdir(exist_ok=True) by jinak
+    # volal mkdir + zachytil EEXIST + ještě stat. Bez cache: složku může uživatel mezitím smazat.
+    if not os.path.isdir(path):
+        os.makedirs(path, exist_ok=True)
+
+
 def ensure_dirs(*paths: Path) -> None:
     for p in paths:
-        p.mkdir(parents=True, exist_ok=True)
+        ensure_dir(p)
 
 
 def _derive_production_from_legacy(db_path: Path) -> Path:
@@ -1,8 +1,68 @@
 from __future__ import annotations
 
 import datetime as dt
+import math
+import time
+
+# (epoch sekunda, "YYYY-MM-DDTHH:MM:SS") – sdílená cache prefixu pro utc_iso_from_epoch.
+_ISO_SECOND_CACHE: tuple[int, str] = (-1, "")
+
+
+_NAIVE_EPOCH = dt.datetime(1970, 1, 1)
+
+
+def utc_naive_from_epoch(ts: float) -> dt.datetime:
+    """Stejné jako ``datetime.fromtimestamp(ts, tz=UTC).replace(tzinfo=None)``, bez tz objektu a replace()."""
+    return _NAIVE_EPOCH + dt.timedelta(seconds=ts)
 
 
 def utc_now_naive() -> dt.datetime:
-    """Vrátí aktuální UTC čas jako naive datetime (kompatibilní se stávající SQLite schémou)."""
-    return dt.datetime.now(dt.UTC).replace(tzinfo=None)
+    """Vrátí aktuální UTC čas jako naive datetime (kompatibilní se stávající SQLite schémou).
+
+    Volá se jako ORM default pro každý vkládaný řádek, proto přímý výpočet z epochy.
+    """
+    return _NAIVE_EPOCH + dt.timedelta(seconds=time.time())
+
+
+# (monotonic čas posledního výpočtu, hodnota) pro utc_now_naive_cached; výměna celé dvojice je atomická.
+_NOW_CACHE: tuple[float, dt.datetime | None] = (-1.0, None)
+_NOW_CACHE_TTL = 0.001
+
+
+def utc_now_naive_cached() -> dt.datetime:
+    """Jako :func:`utc_now_naive`, ale řádky vkládané v rámci jedné milisekundy sdílí jednu hodnotu.
+
+    ORM default pro created_at/updated_at: při dávkovém insertu ušetří výpočet datetime na řádek.
+    """
+    global _NOW_CACHE
+    t = time.monotonic()
+    last_t, value = _NOW_CACHE
+    if value is None or t - last_t > _NOW_CACHE_TTL:
+        value = _NAIVE_EPOCH + dt.timedelta(seconds=time.time())
+        _NOW_CACHE = (t, value)
+    return value
+
+
+def utc_iso_from_epoch(ts: float) -> str:
+    """
+    Stejný výstup jako ``datetime.fromtimestamp(ts, tz=UTC).isoformat()``, ale bez alokace
+    datetime pro každý záznam: formátovaný prefix se drží pro aktuální sekundu a doplní se
+    jen mikrosekundy (zaokrouhlení half-even jako v datetime).
+    """
+    global _ISO_SECOND_CACHE
+    frac, whole = math.modf(ts)
+    us = round(frac * 1e6)
+    if us >= 1_000_000:
+        whole += 1
+        us -= 1_000_000
+    elif us < 0:
+        whole -= 1
+        us += 1_000_000
+    sec = int(whole)
+    cached_sec, prefix = _ISO_SECOND_CACHE
+    if cached_sec != sec:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(sec))
+        _ISO_SECOND_CACHE = (sec, prefix)
+    if us:
+        return f"{prefix}.{us:06d}+00:00"
+    return f"{prefix}+00:00"
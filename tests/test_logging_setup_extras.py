@@ -26,3 +26,32 @@ def test_log_event_respects_detail(monkeypatch, caplog):
     assert "small='ok'" in caplog.text
     # big should be trimmed away when detail disabled
     assert "big=" not in caplog.text
+
+
+def test_queued_logging_keeps_forensic_fields(monkeypatch, tmp_path):
+    import json
+
+    from kajovospend.utils.forensic_context import forensic_scope
+
+    monkeypatch.setenv("KAJOVOSPEND_LOG_ASYNC", "1")
+    monkeypatch.setattr(logging_setup, "_install_forensic_runtime_hooks", lambda *a, **k: None)
+    monkeypatch.setattr(logging_setup, "_ROOT_CONFIGURED", False)
+    monkeypatch.setattr(logging_setup, "_ROOT_LOG_DIR", None)
+    root = logging.getLogger()
+    old_level = root.level
+    try:
+        log = logging_setup.setup_logging(tmp_path, name="kajovospend.test_queue")
+        with forensic_scope(correlation_id="corr-q"):
+            logging_setup.log_event(log, "queue.test", "queued", n=1)
+        # forenzní JSONL je synchronní i s frontou: záznam je na disku ještě před flush_logging()
+        lines = (tmp_path / "kajovospend_forensic.jsonl").read_text(encoding="utf-8").splitlines()
+        logging_setup.flush_logging()
+        assert "queued | n=1" in (tmp_path / "kajovospend.log").read_text(encoding="utf-8")
+    finally:
+        logging_setup._remove_owned_handlers(root)
+        root.setLevel(old_level)
+
+    payload = [json.loads(x) for x in lines if '"queue.test"' in x][-1]
+    assert payload["forensic"]["correlation_id"] == "corr-q"
+    assert payload["extra"]["n"] == 1
+    assert payload["hostname"]
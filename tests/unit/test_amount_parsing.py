@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import unittest
+
+from kajovospend.extract import layout_items, parser, structured_pdf, vat_math
+
+
+class TestAmountParsing(unittest.TestCase):
+    def test_czech_formats_parse_the_same_everywhere(self) -> None:
+        for raw, expected in (("1 234,50", 1234.5), ("1\xa0234,5", 1234.5), (" \t12,5\n", 12.5), ("-3", -3.0)):
+            self.assertEqual(parser._norm_amount(raw), expected)
+            self.assertEqual(parser._parse_number(raw), expected)
+            self.assertEqual(parser._f(raw), expected)
+            self.assertEqual(layout_items._f(raw), expected)
+            self.assertEqual(vat_math._f(raw), expected)
+            self.assertEqual(structured_pdf._to_float(raw), expected)
+
+    def test_invalid_input_falls_back(self) -> None:
+        for raw in ("", "   ", "abc"):
+            self.assertEqual(parser._f(raw, 7.0), 7.0)
+            self.assertEqual(layout_items._f(raw, 7.0), 7.0)
+            self.assertEqual(vat_math._f(raw, 7.0), 7.0)
+            self.assertIsNone(parser._parse_number(raw))
+            self.assertIsNone(structured_pdf._to_float(raw))
+        with self.assertRaises(ValueError):
+            parser._norm_amount(" ")
+        self.assertEqual(structured_pdf._to_float("cena 1 234,50 Kč"), 1234.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
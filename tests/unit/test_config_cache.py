@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import datetime as dt
+import os
+from pathlib import Path
+
+from kajovospend.utils.config import load_yaml_cached, save_yaml, save_yaml_cached
+
+
+def test_load_yaml_cached_hits_cache_and_invalidates_on_change(tmp_path: Path):
+    cfg_path = tmp_path / "config.yaml"
+    cache_dir = tmp_path / "cache"
+    save_yaml(cfg_path, {"app": {"data_dir": "C:/Data"}, "performance": {"docs_page_size": 500}})
+
+    first = load_yaml_cached(cfg_path, cache_dir)
+    assert first["performance"]["docs_page_size"] == 500
+    cached = list(cache_dir.glob("config-*.json"))
+    assert len(cached) == 1
+
+    # druhé čtení jde z cache a vrací nezávislou kopii
+    first["app"]["data_dir"] = "mutated"
+    assert load_yaml_cached(cfg_path, cache_dir)["app"]["data_dir"] == "C:/Data"
+
+    save_yaml(cfg_path, {"app": {"data_dir": "D:/Other"}})
+    st = cfg_path.stat()
+    os.utime(cfg_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert load_yaml_cached(cfg_path, cache_dir)["app"]["data_dir"] == "D:/Other"
+    # stará položka cache byla nahrazena
+    assert len(list(cache_dir.glob("config-*.json"))) == 1
+
+
+def test_load_yaml_cached_skips_cache_for_non_json_values(tmp_path: Path):
+    cfg_path = tmp_path / "config.yaml"
+    cache_dir = tmp_path / "cache"
+    cfg_path.write_text("reset_date: 2026-02-27\n", encoding="utf-8")
+
+    data = load_yaml_cached(cfg_path, cache_dir)
+    assert data["reset_date"] == dt.date(2026, 2, 27)
+    assert not list(cache_dir.glob("config-*.json"))
+
+
+def test_load_yaml_cached_missing_file(tmp_path: Path):
+    assert load_yaml_cached(tmp_path / "missing.yaml", tmp_path / "cache") == {}
+
+
+def test_save_yaml_cached_warms_cache(tmp_path: Path):
+    cfg_path = tmp_path / "config.yaml"
+    cache_dir = tmp_path / "cache"
+    save_yaml_cached(cfg_path, {"app": {"data_dir": "C:/Data"}}, cache_dir)
+    assert len(list(cache_dir.glob("config-*.json"))) == 1
+    assert load_yaml_cached(cfg_path, cache_dir) == {"app": {"data_dir": "C:/Data"}}
@@ -3,12 +3,14 @@ from __future__ import annotations
 import tempfile
 import unittest
 from pathlib import Path
+from unittest import mock
 
 from sqlalchemy import text, select
 
-from kajovospend.db.migrate import init_db
+from kajovospend.db import migrate
+from kajovospend.db.migrate import SCHEMA_VERSION, init_db
 from kajovospend.db.models import Document, LineItem
-from kajovospend.db.queries import add_document
+from kajovospend.db.queries import add_document, rebuild_all_fts, rebuild_fts_for_document, rebuild_fts_for_documents
 from kajovospend.db.session import make_engine, make_session_factory
 
 
@@ -27,9 +29,13 @@ class TestDbNetGrossMigration(unittest.TestCase):
                     con.execute(text("CREATE TABLE import_jobs (id INTEGER PRIMARY KEY, created_at TEXT, started_at TEXT, finished_at TEXT, path TEXT, sha256 TEXT, status TEXT, error TEXT)"))
                     con.execute(text("CREATE TABLE service_state (singleton INTEGER PRIMARY KEY, running INTEGER, last_success TEXT, last_error TEXT, last_error_at TEXT, queue_size INTEGER, last_seen TEXT)"))
 
+                    con.execute(text("INSERT INTO suppliers(id, ico, ico_norm) VALUES (1, 'CZ 123 456 78', NULL)"))
+                    con.execute(text("INSERT INTO suppliers(id, ico, ico_norm) VALUES (2, '4567', '')"))
                     con.execute(text("INSERT INTO files(id, status, sha256, original_name, pages, current_path) VALUES (1, 'PROCESSED', 'x', 'a.pdf', 1, '/tmp/a.pdf')"))
                     con.execute(text("INSERT INTO documents(id, file_id, supplier_ico, doc_number, total_with_vat, page_from, currency, extraction_confidence, extraction_method, requires_review) VALUES (1, 1, '12345678', '2025-1', 121.00, 1, 'CZK', 1.0, 'offline', 0)"))
                     con.execute(text("INSERT INTO items(document_id, line_no, name, quantity, unit_price, vat_rate, line_total) VALUES (1, 1, 'A', 2.0, 50.0, 21.0, 121.0)"))
+                    con.execute(text("INSERT INTO documents(id, file_id, supplier_ico, doc_number, total_with_vat, page_from, currency, extraction_confidence, extraction_method, requires_review) VALUES (2, 1, '12345678', '2025-2', 242.00, 1, 'CZK', 1.0, 'offline', 0)"))
+                    con.execute(text("INSERT INTO items(document_id, line_no, name, quantity, unit_price, vat_rate, line_total) VALUES (2, 1, 'B', 4.0, NULL, 21.0, 242.0)"))
 
                 init_db(engine)
 
@@ -42,11 +48,35 @@ class TestDbNetGrossMigration(unittest.TestCase):
                     self.assertAlmostEqual(float(row[3]), 21.0, places=2)
                     self.assertAlmostEqual(float(row[4]), 60.5, places=4)
 
+                    # unit_price_net bez legacy unit_price se dopočte z nového line_total_net v tomtéž průchodu
+                    row2 = con.execute(text("SELECT line_total_net, unit_price_net FROM items WHERE document_id=2")).fetchone()
+                    self.assertAlmostEqual(float(row2[0]), 200.0, places=2)
+                    self.assertAlmostEqual(float(row2[1]), 50.0, places=4)
+
                     drow = con.execute(text("SELECT total_without_vat, total_vat_amount, doc_type FROM documents WHERE id=1")).fetchone()
                     self.assertIsNotNone(drow)
                     self.assertAlmostEqual(float(drow[0]), 100.0, places=2)
                     self.assertAlmostEqual(float(drow[1]), 21.0, places=2)
                     self.assertEqual(str(drow[2]), "invoice")
+
+                    # krycí index z modelu se na legacy tabulce items dostaví migrací
+                    plan = con.execute(text(
+                        "EXPLAIN QUERY PLAN SELECT SUM(line_total_net), SUM(vat_amount) FROM items WHERE document_id=1"
+                    )).fetchall()
+                    self.assertIn("COVERING INDEX ix_items_doc_totals", " ".join(str(r[-1]) for r in plan))
+
+                    ico_norm = con.execute(text("SELECT ico_norm FROM suppliers WHERE id=1")).scalar_one()
+                    self.assertEqual(ico_norm, "12345678")
+                    # čistě číselné IČO se doplní nulami přímo v SQL
+                    self.assertEqual(con.execute(text("SELECT ico_norm FROM suppliers WHERE id=2")).scalar_one(), "00004567")
+
+                    # FTS položek se při migraci naplní hromadně z existujících dat.
+                    fts = con.execute(text("SELECT item_name, supplier_ico, doc_number FROM items_fts2 ORDER BY item_name")).fetchall()
+                    self.assertEqual([tuple(r) for r in fts], [("A", "12345678", "2025-1"), ("B", "12345678", "2025-2")])
+                    # items_fts je external content nad items: index se postaví příkazem 'rebuild'
+                    self.assertEqual(int(con.execute(text("SELECT COUNT(*) FROM items_fts_docsize")).scalar_one()), 2)
+                    hits = con.execute(text("SELECT document_id FROM items_fts WHERE items_fts MATCH 'B'")).scalars().all()
+                    self.assertEqual(hits, [2])
             finally:
                 engine.dispose()
 
@@ -74,6 +104,117 @@ class TestDbNetGrossMigration(unittest.TestCase):
             finally:
                 engine.dispose()
 
+    def test_init_db_skips_schema_steps_on_warm_start(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "warm.db"
+            engine = make_engine(str(db_path))
+            try:
+                init_db(engine)
+                with engine.begin() as con:
+                    self.assertEqual(int(con.execute(text("PRAGMA user_version")).scalar_one()), SCHEMA_VERSION)
+                    con.execute(text("DROP INDEX idx_documents_dup_key"))
+                    con.execute(text("DROP TABLE document_page_audit"))
+                sf = make_session_factory(engine)
+                with sf() as session:
+                    session.execute(
+                        text(
+                            "INSERT INTO files(id, sha256, original_name, pages, current_path, status, created_at) "
+                            "VALUES (1, 's', 'x.pdf', 1, '/tmp/x.pdf', 'PROCESSED', CURRENT_TIMESTAMP)"
+                        )
+                    )
+                    doc = add_document(
+                        session, file_id=1, supplier_id=None, supplier_ico="12345678", doc_number="FV-1",
+                        bank_account=None, issue_date=None, total_with_vat=1.0, currency="CZK", confidence=1.0,
+                        method="offline", requires_review=False, review_reasons=None,
+                        items=[{"name": "A", "quantity": 1, "unit_price": 1.0, "vat_rate": 0.0, "line_total": 1.0}],
+                    )
+                    # simulace produkčního insertu, který vazby nevyplňuje
+                    session.execute(text("UPDATE items SET id_receipt=NULL WHERE document_id=:d"), {"d": doc.id})
+                    session.commit()
+                    doc_id = int(doc.id)
+
+                init_db(engine)
+
+                with engine.begin() as con:
+                    # schéma se při stejné verzi znovu neprochází ...
+                    idx = con.execute(text("SELECT COUNT(*) FROM sqlite_master WHERE type='index' AND name='idx_documents_dup_key'")).scalar_one()
+                    self.assertEqual(int(idx), 0)
+                    # chybějící tabulka se dotvoří i na teplém startu
+                    tbl = con.execute(text("SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name='document_page_audit'")).scalar_one()
+                    self.assertEqual(int(tbl), 1)
+                    # ... ale vazby položek se doplňují vždy
+                    id_receipt = con.execute(text("SELECT id_receipt FROM items WHERE document_id=:d"), {"d": doc_id}).scalar_one()
+                    self.assertEqual(int(id_receipt), doc_id)
+            finally:
+                engine.dispose()
+
+    def test_init_db_converts_legacy_items_fts_to_external_content(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "fts.db"
+            engine = make_engine(str(db_path))
+            try:
+                init_db(engine)
+                sf = make_session_factory(engine)
+                with sf() as session:
+                    session.execute(
+                        text(
+                            "INSERT INTO files(id, sha256, original_name, pages, current_path, status, created_at) "
+                            "VALUES (1, 's', 'x.pdf', 1, '/tmp/x.pdf', 'PROCESSED', CURRENT_TIMESTAMP)"
+                        )
+                    )
+                    doc = add_document(
+                        session, file_id=1, supplier_id=None, supplier_ico=None, doc_number=None,
+                        bank_account=None, issue_date=None, total_with_vat=1.0, currency="CZK", confidence=1.0,
+                        method="offline", requires_review=False, review_reasons=None,
+                        items=[{"name": "Mléko", "quantity": 1, "vat_rate": 0.0, "line_total": 1.0}],
+                    )
+                    session.commit()
+                    item_id = session.execute(select(LineItem.id).where(LineItem.document_id == doc.id)).scalar_one()
+                with engine.begin() as con:
+                    # simulace DB před external-content FTS (bez triggerů, text uložený v FTS)
+                    for trigger in ("items_fts_ai", "items_fts_ad", "items_fts_au"):
+                        con.execute(text(f"DROP TRIGGER {trigger}"))
+                    con.execute(text("DROP TABLE items_fts"))
+                    con.execute(text("CREATE VIRTUAL TABLE items_fts USING fts5(document_id UNINDEXED, item_name)"))
+                    con.execute(text("PRAGMA user_version=4"))
+
+                init_db(engine)
+
+                with engine.begin() as con:
+                    ddl = con.execute(text("SELECT sql FROM sqlite_master WHERE name='items_fts'")).scalar_one()
+                    self.assertIn("content='items'", ddl)
+                    self.assertEqual(con.execute(text("SELECT rowid FROM items_fts WHERE items_fts MATCH 'mléko'")).scalars().all(), [item_id])
+                    # triggery drží index v souladu i při změně a smazání položky
+                    con.execute(text("UPDATE items SET name='Chléb' WHERE id=:i"), {"i": item_id})
+                    self.assertEqual(con.execute(text("SELECT rowid FROM items_fts WHERE items_fts MATCH 'mléko'")).all(), [])
+                    con.execute(text("DELETE FROM items WHERE id=:i"), {"i": item_id})
+                    con.execute(text("INSERT INTO items_fts(items_fts, rank) VALUES ('integrity-check', 1)"))
+                    self.assertEqual(int(con.execute(text("SELECT COUNT(*) FROM items_fts_docsize")).scalar_one()), 0)
+            finally:
+                engine.dispose()
+
+    def test_init_db_failure_rolls_back_schema_changes(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "atomic.db"
+            engine = make_engine(str(db_path))
+            try:
+                with mock.patch.object(migrate, "_ensure_indexes", side_effect=RuntimeError("boom")):
+                    with self.assertRaises(RuntimeError):
+                        init_db(engine)
+                with engine.begin() as con:
+                    # Tabulky, sloupce i backfilly běží v jedné BEGIN IMMEDIATE transakci -> nic nezůstane napůl;
+                    # zůstanou jen idempotentní FTS tabulky z předchozí krátké transakce.
+                    names = {r[0] for r in con.execute(text("SELECT name FROM sqlite_master WHERE type='table'"))}
+                    self.assertNotIn("documents", names)
+                    self.assertNotIn("items", names)
+                    self.assertIn("items_fts2", names)
+                    self.assertEqual(int(con.execute(text("PRAGMA user_version")).scalar_one()), 0)
+                init_db(engine)
+                with engine.begin() as con:
+                    self.assertEqual(int(con.execute(text("PRAGMA user_version")).scalar_one()), SCHEMA_VERSION)
+            finally:
+                engine.dispose()
+
     def test_add_document_maps_legacy_and_fills_new_fields(self) -> None:
         with tempfile.TemporaryDirectory() as td:
             db_path = Path(td) / "new.db"
@@ -121,6 +262,36 @@ class TestDbNetGrossMigration(unittest.TestCase):
                     self.assertAlmostEqual(float(item.line_total_gross or 0.0), 242.0, places=2)
                     self.assertAlmostEqual(float(item.line_total_net or 0.0), 200.0, places=2)
                     self.assertAlmostEqual(float(item.vat_amount or 0.0), 42.0, places=2)
+
+                    # FTS se přestaví opakovaně bez duplicit, hodnoty jdou přímo z documents/items.
+                    rebuild_fts_for_document(session, doc.id, full_text="plný text")
+                    rebuild_fts_for_document(session, doc.id, full_text="plný text")
+                    docs_fts = session.execute(text("SELECT supplier_ico, doc_number, bank_account, text FROM documents_fts")).fetchall()
+                    self.assertEqual([tuple(r) for r in docs_fts], [("12345678", "FV-1", "", "plný text")])
+                    # items_fts plní trigger nad items (bez zásahu rebuild_fts_for_document)
+                    hits = session.execute(text("SELECT rowid FROM items_fts WHERE items_fts MATCH 'položka'")).scalars().all()
+                    self.assertEqual(hits, [item.id])
+                    fts2 = session.execute(text("SELECT item_id, item_name, supplier_ico, doc_number FROM items_fts2")).fetchall()
+                    self.assertEqual([tuple(r) for r in fts2], [(item.id, "Položka", "12345678", "FV-1")])
+
+                    # plný reindex srovná položková FTS s items a zachová text dokladů
+                    session.execute(text("INSERT INTO items_fts(rowid, document_id, name) VALUES (999, 999, 'sirotek')"))
+                    rebuild_all_fts(session)
+                    self.assertEqual(session.execute(text("SELECT rowid FROM items_fts WHERE items_fts MATCH 'sirotek'")).all(), [])
+                    session.execute(text("INSERT INTO items_fts(items_fts, rank) VALUES ('integrity-check', 1)"))
+                    self.assertEqual(int(session.execute(text("SELECT COUNT(*) FROM items_fts2 WHERE items_fts2 MATCH 'FV'")).scalar_one()), 1)
+                    self.assertEqual(session.execute(text("SELECT text FROM documents_fts")).scalars().all(), ["plný text"])
+
+                    # dávkový rebuild pro celý job: text dokladu z mapy, bez duplicit v FTS
+                    rebuild_fts_for_documents(session, {doc.id: "jiný text"})
+                    rebuild_fts_for_documents(session, {doc.id: "jiný text"})
+                    self.assertEqual(session.execute(text("SELECT text FROM documents_fts")).scalars().all(), ["jiný text"])
+                    self.assertEqual(int(session.execute(text("SELECT COUNT(*) FROM items_fts2")).scalar_one()), 1)
+
+                    # neflushnuté ORM změny se do FTS dostanou (flush jednou před příkazy)
+                    doc_db.doc_number = "FV-2"
+                    rebuild_fts_for_document(session, doc.id, full_text="plný text")
+                    self.assertEqual(session.execute(text("SELECT doc_number FROM items_fts2")).scalars().all(), ["FV-2"])
             finally:
                 engine.dispose()
 
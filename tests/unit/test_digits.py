@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+import re
+import unittest
+
+from kajovospend.utils.digits import digits_only
+
+
+class TestDigitsOnly(unittest.TestCase):
+    def test_matches_regex_strip(self) -> None:
+        for value in ["", "12345678", "CZ 123 456 78", "IČO: 27-082-440", "abc", "١٢٣ x", "²3"]:
+            self.assertEqual(digits_only(value), re.sub(r"\D+", "", value), value)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+
+from kajovospend.utils.hashing import sha256_file, sha256_file_fast, sha256_from_name
+
+_H = "ab" * 32
+
+
+def test_name_hash_used_only_when_trusted(tmp_path: Path):
+    p = tmp_path / f"{_H.upper()}.pdf"
+    p.write_bytes(b"%PDF-1.4 test")
+    real = hashlib.sha256(b"%PDF-1.4 test").hexdigest()
+    assert sha256_from_name(p) == _H
+    assert sha256_file_fast(p) == real
+    assert sha256_file_fast(p, trust_name=True) == _H
+
+
+def test_mismatching_sidecar_forces_full_hash(tmp_path: Path):
+    p = tmp_path / f"doc_{_H}.pdf"
+    p.write_bytes(b"data")
+    (tmp_path / (p.name + ".sha256")).write_text("cd" * 32 + "  " + p.name + "\n", encoding="ascii")
+    assert sha256_file_fast(p, trust_name=True) == sha256_file(p)
+
+
+def test_longer_hex_run_is_not_a_hash(tmp_path: Path):
+    p = tmp_path / (("ab" * 33) + ".pdf")
+    p.write_bytes(b"x")
+    assert sha256_from_name(p) is None
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import unittest
+
+from kajovospend.db.migrate import MIGRATION_PLAN
+
+
+class TestMigrationPlan(unittest.TestCase):
+    def test_columns_are_unique_per_table(self) -> None:
+        for table, columns in MIGRATION_PLAN.columns.items():
+            names = [name for name, _decl in columns]
+            self.assertEqual(len(names), len(set(names)), table)
+
+    def test_indexes_are_idempotent_and_named(self) -> None:
+        for indexes in (MIGRATION_PLAN.indexes, MIGRATION_PLAN.working_indexes):
+            names = [name for name, _stmt in indexes]
+            self.assertEqual(len(names), len(set(names)))
+            for name, stmt in indexes:
+                self.assertIn(f"IF NOT EXISTS {name} ON ", stmt.text)
+
+    def test_fts_ddl_is_idempotent(self) -> None:
+        for ddl in MIGRATION_PLAN.fts_ddl:
+            self.assertIn("CREATE VIRTUAL TABLE IF NOT EXISTS", ddl.text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import unicodedata
+import unittest
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from kajovospend.db.base import Base
+from kajovospend.db.models import LineItem, Supplier
+
+
+class TestNfcText(unittest.TestCase):
+    def test_bound_values_are_stored_as_nfc(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine, tables=[Supplier.__table__])
+        nfd = unicodedata.normalize("NFD", "Žluťoučký kůň")
+        try:
+            with Session(engine) as session:
+                session.add(Supplier(ico="12345678", name="x"))
+                session.commit()
+                session.execute(Supplier.__table__.update().values(ico=nfd))
+                stored = session.execute(select(Supplier.__table__.c.ico)).scalar_one()
+                self.assertEqual(stored, unicodedata.normalize("NFC", nfd))
+                # rovnost v dotazu jde přes stejnou normalizaci parametru
+                hit = session.execute(select(Supplier.id).where(Supplier.ico == nfd)).scalar_one_or_none()
+                self.assertIsNotNone(hit)
+        finally:
+            engine.dispose()
+
+    def test_ascii_and_none_pass_through(self) -> None:
+        col_type = LineItem.__table__.c.name.type
+        self.assertEqual(col_type.process_bind_param("abc", None), "abc")
+        self.assertIsNone(col_type.process_bind_param(None, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import datetime as dt
+import unittest
+
+from kajovospend.extract import parser
+
+
+class TestParseDate(unittest.TestCase):
+    def test_numeric_formats_use_day_first(self) -> None:
+        for raw in ("05.03.2024", "5.3.2024", "5. 3. 2024", " 05/03/2024 "):
+            self.assertEqual(parser._parse_date(raw), dt.date(2024, 3, 5))
+
+    def test_month_names_and_fallbacks(self) -> None:
+        self.assertEqual(parser._parse_date("1. ledna 2024"), dt.date(2024, 1, 1))
+        self.assertEqual(parser._parse_date("15 května 2023"), dt.date(2023, 5, 15))
+        # dateutil fallback prohodí den/měsíc, pokud by jinak datum nebylo platné
+        self.assertEqual(parser._parse_date("03/25/2024"), dt.date(2024, 3, 25))
+        self.assertIsNone(parser._parse_date("31.02.2024"))
+        self.assertIsNone(parser._parse_date(""))
+
+
+if __name__ == "__main__":
+    unittest.main()
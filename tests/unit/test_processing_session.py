@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+from sqlalchemy import text
+
+from kajovospend.db.processing_session import create_processing_session_factory, dispose_processing_session_factory
+from kajovospend.service.processor import Processor
+
+
+class TestProcessingSessionFactory(unittest.TestCase):
+    def test_factory_is_reused_per_db_path_until_disposed(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            cfg = {"paths": {"processing_db": str(Path(td) / "p.sqlite")}}
+            sf = create_processing_session_factory(cfg)
+            try:
+                self.assertIs(create_processing_session_factory(dict(cfg)), sf)
+                with sf() as session:
+                    self.assertEqual(session.execute(text("PRAGMA journal_mode")).scalar_one(), "wal")
+                    self.assertEqual(session.execute(text("PRAGMA page_size")).scalar_one(), 8192)
+                    self.assertEqual(session.execute(text("SELECT COUNT(*) FROM ingest_files")).scalar_one(), 0)
+            finally:
+                dispose_processing_session_factory(sf)
+            sf2 = create_processing_session_factory(cfg)
+            try:
+                self.assertIsNot(sf2, sf)
+            finally:
+                dispose_processing_session_factory(sf2)
+
+    def test_sessions_take_write_lock_at_begin(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            db = Path(td) / "p.sqlite"
+            sf = create_processing_session_factory({"paths": {"processing_db": str(db)}})
+            try:
+                with sf() as session:
+                    session.execute(text("SELECT COUNT(*) FROM ingest_files")).scalar_one()
+                    other = sqlite3.connect(str(db), timeout=0, isolation_level=None)
+                    try:
+                        with self.assertRaises(sqlite3.OperationalError):
+                            other.execute("BEGIN IMMEDIATE")
+                    finally:
+                        other.close()
+                    session.rollback()
+            finally:
+                dispose_processing_session_factory(sf)
+
+    def test_dispose_leaves_open_sessions_to_their_owners(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            cfg = {"paths": {"processing_db": str(Path(td) / "p.sqlite")}}
+            sf = create_processing_session_factory(cfg)
+            own = sf()
+            try:
+                own.execute(text("SELECT COUNT(*) FROM ingest_files"))
+                dispose_processing_session_factory(sf)
+                # rozpracovaná session doběhne; její spojení se zahodí až při vrácení do poolu
+                self.assertTrue(own.in_transaction())
+                self.assertEqual(own.execute(text("SELECT COUNT(*) FROM ingest_files")).scalar_one(), 0)
+                own.rollback()
+                self.assertIsNot(create_processing_session_factory(cfg), sf)
+            finally:
+                own.close()
+                dispose_processing_session_factory(create_processing_session_factory(cfg))
+
+    def test_processor_close_keeps_shared_factory(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            cfg = {"paths": {"processing_db": str(Path(td) / "p.sqlite")}}
+            sf = create_processing_session_factory(cfg)
+            try:
+                proc = Processor(cfg, SimpleNamespace(models_dir=Path(td)), logging.getLogger("test"), None, None)
+                self.assertIs(proc.pf, sf)
+                proc.close()
+                self.assertIs(create_processing_session_factory(cfg), sf)
+                with sf() as session:
+                    self.assertEqual(session.execute(text("SELECT COUNT(*) FROM ingest_files")).scalar_one(), 0)
+            finally:
+                dispose_processing_session_factory(sf)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import unittest
+
+from kajovospend.db.queries import _to_float, _to_str
+
+
+class TestQueriesCoercion(unittest.TestCase):
+    def test_to_float_accepts_czech_number_formats(self) -> None:
+        self.assertEqual(_to_float("1 234,50"), 1234.5)
+        self.assertEqual(_to_float("1\xa0234,5"), 1234.5)
+        self.assertEqual(_to_float(" \t12,5\n"), 12.5)
+        self.assertEqual(_to_float(7), 7.0)
+        self.assertIs(type(_to_float(True)), float)
+        self.assertEqual(_to_float(2.5, 9.0), 2.5)
+
+    def test_to_float_falls_back_to_default(self) -> None:
+        self.assertEqual(_to_float(None, 1.0), 1.0)
+        self.assertEqual(_to_float("", 2.0), 2.0)
+        self.assertEqual(_to_float("   ", 3.0), 3.0)
+        self.assertEqual(_to_float("abc", 4.0), 4.0)
+        self.assertEqual(_to_float("1,2,3", 5.0), 5.0)
+
+    def test_to_str_strips_and_truncates(self) -> None:
+        self.assertIsNone(_to_str("  ", 5))
+        self.assertEqual(_to_str("  abcdefgh ", 5), "abcde")
+        self.assertEqual(_to_str(8594001234567, 64), "8594001234567")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import datetime as dt
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from kajovospend.db.working_models import BaseWorking, ServiceState
+from kajovospend.db.heartbeat import HEARTBEAT_THROTTLE_SEC
+from kajovospend.db.working_queries import update_service_state
+
+
+class TestServiceStateHeartbeat(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = create_engine("sqlite://")
+        BaseWorking.metadata.create_all(self.engine)
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+
+    def _changes(self, session: Session) -> int:
+        return session.connection().exec_driver_sql("SELECT total_changes()").scalar_one()
+
+    def test_fresh_heartbeat_without_other_changes_is_skipped(self) -> None:
+        t0 = dt.datetime(2024, 1, 1, 12, 0, 0)
+        with Session(self.engine) as session:
+            update_service_state(session, current_phase="idle", inflight=0, heartbeat_at=t0)
+            session.commit()
+            changes = self._changes(session)
+
+            update_service_state(session, current_phase="idle", inflight=0, heartbeat_at=t0 + dt.timedelta(seconds=1))
+            self.assertEqual(self._changes(session), changes)
+
+            update_service_state(session, current_phase="dispatching", heartbeat_at=t0 + dt.timedelta(seconds=2))
+            self.assertEqual(self._changes(session), changes + 1)
+
+            later = t0 + dt.timedelta(seconds=2 + HEARTBEAT_THROTTLE_SEC + 1)
+            update_service_state(session, current_phase="dispatching", heartbeat_at=later)
+            self.assertEqual(self._changes(session), changes + 2)
+            session.commit()
+
+            st = session.get(ServiceState, 1)
+            session.refresh(st)
+            self.assertEqual(st.current_phase, "dispatching")
+            self.assertEqual(st.heartbeat_at, later)
+            self.assertEqual(session.query(ServiceState).count(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
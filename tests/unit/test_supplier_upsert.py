@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import unittest
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from kajovospend.db.supplier_ids import supplier_cache_key
+from kajovospend.db.working_models import BaseWorking, Supplier
+from kajovospend.db.working_queries import upsert_supplier
+
+
+class TestSupplierUpsert(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = create_engine("sqlite://")
+        BaseWorking.metadata.create_all(self.engine)
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+
+    def test_insert_then_update_keeps_existing_fields(self) -> None:
+        with Session(self.engine) as session:
+            a = upsert_supplier(session, "123 456 78", name="ACME", city="Praha")
+            b = upsert_supplier(session, "12345678", name="ACME s.r.o.", city=None, overwrite=True)
+            self.assertIs(a, b)
+            self.assertEqual(b.ico, "12345678")
+            self.assertEqual(b.ico_norm, "12345678")
+            self.assertEqual(b.name, "ACME s.r.o.")
+            self.assertEqual(b.city, "Praha")
+            self.assertEqual(len(session.execute(select(Supplier)).scalars().all()), 1)
+
+    def test_unchanged_values_do_not_write(self) -> None:
+        with Session(self.engine) as session:
+            a = upsert_supplier(session, "12345678", name="ACME", city="Praha")
+            changes = session.connection().exec_driver_sql("SELECT total_changes()").scalar_one()
+            b = upsert_supplier(session, "12345678", name="ACME", city="Praha")
+            self.assertIs(a, b)
+            self.assertEqual(session.connection().exec_driver_sql("SELECT total_changes()").scalar_one(), changes)
+            upsert_supplier(session, "12345678", city="Brno")
+            self.assertEqual(session.connection().exec_driver_sql("SELECT total_changes()").scalar_one(), changes + 1)
+            self.assertEqual(a.city, "Brno")
+
+    def test_write_none_clears_fields_in_single_upsert(self) -> None:
+        with Session(self.engine) as session:
+            a = upsert_supplier(session, "12345678", name="ACME", city="Praha")
+            b = upsert_supplier(session, "12345678", write_none=True, name="ACME", city=None)
+            self.assertIs(a, b)
+            self.assertIsNone(b.city)
+            self.assertEqual(b.name, "ACME")
+
+    def test_legacy_row_matched_by_ico_only(self) -> None:
+        with Session(self.engine) as session:
+            session.add(Supplier(ico="ABC", ico_norm=None, name="old"))
+            session.flush()
+            s = upsert_supplier(session, "ABC", name="new")
+            session.commit()
+            self.assertEqual(s.name, "new")
+            self.assertEqual(s.ico_norm, "ABC")
+            self.assertEqual(len(session.execute(select(Supplier)).scalars().all()), 1)
+
+    def test_pending_flush_error_is_not_swallowed(self) -> None:
+        with Session(self.engine) as session:
+            session.add(Supplier(ico="111", ico_norm="111"))
+            session.flush()
+            session.add(Supplier(ico="111", ico_norm="222"))
+            with self.assertRaises(IntegrityError):
+                upsert_supplier(session, "12345678", name="ACME")
+
+    def test_repeated_unchanged_upsert_skips_select_by_ico(self) -> None:
+        with Session(self.engine) as session:
+            a = upsert_supplier(session, "87654321", name="ACME")
+            statements: list[str] = []
+            event.listen(self.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+            b = upsert_supplier(session, "87654321", name="ACME")
+            self.assertIs(a, b)
+            self.assertEqual(len(statements), 1)
+            self.assertTrue(statements[0].lstrip().upper().startswith("INSERT"))
+
+    def test_stale_cached_id_falls_back_to_lookup(self) -> None:
+        with Session(self.engine) as session:
+            upsert_supplier(session, "11223344", name="ACME")
+            session.rollback()
+            session.add(Supplier(ico="99999999", ico_norm="99999999", name="other"))
+            session.flush()
+            s = upsert_supplier(session, "11223344", name="ACME")
+            self.assertEqual(s.ico_norm, "11223344")
+            self.assertEqual(len(session.execute(select(Supplier)).scalars().all()), 2)
+
+    def test_cache_key_separates_in_memory_engines(self) -> None:
+        other = create_engine("sqlite://")
+        try:
+            with Session(self.engine) as a, Session(self.engine) as a2, Session(other) as b:
+                self.assertNotEqual(supplier_cache_key(a, "12345678"), supplier_cache_key(b, "12345678"))
+                self.assertEqual(supplier_cache_key(a, "12345678"), supplier_cache_key(a2, "12345678"))
+        finally:
+            other.dispose()
+
+
+class TestProductionSupplierUpsert(unittest.TestCase):
+    def test_repeated_unchanged_upsert_skips_select_by_ico(self) -> None:
+        from kajovospend.db.production_models import BaseProduction, Supplier as ProdSupplier
+        from kajovospend.db.production_queries import upsert_supplier as upsert_supplier_prod
+
+        engine = create_engine("sqlite://")
+        BaseProduction.metadata.create_all(engine)
+        try:
+            with Session(engine) as session:
+                a = upsert_supplier_prod(session, "55667788", name="ACME", city="Praha")
+                statements: list[str] = []
+                event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+                b = upsert_supplier_prod(session, "55667788", name="ACME", city=None)
+                self.assertIs(a, b)
+                self.assertEqual(len(statements), 1)
+                self.assertEqual(b.city, "Praha")
+                self.assertEqual(len(session.execute(select(ProdSupplier)).scalars().all()), 1)
+        finally:
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    unittest.main()
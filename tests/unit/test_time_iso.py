@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import time
+from datetime import UTC, datetime
+
+from kajovospend.utils.time import utc_iso_from_epoch, utc_naive_from_epoch, utc_now_naive, utc_now_naive_cached
+
+
+def test_utc_iso_from_epoch_matches_datetime_isoformat():
+    base = 1_767_225_600.0  # 2026-01-01T00:00:00Z
+    for ts in (base, base + 0.5, base + 0.0000005, base + 0.0000015, base + 0.9999996, base + 59.25, base + 86_399.123456):
+        assert utc_iso_from_epoch(ts) == datetime.fromtimestamp(ts, tz=UTC).isoformat()
+
+
+def test_utc_iso_from_epoch_refreshes_prefix_across_seconds():
+    assert utc_iso_from_epoch(1_767_225_600.25).startswith("2026-01-01T00:00:00.")
+    assert utc_iso_from_epoch(1_767_225_601.25).startswith("2026-01-01T00:00:01.")
+
+
+def test_utc_naive_from_epoch_matches_datetime():
+    base = 1_767_225_600.0
+    for ts in (base, base + 0.5, base + 0.0000005, base + 0.0000015, base + 0.9999996, base + 86_399.123456, 0.0):
+        assert utc_naive_from_epoch(ts) == datetime.fromtimestamp(ts, tz=UTC).replace(tzinfo=None)
+
+
+def test_utc_now_naive_is_naive_utc():
+    before = datetime.now(UTC).replace(tzinfo=None)
+    now = utc_now_naive()
+    after = datetime.now(UTC).replace(tzinfo=None)
+    assert now.tzinfo is None
+    assert before <= now <= after
+
+
+
+def test_utc_now_naive_cached_shares_value_within_millisecond(monkeypatch):
+    clock = [time.monotonic() + 10.0]
+    monkeypatch.setattr(time, "monotonic", lambda: clock[0])
+    first = utc_now_naive_cached()
+    clock[0] += 0.0005
+    assert utc_now_naive_cached() is first
+    clock[0] += 0.002
+    refreshed = utc_now_naive_cached()
+    assert refreshed is not first
+    assert refreshed.tzinfo is None and refreshed >= first
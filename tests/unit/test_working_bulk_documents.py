@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import datetime as dt
+import unittest
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from kajovospend.db.working_models import BaseWorking, Document, LineItem
+from kajovospend.db.working_queries import add_documents_bulk, create_file_record, rebuild_fts_for_document
+
+
+class TestAddDocumentsBulk(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = create_engine("sqlite://")
+        BaseWorking.metadata.create_all(self.engine)
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+
+    def _doc(self, file_id: int, doc_number: str | None, items: list[dict], page: int) -> dict:
+        return dict(
+            file_id=file_id,
+            supplier_id=None,
+            supplier_ico="12345678",
+            doc_number=doc_number,
+            bank_account=None,
+            issue_date=dt.date(2025, 1, 1),
+            total_with_vat=100.0,
+            currency="CZK",
+            confidence=1.0,
+            method="offline",
+            requires_review=False,
+            review_reasons=None,
+            items=items,
+            page_from=page,
+            page_to=page,
+        )
+
+    def test_inserts_documents_and_items_in_input_order(self) -> None:
+        with Session(self.engine) as session:
+            f = create_file_record(session, "sha", "a.pdf", "/tmp/a.pdf", 3, "PROCESSED")
+            ids = add_documents_bulk(session, [
+                self._doc(f.id, "FV-1", [{"name": "A", "quantity": 2, "line_total": 10.0}, {"name": "B"}], 1),
+                self._doc(f.id, None, [], 2),
+                self._doc(f.id, "FV-3", [{"name": "C", "quantity": 0, "vat_rate": 21}], 3),
+            ])
+            session.commit()
+
+            self.assertEqual(len(ids), 3)
+            docs = {d.id: d for d in session.scalars(select(Document))}
+            self.assertEqual([docs[i].page_from for i in ids], [1, 2, 3])
+            self.assertEqual([docs[i].doc_type for i in ids], ["invoice", "receipt", "invoice"])
+            items = session.execute(
+                select(LineItem.document_id, LineItem.line_no, LineItem.name, LineItem.quantity, LineItem.vat_rate)
+                .order_by(LineItem.id)
+            ).all()
+            self.assertEqual(
+                [tuple(r) for r in items],
+                [(ids[0], 1, "A", 2.0, 0.0), (ids[0], 2, "B", 1.0, 0.0), (ids[2], 1, "C", 1.0, 21.0)],
+            )
+
+    def test_empty_input_is_noop(self) -> None:
+        with Session(self.engine) as session:
+            self.assertEqual(add_documents_bulk(session, []), [])
+
+    def test_fts_rebuild_placeholder_accepts_full_text(self) -> None:
+        with Session(self.engine) as session:
+            self.assertIsNone(rebuild_fts_for_document(session, 1, full_text="a\nb"))
+            self.assertIsNone(rebuild_fts_for_document(session, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
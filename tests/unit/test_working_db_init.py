@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from sqlalchemy import text
+
+from kajovospend.db.migrate import WORKING_SCHEMA_VERSION, init_working_db
+from kajovospend.db.session import make_engine
+
+
+class TestWorkingDbInit(unittest.TestCase):
+    def test_warm_start_skips_schema_steps(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            engine = make_engine(str(Path(td) / "working.db"))
+            try:
+                init_working_db(engine)
+                with engine.begin() as con:
+                    self.assertEqual(int(con.execute(text("PRAGMA user_version")).scalar_one()), WORKING_SCHEMA_VERSION)
+                    names = {r[0] for r in con.execute(text("SELECT name FROM sqlite_master"))}
+                    self.assertIn("item_groups", names)
+                    self.assertIn("idx_documents_supplier_id", names)
+                    con.execute(text("DROP INDEX idx_documents_supplier_id"))
+
+                init_working_db(engine)
+
+                with engine.begin() as con:
+                    # stejná verze -> schémové kroky se znovu neprovádí
+                    idx = con.execute(
+                        text("SELECT COUNT(*) FROM sqlite_master WHERE name='idx_documents_supplier_id'")
+                    ).scalar_one()
+                    self.assertEqual(int(idx), 0)
+            finally:
+                engine.dispose()
+
+    def test_upgrade_adds_partial_queued_index(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            engine = make_engine(str(Path(td) / "working.db"))
+            try:
+                init_working_db(engine)
+                with engine.begin() as con:
+                    # simulace working DB z verze 1 (bez částečného indexu fronty)
+                    con.execute(text("DROP INDEX ix_import_jobs_queued"))
+                    con.execute(text("PRAGMA user_version=1"))
+
+                init_working_db(engine)
+
+                with engine.begin() as con:
+                    ddl = con.execute(
+                        text("SELECT sql FROM sqlite_master WHERE name='ix_import_jobs_queued'")
+                    ).scalar_one()
+                    self.assertIn("WHERE status = 'QUEUED'", ddl)
+            finally:
+                engine.dispose()
+
+
+if __name__ == "__main__":
+    unittest.main()